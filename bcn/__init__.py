@@ -15,10 +15,50 @@ try:
     from . import decompress_cy as decompress_
 
 except:
-    from . import decompress_
+    try:
+        from . import decompress_np as decompress_
 
+    except ImportError:
+        from . import decompress_
+
+# BC6H and BC7 have no Cython decoder
+try:
+    from . import decompress_np as decompress_bptc
+
+except ImportError:
+    from . import decompress_ as decompress_bptc
+
+from . import astc, parallel
+
+
+def checkBlockAddrs(data, width, height, blockSize, blockAddrs):
+    """
+    Makes sure every block read through blockAddrs lies inside data,
+    as the Cython decoders read them without bounds checking.
+    """
+    numBlocks = ((width + 3) // 4) * ((height + 3) // 4)
+    if len(blockAddrs) < numBlocks:
+        raise ValueError("Not enough block addresses")
+
+    if not numBlocks:
+        return
+
+    if hasattr(blockAddrs, 'min'):
+        lo, hi = int(blockAddrs.min()), int(blockAddrs.max())
+
+    else:
+        lo, hi = min(blockAddrs), max(blockAddrs)
+
+    if lo < 0 or hi + blockSize > memoryview(data).nbytes:
+        raise ValueError("Block address is out of range")
+
+
+def decompressDXT1(data, width, height, blockAddrs=None, out=None):
+    if blockAddrs is not None:
+        # Read each block straight from the swizzled surface
+        checkBlockAddrs(data, width, height, 8, blockAddrs)
+        return decompress_.decompressDXT1(data, width, height, blockAddrs=blockAddrs, out=out)
 
-def decompressDXT1(data, width, height):
     if not isinstance(data, bytes):
         try:
             data = bytes(data)
@@ -33,10 +73,15 @@ def decompressDXT1(data, width, height):
         return b''
 
     data = data[:csize]
-    return decompress_.decompressDXT1(data, width, height)
+    return decompress_.decompressDXT1(data, width, height, out=out)
+
 
+def decompressDXT3(data, width, height, blockAddrs=None, out=None):
+    if blockAddrs is not None:
+        # Read each block straight from the swizzled surface
+        checkBlockAddrs(data, width, height, 16, blockAddrs)
+        return decompress_.decompressDXT3(data, width, height, blockAddrs=blockAddrs, out=out)
 
-def decompressDXT3(data, width, height):
     if not isinstance(data, bytes):
         try:
             data = bytes(data)
@@ -51,10 +96,15 @@ def decompressDXT3(data, width, height):
         return b''
 
     data = data[:csize]
-    return decompress_.decompressDXT3(data, width, height)
+    return decompress_.decompressDXT3(data, width, height, out=out)
 
 
-def decompressDXT5(data, width, height):
+def decompressDXT5(data, width, height, blockAddrs=None, out=None):
+    if blockAddrs is not None:
+        # Read each block straight from the swizzled surface
+        checkBlockAddrs(data, width, height, 16, blockAddrs)
+        return decompress_.decompressDXT5(data, width, height, blockAddrs=blockAddrs, out=out)
+
     if not isinstance(data, bytes):
         try:
             data = bytes(data)
@@ -69,10 +119,15 @@ def decompressDXT5(data, width, height):
         return b''
 
     data = data[:csize]
-    return decompress_.decompressDXT5(data, width, height)
+    return decompress_.decompressDXT5(data, width, height, out=out)
+
 
+def decompressBC4(data, width, height, SNORM=0, blockAddrs=None, out=None):
+    if blockAddrs is not None:
+        # Read each block straight from the swizzled surface
+        checkBlockAddrs(data, width, height, 8, blockAddrs)
+        return decompress_.decompressBC4(data, width, height, SNORM, blockAddrs=blockAddrs, out=out)
 
-def decompressBC4(data, width, height, SNORM=0):
     if not isinstance(data, bytes):
         try:
             data = bytes(data)
@@ -87,10 +142,64 @@ def decompressBC4(data, width, height, SNORM=0):
         return b''
 
     data = data[:csize]
-    return decompress_.decompressBC4(data, width, height, SNORM)
+    return decompress_.decompressBC4(data, width, height, SNORM, out=out)
+
+
+def decompressBC5(data, width, height, SNORM=0, blockAddrs=None, out=None):
+    if blockAddrs is not None:
+        # Read each block straight from the swizzled surface
+        checkBlockAddrs(data, width, height, 16, blockAddrs)
+        return decompress_.decompressBC5(data, width, height, SNORM, blockAddrs=blockAddrs, out=out)
+
+    if not isinstance(data, bytes):
+        try:
+            data = bytes(data)
+
+        except:
+            print("Couldn't decompress data")
+            return b''
+
+    csize = ((width + 3) // 4) * ((height + 3) // 4) * 16
+    if len(data) < csize:
+        print("Compressed data is incomplete")
+        return b''
+
+    data = data[:csize]
+    return decompress_.decompressBC5(data, width, height, SNORM, out=out)
+
+
+def decompressBC6H(data, width, height, SIGNED=0, HDR=0, blockAddrs=None, out=None):
+    """
+    Returns RGBA8 clamped to [0, 1], or RGBA16F (little-endian half floats) if HDR is set.
+    """
+    if blockAddrs is not None:
+        # Read each block straight from the swizzled surface
+        checkBlockAddrs(data, width, height, 16, blockAddrs)
+        return decompress_bptc.decompressBC6H(data, width, height, SIGNED, HDR, blockAddrs=blockAddrs, out=out)
+
+    if not isinstance(data, bytes):
+        try:
+            data = bytes(data)
+
+        except:
+            print("Couldn't decompress data")
+            return b''
+
+    csize = ((width + 3) // 4) * ((height + 3) // 4) * 16
+    if len(data) < csize:
+        print("Compressed data is incomplete")
+        return b''
+
+    data = data[:csize]
+    return decompress_bptc.decompressBC6H(data, width, height, SIGNED, HDR, out=out)
+
 
+def decompressBC7(data, width, height, blockAddrs=None, out=None):
+    if blockAddrs is not None:
+        # Read each block straight from the swizzled surface
+        checkBlockAddrs(data, width, height, 16, blockAddrs)
+        return decompress_bptc.decompressBC7(data, width, height, blockAddrs=blockAddrs, out=out)
 
-def decompressBC5(data, width, height, SNORM=0):
     if not isinstance(data, bytes):
         try:
             data = bytes(data)
@@ -105,4 +214,48 @@ def decompressBC5(data, width, height, SNORM=0):
         return b''
 
     data = data[:csize]
-    return decompress_.decompressBC5(data, width, height, SNORM)
+    return decompress_bptc.decompressBC7(data, width, height, out=out)
+
+
+def decompressASTC(data, width, height, blkWidth, blkHeight, SRGB=0, numWorkers=None):
+    """
+    Returns RGBA8. numWorkers defaults to the number of CPUs; small textures are decoded in-process.
+    """
+    if not isinstance(data, bytes):
+        try:
+            data = bytes(data)
+
+        except:
+            print("Couldn't decompress data")
+            return b''
+
+    csize = ((width + blkWidth - 1) // blkWidth) * ((height + blkHeight - 1) // blkHeight) * 16
+    if len(data) < csize:
+        print("Compressed data is incomplete")
+        return b''
+
+    data = data[:csize]
+    return astc.decompressASTC(data, width, height, blkWidth, blkHeight, SRGB, numWorkers)
+
+
+def decompressParallel(format_, data, width, height, *args, numWorkers=None, minBandRows=parallel.MIN_BAND_ROWS):
+    """
+    Decodes a DXT1/DXT3/DXT5/BC4/BC5/BC6H/BC7/ASTC texture in bands of block rows across a process pool.
+    numWorkers defaults to the number of CPUs; textures with fewer than two bands are decoded in-process.
+    """
+    if not isinstance(data, bytes):
+        try:
+            data = bytes(data)
+
+        except:
+            print("Couldn't decompress data")
+            return b''
+
+    blkWidth, blkHeight = parallel.getBlockDims(format_, args)
+    csize = ((width + blkWidth - 1) // blkWidth) * ((height + blkHeight - 1) // blkHeight) * parallel.BLOCK_SIZES[format_]
+    if len(data) < csize:
+        print("Compressed data is incomplete")
+        return b''
+
+    data = data[:csize]
+    return parallel.decompress(format_, data, width, height, *args, numWorkers=numWorkers, minBandRows=minBandRows)
@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ASTC Decompressor
+# Version 0.1
+# Copyright © 2018 MasterVermilli0n / AboodXD
+
+# astc.py
+# An ASTC LDR decompressor in Python, decoding blocks in parallel across processes.
+
+################################################################
+################################################################
+
+from . import parallel
+
+ERROR_COLOR = bytes((255, 0, 255, 255))
+
+
+################################################################
+# Integer sequence encoding
+################################################################
+
+def decodeTrits(T):
+    """
+    Unpacks the 5 trits of an 8-bit value.
+    """
+    if (T >> 2) & 7 == 7:
+        C = (T >> 5) << 2 | (T & 3)
+        t4 = t3 = 2
+
+    else:
+        C = T & 0x1f
+        if (T >> 5) & 3 == 3:
+            t4 = 2
+            t3 = T >> 7
+
+        else:
+            t4 = T >> 7
+            t3 = (T >> 5) & 3
+
+    if C & 3 == 3:
+        t2 = 2
+        t1 = C >> 4
+        t0 = ((C >> 3) & 1) << 1 | ((C >> 2) & 1) & ~(C >> 3) & 1
+
+    elif (C >> 2) & 3 == 3:
+        t2 = t1 = 2
+        t0 = C & 3
+
+    else:
+        t2 = C >> 4
+        t1 = (C >> 2) & 3
+        t0 = ((C >> 1) & 1) << 1 | (C & 1) & ~(C >> 1) & 1
+
+    return t0, t1, t2, t3, t4
+
+
+def decodeQuints(Q):
+    """
+    Unpacks the 3 quints of a 7-bit value.
+    """
+    if (Q >> 1) & 3 == 3 and (Q >> 5) & 3 == 0:
+        q0 = q1 = 4
+        q2 = (Q & 1) << 2 | ((Q >> 4) & ~Q & 1) << 1 | ((Q >> 3) & ~Q & 1)
+
+    else:
+        if (Q >> 1) & 3 == 3:
+            q2 = 4
+            C = ((Q >> 3) & 3) << 3 | (~(Q >> 5) & 3) << 1 | (Q & 1)
+
+        else:
+            q2 = (Q >> 5) & 3
+            C = Q & 0x1f
+
+        if C & 7 == 5:
+            q1 = 4
+            q0 = (C >> 3) & 3
+
+        else:
+            q1 = (C >> 3) & 3
+            q0 = C & 7
+
+    return q0, q1, q2
+
+
+TRITS = [decodeTrits(T) for T in range(256)]
+QUINTS = [decodeQuints(Q) for Q in range(128)]
+
+# (trits, quints, bits) of each quantization level count
+QUANT_MODES = {
+    2: (0, 0, 1), 3: (1, 0, 0), 4: (0, 0, 2), 5: (0, 1, 0), 6: (1, 0, 1), 8: (0, 0, 3),
+    10: (0, 1, 1), 12: (1, 0, 2), 16: (0, 0, 4), 20: (0, 1, 2), 24: (1, 0, 3), 32: (0, 0, 5),
+    40: (0, 1, 3), 48: (1, 0, 4), 64: (0, 0, 6), 80: (0, 1, 4), 96: (1, 0, 5), 128: (0, 0, 7),
+    160: (0, 1, 5), 192: (1, 0, 6), 256: (0, 0, 8),
+}
+
+# Color endpoint ranges, from the highest to the lowest allowed
+COLOR_RANGES = (256, 192, 160, 128, 96, 80, 64, 48, 40, 32, 24, 20, 16, 12, 10, 8, 6)
+
+# Weight ranges, indexed by the 4-bit range field of the block mode
+WEIGHT_RANGES = (0, 0, 2, 3, 4, 5, 6, 8, 0, 0, 10, 12, 16, 20, 24, 32)
+
+
+def getISEBitCount(count, levels):
+    trits, quints, bits = QUANT_MODES[levels]
+    return count * bits + (count * 8 + 4) // 5 * trits + (count * 7 + 2) // 3 * quints
+
+
+def decodeISE(stream, count, levels):
+    """
+    Decodes count values of an integer sequence, as (trit or quint) << bits | bits.
+    stream must hold only the bits of the sequence.
+    """
+    trits, quints, bits = QUANT_MODES[levels]
+    mask = (1 << bits) - 1
+    values = []
+
+    if trits:
+        for _ in range((count + 4) // 5):
+            m0 = stream & mask; stream >>= bits
+            T = stream & 3; stream >>= 2
+            m1 = stream & mask; stream >>= bits
+            T |= (stream & 3) << 2; stream >>= 2
+            m2 = stream & mask; stream >>= bits
+            T |= (stream & 1) << 4; stream >>= 1
+            m3 = stream & mask; stream >>= bits
+            T |= (stream & 3) << 5; stream >>= 2
+            m4 = stream & mask; stream >>= bits
+            T |= (stream & 1) << 7; stream >>= 1
+
+            t = TRITS[T]
+            values += (t[0] << bits | m0, t[1] << bits | m1, t[2] << bits | m2, t[3] << bits | m3, t[4] << bits | m4)
+
+    elif quints:
+        for _ in range((count + 2) // 3):
+            m0 = stream & mask; stream >>= bits
+            Q = stream & 7; stream >>= 3
+            m1 = stream & mask; stream >>= bits
+            Q |= (stream & 3) << 3; stream >>= 2
+            m2 = stream & mask; stream >>= bits
+            Q |= (stream & 3) << 5; stream >>= 2
+
+            q = QUINTS[Q]
+            values += (q[0] << bits | m0, q[1] << bits | m1, q[2] << bits | m2)
+
+    else:
+        for _ in range(count):
+            values.append(stream & mask); stream >>= bits
+
+    return values[:count]
+
+
+################################################################
+# Unquantization tables
+################################################################
+
+def unquantizeColor(levels, value):
+    trits, quints, bits = QUANT_MODES[levels]
+
+    if not (trits or quints):
+        # Replicate the bits to 8 bits
+        value <<= 8 - bits
+        return value | value >> bits | value >> (2 * bits)
+
+    D = value >> bits
+    m = value & ((1 << bits) - 1)
+    A = (m & 1) * 0x1ff
+    x = m >> 1
+
+    if trits:
+        C = (0, 204, 93, 44, 22, 11, 5)[bits]
+        B = (0, 0, 0b100010110 * x, x << 7 | x << 2 | x, x << 6 | x, x << 5 | x >> 2, x << 4 | x >> 4)[bits]
+
+    else:
+        C = (0, 113, 54, 26, 13, 6)[bits]
+        B = (0, 0, 0b100001100 * x, x << 7 | x << 1 | x >> 1, x << 6 | x >> 1, x << 5 | x >> 3)[bits]
+
+    return (A & 0x80) | ((D * C + B) ^ A) >> 2
+
+
+def unquantizeWeight(levels, value):
+    trits, quints, bits = QUANT_MODES[levels]
+
+    if not (trits or quints):
+        # Bit replication up to 6 bits
+        w = 0
+        for shift in range(6 - bits, -bits, -bits):
+            w |= value << shift if shift >= 0 else value >> -shift
+
+    elif not bits:
+        return value * (32 if trits else 16)
+
+    else:
+        D = value >> bits
+        m = value & ((1 << bits) - 1)
+        A = (m & 1) * 0x7f
+
+        if trits:
+            C = (0, 50, 23, 11)[bits]
+            B = (0, 0, 0b1000101 * (m >> 1), (m << 4 | m >> 1) & 0b1100011)[bits]
+
+        else:
+            C = (0, 28, 13)[bits]
+            B = (0, 0, 0b1000010 * (m >> 1))[bits]
+
+        w = (A & 0x20) | ((D * C + B) ^ A) >> 2
+
+    return w + 1 if w > 32 else w
+
+
+COLOR_UNQUANT = {levels: [unquantizeColor(levels, v) for v in range(levels)] for levels in COLOR_RANGES}
+WEIGHT_UNQUANT = {levels: [unquantizeWeight(levels, v) for v in range(levels)] for levels in set(WEIGHT_RANGES) if levels}
+
+
+################################################################
+# Block modes
+################################################################
+
+def decodeBlockMode(mode):
+    """
+    Returns (gridWidth, gridHeight, dualPlane, weightLevels, weightBits) or None if the mode is reserved.
+    """
+    H = (mode >> 9) & 1
+    D = (mode >> 10) & 1
+    A = (mode >> 5) & 3
+
+    if mode & 3:
+        R = ((mode >> 4) & 1) | (mode & 3) << 1
+        B = (mode >> 7) & 3
+        layout = (mode >> 2) & 3
+
+        if layout == 0:
+            width, height = B + 4, A + 2
+
+        elif layout == 1:
+            width, height = B + 8, A + 2
+
+        elif layout == 2:
+            width, height = A + 2, B + 8
+
+        elif mode & 0x100:
+            width, height = (B & 1) + 2, A + 2
+
+        else:
+            width, height = A + 2, (B & 1) + 6
+
+    else:
+        if not mode & 0xf:
+            return None
+
+        R = ((mode >> 4) & 1) | ((mode >> 2) & 3) << 1
+        layout = (mode >> 7) & 3
+
+        if layout == 0:
+            width, height = 12, A + 2
+
+        elif layout == 1:
+            width, height = A + 2, 12
+
+        elif layout == 2:
+            width, height = A + 6, ((mode >> 9) & 3) + 6
+            D = H = 0
+
+        elif mode & 0x40:
+            return None
+
+        elif mode & 0x20:
+            width, height = 10, 6
+
+        else:
+            width, height = 6, 10
+
+    levels = WEIGHT_RANGES[R | H << 3]
+    numWeights = width * height * (D + 1)
+
+    if numWeights > 64:
+        return None
+
+    weightBits = getISEBitCount(numWeights, levels)
+    if not 24 <= weightBits <= 96:
+        return None
+
+    return width, height, D, levels, weightBits
+
+
+BLOCK_MODES = [decodeBlockMode(mode) for mode in range(2048)]
+
+
+################################################################
+# Per-footprint tables, built on demand in each process
+################################################################
+
+infillCache = {}
+partitionCache = {}
+
+
+def getInfillTable(blkWidth, blkHeight, gridWidth, gridHeight):
+    """
+    Returns, for each texel, the (gridIndex, weight) pairs of the bilinear weight infill.
+    """
+    key = (blkWidth, blkHeight, gridWidth, gridHeight)
+    if key in infillCache:
+        return infillCache[key]
+
+    ds = (1024 + blkWidth // 2) // (blkWidth - 1)
+    dt = (1024 + blkHeight // 2) // (blkHeight - 1)
+
+    table = []
+    for t in range(blkHeight):
+        for s in range(blkWidth):
+            gs = (ds * s * (gridWidth - 1) + 32) >> 6
+            gt = (dt * t * (gridHeight - 1) + 32) >> 6
+            fs = gs & 0xf
+            ft = gt & 0xf
+            v = (gs >> 4) + (gt >> 4) * gridWidth
+
+            w11 = (fs * ft + 8) >> 4
+            w10 = ft - w11
+            w01 = fs - w11
+            w00 = 16 - fs - ft + w11
+
+            table.append(tuple((v + offset, w) for offset, w in
+                               ((0, w00), (1, w01), (gridWidth, w10), (gridWidth + 1, w11)) if w))
+
+    infillCache[key] = table
+    return table
+
+
+def getPartitionTable(blkWidth, blkHeight, numPartitions, index):
+    key = (blkWidth, blkHeight, numPartitions, index)
+    if key in partitionCache:
+        return partitionCache[key]
+
+    seed = index | (numPartitions - 1) << 10
+
+    rnum = seed
+    rnum ^= rnum >> 15
+    rnum = (rnum - (rnum << 17)) & 0xffffffff
+    rnum = (rnum + (rnum << 7)) & 0xffffffff
+    rnum = (rnum + (rnum << 4)) & 0xffffffff
+    rnum ^= rnum >> 5
+    rnum = (rnum + (rnum << 16)) & 0xffffffff
+    rnum ^= rnum >> 7
+    rnum ^= rnum >> 3
+    rnum = (rnum ^ (rnum << 6)) & 0xffffffff
+    rnum ^= rnum >> 17
+
+    seeds = [((rnum >> (i * 4)) & 0xf) ** 2 for i in range(8)]
+
+    sh = (4 if seed & 2 else 5, 6 if numPartitions == 3 else 5)
+    if seed & 1:
+        seeds = [s >> sh[i % 2] for i, s in enumerate(seeds)]
+
+    else:
+        seeds = [s >> sh[1 - i % 2] for i, s in enumerate(seeds)]
+
+    scale = 2 if blkWidth * blkHeight < 31 else 1
+
+    table = []
+    for y in range(blkHeight):
+        for x in range(blkWidth):
+            x_ = x * scale
+            y_ = y * scale
+
+            a = (seeds[0] * x_ + seeds[1] * y_ + (rnum >> 14)) & 0x3f
+            b = (seeds[2] * x_ + seeds[3] * y_ + (rnum >> 10)) & 0x3f
+            c = (seeds[4] * x_ + seeds[5] * y_ + (rnum >> 6)) & 0x3f if numPartitions > 2 else 0
+            d = (seeds[6] * x_ + seeds[7] * y_ + (rnum >> 2)) & 0x3f if numPartitions > 3 else 0
+
+            if a >= b and a >= c and a >= d:
+                table.append(0)
+
+            elif b >= c and b >= d:
+                table.append(1)
+
+            elif c >= d:
+                table.append(2)
+
+            else:
+                table.append(3)
+
+    partitionCache[key] = tuple(table)
+    return partitionCache[key]
+
+
+################################################################
+# Block decoding
+################################################################
+
+def clamp(v):
+    return 0 if v < 0 else 255 if v > 255 else v
+
+
+def bitTransferSigned(a, b):
+    b = (b >> 1) | (a & 0x80)
+    a = (a >> 1) & 0x3f
+    if a & 0x20:
+        a -= 0x40
+
+    return a, b
+
+
+def blueContract(r, g, b, a):
+    return (r + b) >> 1, (g + b) >> 1, b, a
+
+
+def decodeEndpoints(cem, v):
+    """
+    Returns the two RGBA8 endpoints of an LDR color endpoint mode, or None for HDR modes.
+    """
+    if cem == 0:
+        return (v[0], v[0], v[0], 255), (v[1], v[1], v[1], 255)
+
+    elif cem == 1:
+        L0 = (v[0] >> 2) | (v[1] & 0xc0)
+        L1 = min(L0 + (v[1] & 0x3f), 255)
+        return (L0, L0, L0, 255), (L1, L1, L1, 255)
+
+    elif cem == 4:
+        return (v[0], v[0], v[0], v[2]), (v[1], v[1], v[1], v[3])
+
+    elif cem == 5:
+        v1, v0 = bitTransferSigned(v[1], v[0])
+        v3, v2 = bitTransferSigned(v[3], v[2])
+        return ((v0, v0, v0, v2),
+                (clamp(v0 + v1), clamp(v0 + v1), clamp(v0 + v1), clamp(v2 + v3)))
+
+    elif cem in (6, 10):
+        a0, a1 = (v[4], v[5]) if cem == 10 else (255, 255)
+        return ((v[0] * v[3] >> 8, v[1] * v[3] >> 8, v[2] * v[3] >> 8, a0),
+                (v[0], v[1], v[2], a1))
+
+    elif cem in (8, 12):
+        a0, a1 = (v[6], v[7]) if cem == 12 else (255, 255)
+        if v[0] + v[2] + v[4] <= v[1] + v[3] + v[5]:
+            return (v[0], v[2], v[4], a0), (v[1], v[3], v[5], a1)
+
+        return blueContract(v[1], v[3], v[5], a1), blueContract(v[0], v[2], v[4], a0)
+
+    elif cem in (9, 13):
+        v1, v0 = bitTransferSigned(v[1], v[0])
+        v3, v2 = bitTransferSigned(v[3], v[2])
+        v5, v4 = bitTransferSigned(v[5], v[4])
+
+        if cem == 13:
+            v7, v6 = bitTransferSigned(v[7], v[6])
+            a0, a1 = v6, v6 + v7
+
+        else:
+            a0 = a1 = 255
+
+        # The sums are only clamped after the blue contraction
+        e0 = (v0, v2, v4, a0)
+        e1 = (v0 + v1, v2 + v3, v4 + v5, a1)
+
+        if v1 + v3 + v5 < 0:
+            e0, e1 = blueContract(*e1), blueContract(*e0)
+
+        return tuple(map(clamp, e0)), tuple(map(clamp, e1))
+
+    return None
+
+
+def reverseBits128(v):
+    return int('{:0128b}'.format(v)[::-1], 2)
+
+
+def decode_block(block, blkWidth, blkHeight, srgb):
+    """
+    Decodes a 128-bit block (as an integer) to blkWidth * blkHeight RGBA8 texels.
+    """
+    numTexels = blkWidth * blkHeight
+
+    if block & 0x1ff == 0x1fc:
+        # Void-extent block
+        if block & 0x200:
+            return ERROR_COLOR * numTexels  # HDR
+
+        return bytes(((block >> (64 + 16 * i)) & 0xffff) >> 8 for i in range(4)) * numTexels
+
+    blockMode = BLOCK_MODES[block & 0x7ff]
+    if blockMode is None:
+        return ERROR_COLOR * numTexels
+
+    gridWidth, gridHeight, dualPlane, weightLevels, weightBits = blockMode
+    numPartitions = ((block >> 11) & 3) + 1
+
+    if gridWidth > blkWidth or gridHeight > blkHeight or (dualPlane and numPartitions == 4):
+        return ERROR_COLOR * numTexels
+
+    # Color endpoint modes
+    if numPartitions == 1:
+        cems = [(block >> 13) & 0xf]
+        colorStart = 17
+        extraBits = 0
+
+    else:
+        cemField = (block >> 23) & 0x3f
+        colorStart = 29
+
+        if not cemField & 3:
+            cems = [cemField >> 2] * numPartitions
+            extraBits = 0
+
+        else:
+            extraBits = 3 * numPartitions - 4
+            field = cemField >> 2 | ((block >> (128 - weightBits - extraBits)) & ((1 << extraBits) - 1)) << 4
+            base = (cemField & 3) - 1
+
+            cems = [((base + ((field >> i) & 1)) << 2) | ((field >> (numPartitions + 2 * i)) & 3)
+                    for i in range(numPartitions)]
+
+    colorEnd = 128 - weightBits - extraBits
+    if dualPlane:
+        colorEnd -= 2
+        plane2Component = (block >> colorEnd) & 3
+
+    numColorValues = sum(((cem >> 2) + 1) * 2 for cem in cems)
+    if numColorValues > 18:
+        return ERROR_COLOR * numTexels
+
+    # Pick the largest range that fits; bits past the sequence read as zero
+    for colorLevels in COLOR_RANGES:
+        colorBits = getISEBitCount(numColorValues, colorLevels)
+        if colorBits <= colorEnd - colorStart:
+            break
+
+    else:
+        return ERROR_COLOR * numTexels
+
+    unquant = COLOR_UNQUANT[colorLevels]
+    colorValues = [unquant[v] for v in
+                   decodeISE((block >> colorStart) & ((1 << colorBits) - 1), numColorValues, colorLevels)]
+
+    endpoints = []
+    pos = 0
+    for cem in cems:
+        numValues = ((cem >> 2) + 1) * 2
+        ep = decodeEndpoints(cem, colorValues[pos:pos + numValues])
+        if ep is None:
+            return ERROR_COLOR * numTexels
+
+        if srgb:
+            # The alpha channel is always expanded as UNORM
+            endpoints.append(([c << 8 | 0x80 for c in ep[0][:3]] + [ep[0][3] * 0x101],
+                              [c << 8 | 0x80 for c in ep[1][:3]] + [ep[1][3] * 0x101]))
+
+        else:
+            endpoints.append(([c * 0x101 for c in ep[0]], [c * 0x101 for c in ep[1]]))
+
+        pos += numValues
+
+    # Weights, stored bit-reversed from the top of the block
+    numWeights = gridWidth * gridHeight * (dualPlane + 1)
+    wunquant = WEIGHT_UNQUANT[weightLevels]
+    weights = [wunquant[v] for v in
+               decodeISE(reverseBits128(block) & ((1 << weightBits) - 1), numWeights, weightLevels)]
+
+    infill = getInfillTable(blkWidth, blkHeight, gridWidth, gridHeight)
+
+    if numPartitions > 1:
+        partitions = getPartitionTable(blkWidth, blkHeight, numPartitions, (block >> 13) & 0x3ff)
+
+    else:
+        partitions = (0,) * numTexels
+
+    out = bytearray(numTexels * 4)
+
+    if dualPlane:
+        plane1 = weights[0::2]
+        plane2 = weights[1::2]
+
+    else:
+        plane1 = weights
+
+    for i in range(numTexels):
+        e0, e1 = endpoints[partitions[i]]
+        w = (sum(plane1[j] * f for j, f in infill[i]) + 8) >> 4
+
+        texel = [((e0[c] * (64 - w) + e1[c] * w + 32) >> 6) for c in range(4)]
+
+        if dualPlane:
+            w = (sum(plane2[j] * f for j, f in infill[i]) + 8) >> 4
+            c = plane2Component
+            texel[c] = (e0[c] * (64 - w) + e1[c] * w + 32) >> 6
+
+        out[i * 4:i * 4 + 4] = bytes(c >> 8 for c in texel)
+
+    return bytes(out)
+
+
+def decodeRows(data, width, height, blkWidth, blkHeight, srgb, out=None):
+    """
+    Decodes whole rows of blocks to width * height RGBA8 texels.
+    If out is given, the texels are written to it and out is returned.
+    """
+    output = bytearray(width * height * 4) if out is None else out
+    if len(output) < width * height * 4:
+        raise ValueError("Output buffer is too small")
+
+    blocksPerRow = (width + blkWidth - 1) // blkWidth
+
+    for by in range((height + blkHeight - 1) // blkHeight):
+        rows = min(blkHeight, height - by * blkHeight)
+
+        for bx in range(blocksPerRow):
+            pos = (by * blocksPerRow + bx) * 16
+            texels = decode_block(int.from_bytes(data[pos:pos + 16], 'little'), blkWidth, blkHeight, srgb)
+
+            cols = min(blkWidth, width - bx * blkWidth) * 4
+            pos = (by * blkHeight * width + bx * blkWidth) * 4
+
+            for j in range(rows):
+                output[pos:pos + cols] = texels[j * blkWidth * 4:j * blkWidth * 4 + cols]
+                pos += width * 4
+
+    return bytes(output) if out is None else out
+
+
+def decompressASTC(data, width, height, blkWidth, blkHeight, SRGB=0, numWorkers=None):
+    """
+    Decodes the texture in bands of block rows across a process pool; small textures are decoded in-process.
+    """
+    return parallel.decompress('ASTC', data, width, height, blkWidth, blkHeight, SRGB, numWorkers=numWorkers)
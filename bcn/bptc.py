@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# BC6H/BC7 Decompressor
+# Version 0.1
+# Copyright © 2018 MasterVermilli0n / AboodXD
+
+# bptc.py
+# Mode, partition and anchor tables shared by the BC6H and BC7 decoders.
+
+################################################################
+################################################################
+
+import struct
+
+
+# Interpolation weights, indexed by the number of index bits
+BPTC_WEIGHTS = (
+    (), (),
+    (0, 21, 43, 64),
+    (0, 9, 18, 27, 37, 46, 55, 64),
+    (0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64),
+)
+
+# Subset of each texel for the 64 partitions of two and three subsets
+BPTC_PARTITIONS2 = (
+    "0011001100110011", "0001000100010001", "0111011101110111", "0001001100110111",
+    "0000000100010011", "0011011101111111", "0001001101111111", "0000000100110111",
+    "0000000000010011", "0011011111111111", "0000000101111111", "0000000000010111",
+    "0001011111111111", "0000000011111111", "0000111111111111", "0000000000001111",
+    "0000100011101111", "0111000100000000", "0000000010001110", "0111001100010000",
+    "0011000100000000", "0000100011001110", "0000000010001100", "0111001100110001",
+    "0011000100010000", "0000100010001100", "0110011001100110", "0011011001101100",
+    "0001011111101000", "0000111111110000", "0111000110001110", "0011100110011100",
+    "0101010101010101", "0000111100001111", "0101101001011010", "0011001111001100",
+    "0011110000111100", "0101010110101010", "0110100101101001", "0101101010100101",
+    "0111001111001110", "0001001111001000", "0011001001001100", "0011101111011100",
+    "0110100110010110", "0011110011000011", "0110011010011001", "0000011001100000",
+    "0100111001000000", "0010011100100000", "0000001001110010", "0000010011100100",
+    "0110110010010011", "0011011011001001", "0110001110011100", "0011100111000110",
+    "0110110011001001", "0110001100111001", "0111111010000001", "0001100011100111",
+    "0000111100110011", "0011001111110000", "0010001011101110", "0100010001110111",
+)
+
+BPTC_PARTITIONS3 = (
+    "0011001102212222", "0001001122112221", "0000200122112211", "0222002200110111",
+    "0000000011221122", "0011001100220022", "0022002211111111", "0011001122112211",
+    "0000000011112222", "0000111111112222", "0000111122222222", "0012001200120012",
+    "0112011201120112", "0122012201220122", "0011011211221222", "0011200122002220",
+    "0001001101121122", "0111001120012200", "0000112211221122", "0022002200221111",
+    "0111011102220222", "0001000122212221", "0000001101220122", "0000110022102210",
+    "0122012200110000", "0012001211222222", "0110122112210110", "0000011012211221",
+    "0022110211020022", "0110011020022222", "0011012201220011", "0000200022112221",
+    "0000000211221222", "0222002200120011", "0011001200220222", "0120012001200120",
+    "0000111122220000", "0120120120120120", "0120201212010120", "0011220011220011",
+    "0011112222000011", "0101010122222222", "0000000021212121", "0022112200221122",
+    "0022001100220011", "0220122102201221", "0101222222220101", "0000212121212121",
+    "0101010101012222", "0222011102220111", "0002111200021112", "0000211221122112",
+    "0222011101110222", "0002111211120002", "0110011001102222", "0000000021122112",
+    "0110011022222222", "0022001100110022", "0022112211220022", "0000000000002112",
+    "0002000100020001", "0222122202221222", "0101222222222222", "0111201122012220",
+)
+
+# Index of the second (and third) subset's anchor texel, per partition
+BPTC_ANCHORS2 = (
+    15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15,
+    15, 2, 8, 2, 2, 8, 8, 15, 2, 8, 2, 2, 8, 8, 2, 2,
+    15, 15, 6, 8, 2, 8, 15, 15, 2, 8, 2, 2, 2, 15, 15, 6,
+    6, 2, 6, 8, 15, 15, 2, 2, 15, 15, 15, 15, 15, 2, 2, 15,
+)
+
+BPTC_ANCHORS3_2 = (
+    3, 3, 15, 15, 8, 3, 15, 15, 8, 8, 6, 6, 6, 5, 3, 3,
+    3, 3, 8, 15, 3, 3, 6, 10, 5, 8, 8, 6, 8, 5, 15, 15,
+    8, 15, 3, 5, 6, 10, 8, 15, 15, 3, 15, 5, 15, 15, 15, 15,
+    3, 15, 5, 5, 5, 8, 5, 10, 5, 10, 8, 13, 15, 12, 3, 3,
+)
+
+BPTC_ANCHORS3_3 = (
+    15, 8, 8, 3, 15, 15, 3, 8, 15, 15, 15, 15, 15, 15, 15, 8,
+    15, 8, 15, 3, 15, 8, 15, 8, 3, 15, 6, 10, 15, 15, 10, 8,
+    15, 3, 15, 10, 10, 8, 9, 10, 6, 15, 8, 15, 3, 6, 6, 8,
+    15, 3, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 3, 15, 15, 8,
+)
+
+
+def getPartitionTables():
+    """
+    Returns, per number of subsets, the texel subsets and anchor flags of every partition.
+    """
+    subsets = {1: [(0,) * 16] * 64}
+    anchors = {1: [(1,) + (0,) * 15] * 64}
+
+    for numSubsets, partitions, anchorTables in ((2, BPTC_PARTITIONS2, (BPTC_ANCHORS2,)),
+                                                 (3, BPTC_PARTITIONS3, (BPTC_ANCHORS3_2, BPTC_ANCHORS3_3))):
+        subsets[numSubsets] = [tuple(map(int, partition)) for partition in partitions]
+        anchors[numSubsets] = []
+
+        for i in range(64):
+            anchorTexels = {0} | {table[i] for table in anchorTables}
+            anchors[numSubsets].append(tuple(int(k in anchorTexels) for k in range(16)))
+
+    return subsets, anchors
+
+
+BPTC_SUBSETS, BPTC_ANCHORS = getPartitionTables()
+
+# numSubsets, partitionBits, rotationBits, indexSelectionBits, colorBits,
+# alphaBits, endpointPBits, sharedPBits, indexBits, index2Bits
+BC7_MODES = (
+    (3, 4, 0, 0, 4, 0, 1, 0, 3, 0),
+    (2, 6, 0, 0, 6, 0, 0, 1, 3, 0),
+    (3, 6, 0, 0, 5, 0, 0, 0, 2, 0),
+    (2, 6, 0, 0, 7, 0, 1, 0, 2, 0),
+    (1, 0, 2, 1, 5, 6, 0, 0, 2, 3),
+    (1, 0, 2, 0, 7, 8, 0, 0, 2, 2),
+    (1, 0, 0, 0, 7, 7, 1, 0, 4, 0),
+    (2, 6, 0, 0, 5, 5, 1, 0, 2, 0),
+)
+
+# Endpoint fields of BC6H, in the order [rw, rx, ry, rz, gw, gx, gy, gz, bw, bx, by, bz]
+rw, rx, ry, rz, gw, gx, gy, gz, bw, bx, by, bz = range(12)
+
+# mode: (transformed, partitioned, endpointBits, deltaBits, fields)
+# fields lists the (field, numBits, shift) runs of the header in the order they are read
+BC6H_MODES = {
+    0x00: (1, 1, 10, (5, 5, 5), (
+        (gy, 1, 4), (by, 1, 4), (bz, 1, 4), (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 5, 0), (gz, 1, 4),
+        (gy, 4, 0), (gx, 5, 0), (bz, 1, 0), (gz, 4, 0), (bx, 5, 0), (bz, 1, 1), (by, 4, 0), (ry, 5, 0),
+        (bz, 1, 2), (rz, 5, 0), (bz, 1, 3))),
+    0x01: (1, 1, 7, (6, 6, 6), (
+        (gy, 1, 5), (gz, 1, 4), (gz, 1, 5), (rw, 7, 0), (bz, 1, 0), (bz, 1, 1), (by, 1, 4), (gw, 7, 0),
+        (by, 1, 5), (bz, 1, 2), (gy, 1, 4), (bw, 7, 0), (bz, 1, 3), (bz, 1, 5), (bz, 1, 4), (rx, 6, 0),
+        (gy, 4, 0), (gx, 6, 0), (gz, 4, 0), (bx, 6, 0), (by, 4, 0), (ry, 6, 0), (rz, 6, 0))),
+    0x02: (1, 1, 11, (5, 4, 4), (
+        (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 5, 0), (rw, 1, 10), (gy, 4, 0), (gx, 4, 0), (gw, 1, 10),
+        (bz, 1, 0), (gz, 4, 0), (bx, 4, 0), (bw, 1, 10), (bz, 1, 1), (by, 4, 0), (ry, 5, 0), (bz, 1, 2),
+        (rz, 5, 0), (bz, 1, 3))),
+    0x06: (1, 1, 11, (4, 5, 4), (
+        (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 4, 0), (rw, 1, 10), (gz, 1, 4), (gy, 4, 0), (gx, 5, 0),
+        (gw, 1, 10), (gz, 4, 0), (bx, 4, 0), (bw, 1, 10), (bz, 1, 1), (by, 4, 0), (ry, 4, 0), (bz, 1, 0),
+        (bz, 1, 2), (rz, 4, 0), (gy, 1, 4), (bz, 1, 3))),
+    0x0a: (1, 1, 11, (4, 4, 5), (
+        (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 4, 0), (rw, 1, 10), (by, 1, 4), (gy, 4, 0), (gx, 4, 0),
+        (gw, 1, 10), (bz, 1, 0), (gz, 4, 0), (bx, 5, 0), (bw, 1, 10), (by, 4, 0), (ry, 4, 0), (bz, 1, 1),
+        (bz, 1, 2), (rz, 4, 0), (bz, 1, 4), (bz, 1, 3))),
+    0x0e: (1, 1, 9, (5, 5, 5), (
+        (rw, 9, 0), (by, 1, 4), (gw, 9, 0), (gy, 1, 4), (bw, 9, 0), (bz, 1, 4), (rx, 5, 0), (gz, 1, 4),
+        (gy, 4, 0), (gx, 5, 0), (bz, 1, 0), (gz, 4, 0), (bx, 5, 0), (bz, 1, 1), (by, 4, 0), (ry, 5, 0),
+        (bz, 1, 2), (rz, 5, 0), (bz, 1, 3))),
+    0x12: (1, 1, 8, (6, 5, 5), (
+        (rw, 8, 0), (gz, 1, 4), (by, 1, 4), (gw, 8, 0), (bz, 1, 2), (gy, 1, 4), (bw, 8, 0), (bz, 1, 3),
+        (bz, 1, 4), (rx, 6, 0), (gy, 4, 0), (gx, 5, 0), (bz, 1, 0), (gz, 4, 0), (bx, 5, 0), (bz, 1, 1),
+        (by, 4, 0), (ry, 6, 0), (rz, 6, 0))),
+    0x16: (1, 1, 8, (5, 6, 5), (
+        (rw, 8, 0), (bz, 1, 0), (by, 1, 4), (gw, 8, 0), (gy, 1, 5), (gy, 1, 4), (bw, 8, 0), (gz, 1, 5),
+        (bz, 1, 4), (rx, 5, 0), (gz, 1, 4), (gy, 4, 0), (gx, 6, 0), (gz, 4, 0), (bx, 5, 0), (bz, 1, 1),
+        (by, 4, 0), (ry, 5, 0), (bz, 1, 2), (rz, 5, 0), (bz, 1, 3))),
+    0x1a: (1, 1, 8, (5, 5, 6), (
+        (rw, 8, 0), (bz, 1, 1), (by, 1, 4), (gw, 8, 0), (by, 1, 5), (gy, 1, 4), (bw, 8, 0), (bz, 1, 5),
+        (bz, 1, 4), (rx, 5, 0), (gz, 1, 4), (gy, 4, 0), (gx, 5, 0), (bz, 1, 0), (gz, 4, 0), (bx, 6, 0),
+        (by, 4, 0), (ry, 5, 0), (bz, 1, 2), (rz, 5, 0), (bz, 1, 3))),
+    0x1e: (0, 1, 6, (6, 6, 6), (
+        (rw, 6, 0), (gz, 1, 4), (bz, 1, 0), (bz, 1, 1), (by, 1, 4), (gw, 6, 0), (gy, 1, 5), (by, 1, 5),
+        (bz, 1, 2), (gy, 1, 4), (bw, 6, 0), (gz, 1, 5), (bz, 1, 3), (bz, 1, 5), (bz, 1, 4), (rx, 6, 0),
+        (gy, 4, 0), (gx, 6, 0), (gz, 4, 0), (bx, 6, 0), (by, 4, 0), (ry, 6, 0), (rz, 6, 0))),
+    0x03: (0, 0, 10, (10, 10, 10), (
+        (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 10, 0), (gx, 10, 0), (bx, 10, 0))),
+    0x07: (1, 0, 11, (9, 9, 9), (
+        (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 9, 0), (rw, 1, 10), (gx, 9, 0), (gw, 1, 10), (bx, 9, 0),
+        (bw, 1, 10))),
+    0x0b: (1, 0, 12, (8, 8, 8), (
+        (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 8, 0), (rw, 1, 11), (rw, 1, 10), (gx, 8, 0), (gw, 1, 11),
+        (gw, 1, 10), (bx, 8, 0), (bw, 1, 11), (bw, 1, 10))),
+    0x0f: (1, 0, 16, (4, 4, 4), (
+        (rw, 10, 0), (gw, 10, 0), (bw, 10, 0), (rx, 4, 0), (rw, 1, 15), (rw, 1, 14), (rw, 1, 13), (rw, 1, 12),
+        (rw, 1, 11), (rw, 1, 10), (gx, 4, 0), (gw, 1, 15), (gw, 1, 14), (gw, 1, 13), (gw, 1, 12), (gw, 1, 11),
+        (gw, 1, 10), (bx, 4, 0), (bw, 1, 15), (bw, 1, 14), (bw, 1, 13), (bw, 1, 12), (bw, 1, 11), (bw, 1, 10))),
+}
+
+
+def half_to_unorm8(h):
+    f, = struct.unpack('<e', struct.pack('<H', h))
+    if not f > 0:  # Also catches NaN
+        return 0
+
+    elif f >= 1:
+        return 255
+
+    return int(f * 255 + 0.5)
+
+
+HALF_TO_UNORM8 = bytes(half_to_unorm8(h) for h in range(0x10000))
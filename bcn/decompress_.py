@@ -11,6 +11,10 @@
 ################################################################
 ################################################################
 
+import struct
+
+from .bptc import BPTC_WEIGHTS, BPTC_SUBSETS, BPTC_ANCHORS, BC7_MODES, BC6H_MODES, HALF_TO_UNORM8
+
 
 def ToSigned8(v):
     if v > 255:
@@ -54,279 +58,414 @@ def EXP4TO8(col):
     return col | col << 4
 
 
-def dxt135_decode_imageblock(pixdata, img_block_src, i, j, dxt_type):
+def dxt135_decode_imageblock(pixdata, img_block_src, dxt_type):
+    """
+    Decodes the 16 texels of a color block at once.
+    Returns a list of (R, G, B, A) tuples in row-major order.
+    """
     color0 = pixdata[img_block_src] | (pixdata[img_block_src + 1] << 8)
     color1 = pixdata[img_block_src + 2] | (pixdata[img_block_src + 3] << 8)
     bits = (pixdata[img_block_src + 4] | (pixdata[img_block_src + 5] << 8) |
             (pixdata[img_block_src + 6] << 16) | (pixdata[img_block_src + 7] << 24))
 
-    bit_pos = 2 * (j * 4 + i)
-    code = (bits >> bit_pos) & 3
+    R0, G0, B0 = EXP5TO8R(color0), EXP6TO8G(color0), EXP5TO8B(color0)
+    R1, G1, B1 = EXP5TO8R(color1), EXP6TO8G(color1), EXP5TO8B(color1)
 
-    ACOMP = 255
-    if code == 0:
-        RCOMP = EXP5TO8R(color0)
-        GCOMP = EXP6TO8G(color0)
-        BCOMP = EXP5TO8B(color0)
+    palette = [(R0, G0, B0, 255), (R1, G1, B1, 255)]
 
-    elif code == 1:
-        RCOMP = EXP5TO8R(color1)
-        GCOMP = EXP6TO8G(color1)
-        BCOMP = EXP5TO8B(color1)
+    if color0 > color1:
+        palette.append(((R0 * 2 + R1) // 3, (G0 * 2 + G1) // 3, (B0 * 2 + B1) // 3, 255))
 
-    elif code == 2:
-        if color0 > color1:
-            RCOMP = ((EXP5TO8R(color0) * 2 + EXP5TO8R(color1)) // 3)
-            GCOMP = ((EXP6TO8G(color0) * 2 + EXP6TO8G(color1)) // 3)
-            BCOMP = ((EXP5TO8B(color0) * 2 + EXP5TO8B(color1)) // 3)
+    else:
+        palette.append(((R0 + R1) // 2, (G0 + G1) // 2, (B0 + B1) // 2, 255))
 
-        else:
-            RCOMP = ((EXP5TO8R(color0) + EXP5TO8R(color1)) // 2)
-            GCOMP = ((EXP6TO8G(color0) + EXP6TO8G(color1)) // 2)
-            BCOMP = ((EXP5TO8B(color0) + EXP5TO8B(color1)) // 2)
+    if dxt_type > 1 or color0 > color1:
+        palette.append(((R0 + R1 * 2) // 3, (G0 + G1 * 2) // 3, (B0 + B1 * 2) // 3, 255))
 
-    elif code == 3:
-        if dxt_type > 1 or color0 > color1:
-            RCOMP = ((EXP5TO8R(color0) + EXP5TO8R(color1) * 2) // 3)
-            GCOMP = ((EXP6TO8G(color0) + EXP6TO8G(color1) * 2) // 3)
-            BCOMP = ((EXP5TO8B(color0) + EXP5TO8B(color1) * 2) // 3)
+    elif dxt_type == 1:
+        palette.append((0, 0, 0, 0))
 
-        else:
-            RCOMP = 0
-            GCOMP = 0
-            BCOMP = 0
+    else:
+        palette.append((0, 0, 0, 255))
 
-            if dxt_type == 1:
-                ACOMP = 0
- 
-    return ACOMP, RCOMP, GCOMP, BCOMP
+    return [palette[(bits >> (2 * k)) & 3] for k in range(16)]
 
 
-def dxt5_decode_alphablock(pixdata, blksrc, i, j):
+def dxt5_decode_alphablock(pixdata, blksrc):
+    """
+    Decodes the 16 values of an alpha block at once.
+    """
     alpha0 = pixdata[blksrc]
     alpha1 = pixdata[blksrc + 1]
 
-    bits = (pixdata[blksrc] | (pixdata[blksrc + 1] << 8) |
-            (pixdata[blksrc + 2] << 16) | (pixdata[blksrc + 3] << 24) |
-            (pixdata[blksrc + 4] << 32) | (pixdata[blksrc + 5] << 40) |
-            (pixdata[blksrc + 6] << 48) | (pixdata[blksrc + 7] << 56)) >> 16
+    bits = (pixdata[blksrc + 2] | (pixdata[blksrc + 3] << 8) |
+            (pixdata[blksrc + 4] << 16) | (pixdata[blksrc + 5] << 24) |
+            (pixdata[blksrc + 6] << 32) | (pixdata[blksrc + 7] << 40))
+
+    palette = [alpha0, alpha1]
 
-    for y in range(4):
-        for x in range(4):
-            if (x, y) == (i, j):
-                code = bits & 0x07
-                break
+    if alpha0 > alpha1:
+        for code in range(2, 8):
+            palette.append((alpha0 * (8 - code) + (alpha1 * (code - 1))) // 7)
 
-            bits >>= 3
+    else:
+        for code in range(2, 6):
+            palette.append((alpha0 * (6 - code) + (alpha1 * (code - 1))) // 5)
 
-    if code == 0:
-        ACOMP = alpha0
+        palette += [0, 255]
 
-    elif code == 1:
-        ACOMP = alpha1
+    return [palette[(bits >> (3 * k)) & 0x07] for k in range(16)]
 
-    elif alpha0 > alpha1:
-        ACOMP = (alpha0 * (8 - code) + (alpha1 * (code - 1))) // 7
 
-    elif code < 6:
-        ACOMP = (alpha0 * (6 - code) + (alpha1 * (code - 1))) // 5
+def dxt5_decode_alphablock_signed(pixdata, blksrc):
+    """
+    Decodes the 16 values of a signed alpha block at once.
+    """
+    alpha0 = pixdata[blksrc]
+    alpha1 = pixdata[blksrc + 1]
 
-    elif code == 6:
-        ACOMP = 0
+    bits = (pixdata[blksrc + 2] | (pixdata[blksrc + 3] << 8) |
+            (pixdata[blksrc + 4] << 16) | (pixdata[blksrc + 5] << 24) |
+            (pixdata[blksrc + 6] << 32) | (pixdata[blksrc + 7] << 40))
+
+    sAlpha0 = ToSigned8(alpha0)
+    sAlpha1 = ToSigned8(alpha1)
+
+    palette = [alpha0, alpha1]
+
+    if sAlpha0 > sAlpha1:
+        for code in range(2, 8):
+            palette.append(ToUnsigned8((sAlpha0 * (8 - code) + (sAlpha1 * (code - 1))) // 7))
 
     else:
-        ACOMP = 255
+        for code in range(2, 6):
+            palette.append(ToUnsigned8((sAlpha0 * (6 - code) + (sAlpha1 * (code - 1))) // 5))
 
-    return ACOMP
+        palette += [0x80, 0x7f]
 
+    return [palette[(bits >> (3 * k)) & 0x07] for k in range(16)]
 
-def dxt5_decode_alphablock_signed(pixdata, blksrc, i, j):
-    alpha0 = pixdata[blksrc]
-    alpha1 = pixdata[blksrc + 1]
 
-    bits = (pixdata[blksrc] | (pixdata[blksrc + 1] << 8) |
-            (pixdata[blksrc + 2] << 16) | (pixdata[blksrc + 3] << 24) |
-            (pixdata[blksrc + 4] << 32) | (pixdata[blksrc + 5] << 40) |
-            (pixdata[blksrc + 6] << 48) | (pixdata[blksrc + 7] << 56)) >> 16
+def decode_rgba_dxt1(pixdata, blksrc):
+    return [bytes(texel) for texel in dxt135_decode_imageblock(pixdata, blksrc, 1)]
 
-    for y in range(4):
-        for x in range(4):
-            if (x, y) == (i, j):
-                code = bits & 0x07
-                break
 
-            bits >>= 3
+def decode_rgba_dxt3(pixdata, blksrc):
+    colors = dxt135_decode_imageblock(pixdata, blksrc + 8, 2)
+    texels = []
 
-    if code == 0:
-        ACOMP = alpha0
+    for k in range(16):
+        anibble = (pixdata[blksrc + k // 2] >> (4 * (k & 1))) & 0xf
+        texels.append(bytes(colors[k][:3] + (EXP4TO8(anibble),)))
 
-    elif code == 1:
-        ACOMP = alpha1
+    return texels
 
-    elif ToSigned8(alpha0) > ToSigned8(alpha1):
-        ACOMP = ToUnsigned8((ToSigned8(alpha0) * (8 - code) + (ToSigned8(alpha1) * (code - 1))) // 7)
 
-    elif code < 6:
-        ACOMP = ToUnsigned8((ToSigned8(alpha0) * (6 - code) + (ToSigned8(alpha1) * (code - 1))) // 5)
+def decode_rgba_dxt5(pixdata, blksrc):
+    alphas = dxt5_decode_alphablock(pixdata, blksrc)
+    colors = dxt135_decode_imageblock(pixdata, blksrc + 8, 2)
 
-    elif code == 6:
-        ACOMP = 0x80
+    return [bytes(colors[k][:3] + (alphas[k],)) for k in range(16)]
 
-    else:
-        ACOMP = 0x7f
 
-    return ACOMP
+def decode_r_bc4(pixdata, blksrc):
+    return [bytes((R, R, R, 255)) for R in dxt5_decode_alphablock(pixdata, blksrc)]
+
+
+def decode_r_bc4_snorm(pixdata, blksrc):
+    return [bytes((R, R, R, 255)) for R in
+            [ToSigned8(R) + 128 for R in dxt5_decode_alphablock_signed(pixdata, blksrc)]]
+
 
+def decode_rg_bc5(pixdata, blksrc):
+    return [bytes((R, G, 0, 255)) for R, G in
+            zip(dxt5_decode_alphablock(pixdata, blksrc), dxt5_decode_alphablock(pixdata, blksrc + 8))]
 
-def fetch_2d_texel_rgba_dxt1(srcRowStride, pixdata, i, j):
-    blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 8
-    ACOMP, RCOMP, GCOMP, BCOMP = dxt135_decode_imageblock(pixdata, blksrc, i & 3, j & 3, 1)
- 
-    return RCOMP, GCOMP, BCOMP, ACOMP
 
+def decode_rg_bc5_snorm(pixdata, blksrc):
+    return [bytes((ToSigned8(R) + 128, ToSigned8(G) + 128, 0, 255)) for R, G in
+            zip(dxt5_decode_alphablock_signed(pixdata, blksrc), dxt5_decode_alphablock_signed(pixdata, blksrc + 8))]
 
-def fetch_2d_texel_rgba_dxt3(srcRowStride, pixdata, i, j):
-    blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
-    ACOMP, RCOMP, GCOMP, BCOMP = dxt135_decode_imageblock(pixdata, blksrc + 8, i & 3, j & 3, 2)
 
-    anibble = (pixdata[blksrc + ((j & 3) * 4 + (i & 3)) // 2] >> (4 * (i & 1))) & 0xf
-    ACOMP = EXP4TO8(anibble)
- 
-    return RCOMP, GCOMP, BCOMP, ACOMP
+def decompressBlocks(data, width, height, blockSize, decode_block, bpp=4, blockAddrs=None, out=None):
+    """
+    Decodes every 4x4 block once and writes its texels to the output.
+    decode_block returns the 16 texels of a block as bpp-byte bytes objects.
+    If blockAddrs is given, block i is read from offset blockAddrs[i] of a swizzled surface instead.
+    If out is given, the image is written to it and out is returned.
+    """
+    output = bytearray(width * height * bpp) if out is None else out
+    if len(output) < width * height * bpp:
+        raise ValueError("Output buffer is too small")
 
+    blocksPerRow = (width + 3) // 4
 
-def fetch_2d_texel_rgba_dxt5(srcRowStride, pixdata, i, j):
-    blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
+    for by in range((height + 3) // 4):
+        rows = min(4, height - by * 4)
 
-    ACOMP = dxt5_decode_alphablock(pixdata, blksrc, i & 3, j & 3)
-    _, RCOMP, GCOMP, BCOMP = dxt135_decode_imageblock(pixdata, blksrc + 8, i & 3, j & 3, 2)
+        for bx in range(blocksPerRow):
+            i = by * blocksPerRow + bx
+            texels = decode_block(data, i * blockSize if blockAddrs is None else blockAddrs[i])
 
-    return RCOMP, GCOMP, BCOMP, ACOMP
+            cols = min(4, width - bx * 4)
+            pos = (by * 4 * width + bx * 4) * bpp
 
+            for j in range(rows):
+                output[pos:pos + cols * bpp] = b''.join(texels[j * 4:j * 4 + cols])
+                pos += width * bpp
 
-def fetch_2d_texel_r_bc4(srcRowStride, pixdata, i, j):
-    blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 8
-    RCOMP = dxt5_decode_alphablock(pixdata, blksrc, i & 3, j & 3)
- 
-    return RCOMP
+    return bytes(output) if out is None else out
 
 
-def fetch_2d_texel_r_bc4_snorm(srcRowStride, pixdata, i, j):
-    blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 8
-    RCOMP = dxt5_decode_alphablock_signed(pixdata, blksrc, i & 3, j & 3)
- 
-    return RCOMP
+def decompressDXT1(data, width, height, blockAddrs=None, out=None):
+    return decompressBlocks(data, width, height, 8, decode_rgba_dxt1, blockAddrs=blockAddrs, out=out)
 
 
-def fetch_2d_texel_rg_bc5(srcRowStride, pixdata, i, j):
-    blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
+def decompressDXT3(data, width, height, blockAddrs=None, out=None):
+    return decompressBlocks(data, width, height, 16, decode_rgba_dxt3, blockAddrs=blockAddrs, out=out)
 
-    RCOMP = dxt5_decode_alphablock(pixdata, blksrc, i & 3, j & 3)
-    GCOMP = dxt5_decode_alphablock(pixdata, blksrc + 8, i & 3, j & 3)
- 
-    return RCOMP, GCOMP
 
+def decompressDXT5(data, width, height, blockAddrs=None, out=None):
+    return decompressBlocks(data, width, height, 16, decode_rgba_dxt5, blockAddrs=blockAddrs, out=out)
 
-def fetch_2d_texel_rg_bc5_snorm(srcRowStride, pixdata, i, j):
-    blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
 
-    RCOMP = dxt5_decode_alphablock_signed(pixdata, blksrc, i & 3, j & 3)
-    GCOMP = dxt5_decode_alphablock_signed(pixdata, blksrc + 8, i & 3, j & 3)
- 
-    return RCOMP, GCOMP
+def decompressBC4(data, width, height, SNORM, blockAddrs=None, out=None):
+    return decompressBlocks(data, width, height, 8, decode_r_bc4_snorm if SNORM else decode_r_bc4, blockAddrs=blockAddrs, out=out)
 
 
-def decompressDXT1(data, width, height):
-    output = bytearray(width * height * 4)
- 
-    for y in range(height):
-        for x in range(width):
-            R, G, B, A = fetch_2d_texel_rgba_dxt1(width, data, x, y)
+def decompressBC5(data, width, height, SNORM, blockAddrs=None, out=None):
+    return decompressBlocks(data, width, height, 16, decode_rg_bc5_snorm if SNORM else decode_rg_bc5, blockAddrs=blockAddrs, out=out)
 
-            pos = (y * width + x) * 4
 
-            output[pos + 0] = R
-            output[pos + 1] = G
-            output[pos + 2] = B
-            output[pos + 3] = A
- 
-    return bytes(output)
+################################################################
+# BC6H / BC7
+################################################################
+
+
+def bc7_decode_block(pixdata, blksrc):
+    """
+    Decodes the 16 texels of a BC7 block at once.
+    """
+    block = int.from_bytes(pixdata[blksrc:blksrc + 16], 'little')
+    if not block & 0xff:
+        return [bytes(4)] * 16
+
+    mode = (block & -block).bit_length() - 1
+    numSubsets, partitionBits, rotationBits, indexSelectionBits, colorBits, \
+        alphaBits, endpointPBits, sharedPBits, indexBits, index2Bits = BC7_MODES[mode]
+
+    block >>= mode + 1
+    partition = block & ((1 << partitionBits) - 1); block >>= partitionBits
+    rotation = block & ((1 << rotationBits) - 1); block >>= rotationBits
+    indexSelection = block & ((1 << indexSelectionBits) - 1); block >>= indexSelectionBits
+
+    numEndpoints = numSubsets * 2
+    endpoints = [[0, 0, 0, 255] for _ in range(numEndpoints)]
+
+    for comp, compBits in ((0, colorBits), (1, colorBits), (2, colorBits), (3, alphaBits)):
+        mask = (1 << compBits) - 1
+        for i in range(numEndpoints if compBits else 0):
+            endpoints[i][comp] = block & mask; block >>= compBits
+
+    if endpointPBits or sharedPBits:
+        numComps = 4 if alphaBits else 3
+        for i in range(numEndpoints):
+            pbit = (block >> (i if endpointPBits else i >> 1)) & 1
+            for comp in range(numComps):
+                endpoints[i][comp] = endpoints[i][comp] << 1 | pbit
+
+        block >>= numEndpoints if endpointPBits else numSubsets
+        colorBits += 1
+        alphaBits += alphaBits > 0
+
+    for comp, compBits in ((0, colorBits), (1, colorBits), (2, colorBits), (3, alphaBits)):
+        for i in range(numEndpoints if compBits else 0):
+            v = endpoints[i][comp]
+            endpoints[i][comp] = (v << (8 - compBits)) | (v >> (2 * compBits - 8))
+
+    subsets = BPTC_SUBSETS[numSubsets][partition]
+    anchors = BPTC_ANCHORS[numSubsets][partition]
+
+    indices = []
+    for k in range(16):
+        bits = indexBits - anchors[k]
+        indices.append(block & ((1 << bits) - 1)); block >>= bits
+
+    colorIndices = alphaIndices = indices
+    colorWeights = alphaWeights = BPTC_WEIGHTS[indexBits]
+
+    if index2Bits:
+        indices2 = [block & ((1 << (index2Bits - 1)) - 1)]; block >>= index2Bits - 1
+        for k in range(1, 16):
+            indices2.append(block & ((1 << index2Bits) - 1)); block >>= index2Bits
+
+        if indexSelection:
+            colorIndices, colorWeights = indices2, BPTC_WEIGHTS[index2Bits]
+
+        else:
+            alphaIndices, alphaWeights = indices2, BPTC_WEIGHTS[index2Bits]
 
+    texels = []
+    for k in range(16):
+        e0, e1 = endpoints[2 * subsets[k]], endpoints[2 * subsets[k] + 1]
+        w = colorWeights[colorIndices[k]]
+        wa = alphaWeights[alphaIndices[k]]
 
-def decompressDXT3(data, width, height):
-    output = bytearray(width * height * 4)
- 
-    for y in range(height):
-        for x in range(width):
-            R, G, B, A = fetch_2d_texel_rgba_dxt3(width, data, x, y)
+        texel = [((64 - w) * e0[0] + w * e1[0] + 32) >> 6,
+                 ((64 - w) * e0[1] + w * e1[1] + 32) >> 6,
+                 ((64 - w) * e0[2] + w * e1[2] + 32) >> 6,
+                 ((64 - wa) * e0[3] + wa * e1[3] + 32) >> 6]
+
+        if rotation:
+            texel[3], texel[rotation - 1] = texel[rotation - 1], texel[3]
+
+        texels.append(bytes(texel))
+
+    return texels
+
+
+def SignExtend(v, bits):
+    mask = 1 << (bits - 1)
+    return ((v & ((1 << bits) - 1)) ^ mask) - mask
+
+
+def bc6h_unquantize(v, bits, signed):
+    if signed:
+        if bits >= 16:
+            return v
+
+        elif v == 0:
+            return 0
+
+        unq = abs(v)
+        if unq >= (1 << (bits - 1)) - 1:
+            unq = 0x7fff
+
+        else:
+            unq = ((unq << 15) + 0x4000) >> (bits - 1)
+
+        return -unq if v < 0 else unq
+
+    if bits >= 15:
+        return v
+
+    elif v == 0:
+        return 0
+
+    elif v == (1 << bits) - 1:
+        return 0xffff
+
+    return ((v << 16) + 0x8000) >> bits
+
+
+def bc6h_finish_unquantize(v, signed):
+    """
+    Scales an interpolated value to the bits of a half float.
+    """
+    if not signed:
+        return (v * 31) >> 6
+
+    elif v < 0:
+        v = ((-v) * 31) >> 5
+        return 0x8000 | v if v else 0
+
+    return (v * 31) >> 5
+
+
+def bc6h_decode_block(pixdata, blksrc, signed):
+    """
+    Decodes the 16 texels of a BC6H block at once.
+    Returns a list of (R, G, B) half floats, as integers.
+    """
+    block = int.from_bytes(pixdata[blksrc:blksrc + 16], 'little')
+
+    mode = block & 3 if block & 2 == 0 else block & 0x1f
+    if mode not in BC6H_MODES:
+        return [(0, 0, 0)] * 16
+
+    transformed, partitioned, endpointBits, deltaBits, fields = BC6H_MODES[mode]
+    block >>= 2 if mode < 2 else 5
+
+    ep = [0] * 12
+    for field, bits, shift in fields:
+        ep[field] |= (block & ((1 << bits) - 1)) << shift; block >>= bits
+
+    numEndpoints = 4 if partitioned else 2
+    mask = (1 << endpointBits) - 1
+
+    endpoints = []
+    for comp in range(3):
+        values = ep[comp * 4:comp * 4 + numEndpoints]
+
+        if signed:
+            values[0] = SignExtend(values[0], endpointBits)
+
+        for i in range(1, numEndpoints):
+            if signed or transformed:
+                values[i] = SignExtend(values[i], deltaBits[comp])
+
+            if transformed:
+                values[i] = (values[i] + values[0]) & mask
+                if signed:
+                    values[i] = SignExtend(values[i], endpointBits)
+
+        endpoints.append([bc6h_unquantize(v, endpointBits, signed) for v in values])
+
+    if partitioned:
+        partition = block & 0x1f; block >>= 5
+        indexBits = 3
+
+    else:
+        partition = 0
+        indexBits = 4
 
-            pos = (y * width + x) * 4
+    subsets = BPTC_SUBSETS[2 if partitioned else 1][partition]
+    anchors = BPTC_ANCHORS[2 if partitioned else 1][partition]
+    weights = BPTC_WEIGHTS[indexBits]
 
-            output[pos + 0] = R
-            output[pos + 1] = G
-            output[pos + 2] = B
-            output[pos + 3] = A
- 
-    return bytes(output)
+    texels = []
+    for k in range(16):
+        bits = indexBits - anchors[k]
+        w = weights[block & ((1 << bits) - 1)]; block >>= bits
 
+        s = 2 * subsets[k]
+        texels.append(tuple(
+            bc6h_finish_unquantize(((64 - w) * values[s] + w * values[s + 1] + 32) >> 6, signed)
+            for values in endpoints))
 
-def decompressDXT5(data, width, height):
-    output = bytearray(width * height * 4)
- 
-    for y in range(height):
-        for x in range(width):
-            R, G, B, A = fetch_2d_texel_rgba_dxt5(width, data, x, y)
+    return texels
 
-            pos = (y * width + x) * 4
 
-            output[pos + 0] = R
-            output[pos + 1] = G
-            output[pos + 2] = B
-            output[pos + 3] = A
- 
-    return bytes(output)
+def decode_rgba_bc7(pixdata, blksrc):
+    return bc7_decode_block(pixdata, blksrc)
 
 
-def decompressBC4(data, width, height, SNORM):
-    output = bytearray(width * height * 4)
+def decode_rgba_bc6h_uf16(pixdata, blksrc):
+    return [bytes((HALF_TO_UNORM8[R], HALF_TO_UNORM8[G], HALF_TO_UNORM8[B], 255))
+            for R, G, B in bc6h_decode_block(pixdata, blksrc, False)]
 
-    for y in range(height):
-        for x in range(width):
-            if SNORM:
-                R = ToSigned8(fetch_2d_texel_r_bc4_snorm(width, data, x, y)) + 128
 
-            else:
-                R = fetch_2d_texel_r_bc4(width, data, x, y)
+def decode_rgba_bc6h_sf16(pixdata, blksrc):
+    return [bytes((HALF_TO_UNORM8[R], HALF_TO_UNORM8[G], HALF_TO_UNORM8[B], 255))
+            for R, G, B in bc6h_decode_block(pixdata, blksrc, True)]
 
-            pos = (y * width + x) * 4
 
-            output[pos + 0] = R
-            output[pos + 1] = R
-            output[pos + 2] = R
-            output[pos + 3] = 255
- 
-    return bytes(output)
+def decode_rgba16f_bc6h_uf16(pixdata, blksrc):
+    return [struct.pack('<4H', R, G, B, 0x3c00) for R, G, B in bc6h_decode_block(pixdata, blksrc, False)]
 
 
-def decompressBC5(data, width, height, SNORM):
-    output = bytearray(width * height * 4)
+def decode_rgba16f_bc6h_sf16(pixdata, blksrc):
+    return [struct.pack('<4H', R, G, B, 0x3c00) for R, G, B in bc6h_decode_block(pixdata, blksrc, True)]
 
-    for y in range(height):
-        for x in range(width):
-            if SNORM:
-                R, G = fetch_2d_texel_rg_bc5_snorm(width, data, x, y)
 
-                R = ToSigned8(R) + 128
-                G = ToSigned8(G) + 128
+def decompressBC6H(data, width, height, SIGNED, HDR, blockAddrs=None, out=None):
+    if HDR:
+        return decompressBlocks(data, width, height, 16,
+                                decode_rgba16f_bc6h_sf16 if SIGNED else decode_rgba16f_bc6h_uf16, 8, blockAddrs, out)
 
-            else:
-                R, G = fetch_2d_texel_rg_bc5(width, data, x, y)
+    return decompressBlocks(data, width, height, 16, decode_rgba_bc6h_sf16 if SIGNED else decode_rgba_bc6h_uf16,
+                            blockAddrs=blockAddrs, out=out)
 
-            pos = (y * width + x) * 4
 
-            output[pos + 0] = R
-            output[pos + 1] = G
-            output[pos + 2] = 0
-            output[pos + 3] = 255
- 
-    return bytes(output)
+def decompressBC7(data, width, height, blockAddrs=None, out=None):
+    return decompressBlocks(data, width, height, 16, decode_rgba_bc7, blockAddrs=blockAddrs, out=out)
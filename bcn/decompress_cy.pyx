@@ -38,7 +38,7 @@ cdef u8 EXP4TO8(u8 col):
     return col | col << 4
 
 
-cdef (u8, u8, u8, u8) dxt135_decode_imageblock(u8 pixdata[], u32 img_block_src, u8 i, u8 j, u8 dxt_type):
+cdef (u8, u8, u8, u8) dxt135_decode_imageblock(const u8 *pixdata, u32 img_block_src, u8 i, u8 j, u8 dxt_type):
     cdef:
         u16 color0 = pixdata[img_block_src] | (pixdata[img_block_src + 1] << 8)
         u16 color1 = pixdata[img_block_src + 2] | (pixdata[img_block_src + 3] << 8)
@@ -89,7 +89,7 @@ cdef (u8, u8, u8, u8) dxt135_decode_imageblock(u8 pixdata[], u32 img_block_src,
     return ACOMP, RCOMP, GCOMP, BCOMP
 
 
-cdef u8 dxt5_decode_alphablock(u8 pixdata[], u32 blksrc, u8 i, u8 j):
+cdef u8 dxt5_decode_alphablock(const u8 *pixdata, u32 blksrc, u8 i, u8 j):
     cdef:
         u8 alpha0 = pixdata[blksrc]
         u8 alpha1 = pixdata[blksrc + 1]
@@ -121,7 +121,7 @@ cdef u8 dxt5_decode_alphablock(u8 pixdata[], u32 blksrc, u8 i, u8 j):
     return ACOMP
 
 
-cdef u8 dxt5_decode_alphablock_signed(u8 pixdata[], u32 blksrc, u8 i, u8 j):
+cdef u8 dxt5_decode_alphablock_signed(const u8 *pixdata, u32 blksrc, u8 i, u8 j):
     cdef:
         u8 alpha0 = pixdata[blksrc]
         u8 alpha1 = pixdata[blksrc + 1]
@@ -153,9 +153,10 @@ cdef u8 dxt5_decode_alphablock_signed(u8 pixdata[], u32 blksrc, u8 i, u8 j):
     return ACOMP
 
 
-cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt1(u32 srcRowStride, u8 pixdata[], u32 i, u32 j):
+cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt1(u32 srcRowStride, const u8 *pixdata, const u32 *blockAddrs, u32 i, u32 j):
     cdef:
-        u32 blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 8
+        u32 block = (srcRowStride + 3) // 4 * (j // 4) + (i // 4)
+        u32 blksrc = blockAddrs[block] if blockAddrs != NULL else block * 8
         u8 ACOMP, RCOMP, GCOMP, BCOMP
 
     ACOMP, RCOMP, GCOMP, BCOMP = dxt135_decode_imageblock(pixdata, blksrc, i & 3, j & 3, 1)
@@ -163,9 +164,10 @@ cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt1(u32 srcRowStride, u8 pixdata[], u
     return RCOMP, GCOMP, BCOMP, ACOMP
 
 
-cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt3(u32 srcRowStride, u8 pixdata[], u32 i, u32 j):
+cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt3(u32 srcRowStride, const u8 *pixdata, const u32 *blockAddrs, u32 i, u32 j):
     cdef:
-        u32 blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
+        u32 block = (srcRowStride + 3) // 4 * (j // 4) + (i // 4)
+        u32 blksrc = blockAddrs[block] if blockAddrs != NULL else block * 16
         u8 ACOMP, RCOMP, GCOMP, BCOMP
 
     ACOMP, RCOMP, GCOMP, BCOMP = dxt135_decode_imageblock(pixdata, blksrc + 8, i & 3, j & 3, 2)
@@ -176,9 +178,10 @@ cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt3(u32 srcRowStride, u8 pixdata[], u
     return RCOMP, GCOMP, BCOMP, ACOMP
 
 
-cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt5(u32 srcRowStride, u8 pixdata[], u32 i, u32 j):
+cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt5(u32 srcRowStride, const u8 *pixdata, const u32 *blockAddrs, u32 i, u32 j):
     cdef:
-        u32 blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
+        u32 block = (srcRowStride + 3) // 4 * (j // 4) + (i // 4)
+        u32 blksrc = blockAddrs[block] if blockAddrs != NULL else block * 16
 
         u8 ACOMP = dxt5_decode_alphablock(pixdata, blksrc, i & 3, j & 3)
         u8 RCOMP, GCOMP, BCOMP
@@ -188,54 +191,78 @@ cdef (u8, u8, u8, u8) fetch_2d_texel_rgba_dxt5(u32 srcRowStride, u8 pixdata[], u
     return RCOMP, GCOMP, BCOMP, ACOMP
 
 
-cdef u8 fetch_2d_texel_r_bc4(u32 srcRowStride, u8 pixdata[], u32 i, u32 j):
+cdef u8 fetch_2d_texel_r_bc4(u32 srcRowStride, const u8 *pixdata, const u32 *blockAddrs, u32 i, u32 j):
     cdef:
-        u32 blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 8
+        u32 block = (srcRowStride + 3) // 4 * (j // 4) + (i // 4)
+        u32 blksrc = blockAddrs[block] if blockAddrs != NULL else block * 8
         u8 RCOMP = dxt5_decode_alphablock(pixdata, blksrc, i & 3, j & 3)
  
     return RCOMP
 
 
-cdef u8 fetch_2d_texel_r_bc4_snorm(u32 srcRowStride, u8 pixdata[], u32 i, u32 j):
+cdef u8 fetch_2d_texel_r_bc4_snorm(u32 srcRowStride, const u8 *pixdata, const u32 *blockAddrs, u32 i, u32 j):
     cdef:
-        u32 blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 8
+        u32 block = (srcRowStride + 3) // 4 * (j // 4) + (i // 4)
+        u32 blksrc = blockAddrs[block] if blockAddrs != NULL else block * 8
         u8 RCOMP = dxt5_decode_alphablock_signed(pixdata, blksrc, i & 3, j & 3)
  
     return RCOMP
 
 
-cdef (u8, u8) fetch_2d_texel_rg_bc5(u32 srcRowStride, u8 pixdata[], u32 i, u32 j):
+cdef (u8, u8) fetch_2d_texel_rg_bc5(u32 srcRowStride, const u8 *pixdata, const u32 *blockAddrs, u32 i, u32 j):
     cdef:
-        u32 blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
+        u32 block = (srcRowStride + 3) // 4 * (j // 4) + (i // 4)
+        u32 blksrc = blockAddrs[block] if blockAddrs != NULL else block * 16
         u8 RCOMP = dxt5_decode_alphablock(pixdata, blksrc, i & 3, j & 3)
         u8 GCOMP = dxt5_decode_alphablock(pixdata, blksrc + 8, i & 3, j & 3)
  
     return RCOMP, GCOMP
 
 
-cdef (u8, u8) fetch_2d_texel_rg_bc5_snorm(u32 srcRowStride, u8 pixdata[], u32 i, u32 j):
+cdef (u8, u8) fetch_2d_texel_rg_bc5_snorm(u32 srcRowStride, const u8 *pixdata, const u32 *blockAddrs, u32 i, u32 j):
     cdef:
-        u32 blksrc = ((srcRowStride + 3) // 4 * (j // 4) + (i // 4)) * 16
+        u32 block = (srcRowStride + 3) // 4 * (j // 4) + (i // 4)
+        u32 blksrc = blockAddrs[block] if blockAddrs != NULL else block * 16
         u8 RCOMP = dxt5_decode_alphablock_signed(pixdata, blksrc, i & 3, j & 3)
         u8 GCOMP = dxt5_decode_alphablock_signed(pixdata, blksrc + 8, i & 3, j & 3)
  
     return RCOMP, GCOMP
 
 
-cpdef bytes decompressDXT1(bytes data, u32 width, u32 height):
+cpdef decompressDXT1(data, u32 width, u32 height, blockAddrs=None, out=None):
     cdef:
-        array.array dataArr = array.array('B', data)
+        const u8[::1] dataView = data
+        const u8 *work = &dataView[0]
 
-        u8 *work = dataArr.data.as_uchars
-        u8 *output = <u8 *>malloc(width * height * 4)
+        array.array addrArr
+        const u32 *addrs = NULL
+
+        u8[::1] outView
+        u8 *output
 
         u8 R, G, B, A
         u32 y, x, pos
  
+    if out is None:
+        output = <u8 *>malloc(width * height * 4)
+
+    else:
+        # Decode straight into the caller's buffer
+        outView = out
+        if <u32>outView.shape[0] < width * height * 4:
+            raise ValueError("Output buffer is too small")
+
+        output = &outView[0]
+
     try:
+        if blockAddrs is not None:
+            # Offsets of the blocks in a swizzled surface
+            addrArr = blockAddrs if isinstance(blockAddrs, array.array) and blockAddrs.typecode == 'I' else array.array('I', blockAddrs)
+            addrs = addrArr.data.as_uints
+
         for y in range(height):
             for x in range(width):
-                R, G, B, A = fetch_2d_texel_rgba_dxt1(width, work, x, y)
+                R, G, B, A = fetch_2d_texel_rgba_dxt1(width, work, addrs, x, y)
 
                 pos = (y * width + x) * 4
 
@@ -244,26 +271,50 @@ cpdef bytes decompressDXT1(bytes data, u32 width, u32 height):
                 output[pos + 2] = B
                 output[pos + 3] = A
      
+        if out is not None:
+            return out
+
         return bytes(<u8[:width * height * 4]>output)
 
     finally:
-        free(output)
+        if out is None:
+            free(output)
 
 
-cpdef bytes decompressDXT3(bytes data, u32 width, u32 height):
+cpdef decompressDXT3(data, u32 width, u32 height, blockAddrs=None, out=None):
     cdef:
-        array.array dataArr = array.array('B', data)
+        const u8[::1] dataView = data
+        const u8 *work = &dataView[0]
 
-        u8 *work = dataArr.data.as_uchars
-        u8 *output = <u8 *>malloc(width * height * 4)
+        array.array addrArr
+        const u32 *addrs = NULL
+
+        u8[::1] outView
+        u8 *output
 
         u8 R, G, B, A
         u32 y, x, pos
  
+    if out is None:
+        output = <u8 *>malloc(width * height * 4)
+
+    else:
+        # Decode straight into the caller's buffer
+        outView = out
+        if <u32>outView.shape[0] < width * height * 4:
+            raise ValueError("Output buffer is too small")
+
+        output = &outView[0]
+
     try:
+        if blockAddrs is not None:
+            # Offsets of the blocks in a swizzled surface
+            addrArr = blockAddrs if isinstance(blockAddrs, array.array) and blockAddrs.typecode == 'I' else array.array('I', blockAddrs)
+            addrs = addrArr.data.as_uints
+
         for y in range(height):
             for x in range(width):
-                R, G, B, A = fetch_2d_texel_rgba_dxt3(width, work, x, y)
+                R, G, B, A = fetch_2d_texel_rgba_dxt3(width, work, addrs, x, y)
 
                 pos = (y * width + x) * 4
 
@@ -272,26 +323,50 @@ cpdef bytes decompressDXT3(bytes data, u32 width, u32 height):
                 output[pos + 2] = B
                 output[pos + 3] = A
      
+        if out is not None:
+            return out
+
         return bytes(<u8[:width * height * 4]>output)
 
     finally:
-        free(output)
+        if out is None:
+            free(output)
 
 
-cpdef bytes decompressDXT5(bytes data, u32 width, u32 height):
+cpdef decompressDXT5(data, u32 width, u32 height, blockAddrs=None, out=None):
     cdef:
-        array.array dataArr = array.array('B', data)
+        const u8[::1] dataView = data
+        const u8 *work = &dataView[0]
 
-        u8 *work = dataArr.data.as_uchars
-        u8 *output = <u8 *>malloc(width * height * 4)
+        array.array addrArr
+        const u32 *addrs = NULL
+
+        u8[::1] outView
+        u8 *output
 
         u8 R, G, B, A
         u32 y, x, pos
  
+    if out is None:
+        output = <u8 *>malloc(width * height * 4)
+
+    else:
+        # Decode straight into the caller's buffer
+        outView = out
+        if <u32>outView.shape[0] < width * height * 4:
+            raise ValueError("Output buffer is too small")
+
+        output = &outView[0]
+
     try:
+        if blockAddrs is not None:
+            # Offsets of the blocks in a swizzled surface
+            addrArr = blockAddrs if isinstance(blockAddrs, array.array) and blockAddrs.typecode == 'I' else array.array('I', blockAddrs)
+            addrs = addrArr.data.as_uints
+
         for y in range(height):
             for x in range(width):
-                R, G, B, A = fetch_2d_texel_rgba_dxt5(width, work, x, y)
+                R, G, B, A = fetch_2d_texel_rgba_dxt5(width, work, addrs, x, y)
 
                 pos = (y * width + x) * 4
 
@@ -300,30 +375,54 @@ cpdef bytes decompressDXT5(bytes data, u32 width, u32 height):
                 output[pos + 2] = B
                 output[pos + 3] = A
      
+        if out is not None:
+            return out
+
         return bytes(<u8[:width * height * 4]>output)
 
     finally:
-        free(output)
+        if out is None:
+            free(output)
 
 
-cpdef bytes decompressBC4(bytes data, u32 width, u32 height, int SNORM):
+cpdef decompressBC4(data, u32 width, u32 height, int SNORM, blockAddrs=None, out=None):
     cdef:
-        array.array dataArr = array.array('B', data)
+        const u8[::1] dataView = data
+        const u8 *work = &dataView[0]
 
-        u8 *work = dataArr.data.as_uchars
-        u8 *output = <u8 *>malloc(width * height * 4)
+        array.array addrArr
+        const u32 *addrs = NULL
+
+        u8[::1] outView
+        u8 *output
 
         u8 R
         u32 y, x, pos
  
+    if out is None:
+        output = <u8 *>malloc(width * height * 4)
+
+    else:
+        # Decode straight into the caller's buffer
+        outView = out
+        if <u32>outView.shape[0] < width * height * 4:
+            raise ValueError("Output buffer is too small")
+
+        output = &outView[0]
+
     try:
+        if blockAddrs is not None:
+            # Offsets of the blocks in a swizzled surface
+            addrArr = blockAddrs if isinstance(blockAddrs, array.array) and blockAddrs.typecode == 'I' else array.array('I', blockAddrs)
+            addrs = addrArr.data.as_uints
+
         for y in range(height):
             for x in range(width):
                 if SNORM:
-                    R = <char>fetch_2d_texel_r_bc4_snorm(width, data, x, y) + 128
+                    R = <char>fetch_2d_texel_r_bc4_snorm(width, work, addrs, x, y) + 128
 
                 else:
-                    R = fetch_2d_texel_r_bc4(width, data, x, y)
+                    R = fetch_2d_texel_r_bc4(width, work, addrs, x, y)
 
                 pos = (y * width + x) * 4
 
@@ -332,33 +431,57 @@ cpdef bytes decompressBC4(bytes data, u32 width, u32 height, int SNORM):
                 output[pos + 2] = R
                 output[pos + 3] = 255
      
+        if out is not None:
+            return out
+
         return bytes(<u8[:width * height * 4]>output)
 
     finally:
-        free(output)
+        if out is None:
+            free(output)
 
 
-cpdef bytes decompressBC5(bytes data, u32 width, u32 height, int SNORM):
+cpdef decompressBC5(data, u32 width, u32 height, int SNORM, blockAddrs=None, out=None):
     cdef:
-        array.array dataArr = array.array('B', data)
+        const u8[::1] dataView = data
+        const u8 *work = &dataView[0]
+
+        array.array addrArr
+        const u32 *addrs = NULL
 
-        u8 *work = dataArr.data.as_uchars
-        u8 *output = <u8 *>malloc(width * height * 4)
+        u8[::1] outView
+        u8 *output
 
         u8 R, G
         u32 y, x, pos
  
+    if out is None:
+        output = <u8 *>malloc(width * height * 4)
+
+    else:
+        # Decode straight into the caller's buffer
+        outView = out
+        if <u32>outView.shape[0] < width * height * 4:
+            raise ValueError("Output buffer is too small")
+
+        output = &outView[0]
+
     try:
+        if blockAddrs is not None:
+            # Offsets of the blocks in a swizzled surface
+            addrArr = blockAddrs if isinstance(blockAddrs, array.array) and blockAddrs.typecode == 'I' else array.array('I', blockAddrs)
+            addrs = addrArr.data.as_uints
+
         for y in range(height):
             for x in range(width):
                 if SNORM:
-                    R, G = fetch_2d_texel_rg_bc5_snorm(width, data, x, y)
+                    R, G = fetch_2d_texel_rg_bc5_snorm(width, work, addrs, x, y)
 
                     R = <char>R + 128
                     G = <char>G + 128
 
                 else:
-                    R, G = fetch_2d_texel_rg_bc5(width, data, x, y)
+                    R, G = fetch_2d_texel_rg_bc5(width, work, addrs, x, y)
 
                 pos = (y * width + x) * 4
 
@@ -367,7 +490,11 @@ cpdef bytes decompressBC5(bytes data, u32 width, u32 height, int SNORM):
                 output[pos + 2] = 0
                 output[pos + 3] = 255
      
+        if out is not None:
+            return out
+
         return bytes(<u8[:width * height * 4]>output)
 
     finally:
-        free(output)
+        if out is None:
+            free(output)
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# BC1-BC5 Decompressor
+# Version 0.1
+# Copyright © 2018 MasterVermilli0n / AboodXD
+
+# decompress_np.py
+# A NumPy port of decompress_.py that decodes all blocks at once.
+
+################################################################
+################################################################
+
+import numpy as np
+
+from .bptc import BPTC_WEIGHTS, BPTC_SUBSETS, BPTC_ANCHORS, BC7_MODES, BC6H_MODES, HALF_TO_UNORM8
+
+
+def toImage(texels, width, height, dtype=np.uint8, out=None):
+    """
+    Reorders the (numBlocks, 16, 4) texels of all blocks into a linear RGBA image.
+    If out is given, the image is written to it and out is returned.
+    """
+    blocksPerRow = (width + 3) // 4
+    blocksPerColumn = (height + 3) // 4
+
+    image = texels.reshape(blocksPerColumn, blocksPerRow, 4, 4, 4).transpose(0, 2, 1, 3, 4)
+    image = image.reshape(blocksPerColumn * 4, blocksPerRow * 4, 4)[:height, :width]
+
+    if out is not None:
+        np.frombuffer(out, dtype=dtype, count=height * width * 4).reshape(height, width, 4)[...] = image
+        return out
+
+    return image.astype(dtype).tobytes()
+
+
+def getBlocks(data, width, height, blockSize, blockAddrs=None):
+    """
+    Returns the blocks in linear order.
+    If blockAddrs is given, block i is read from offset blockAddrs[i] of a swizzled surface instead.
+    """
+    if blockAddrs is not None:
+        blocks = np.frombuffer(data, dtype=np.uint8, count=len(data) // blockSize * blockSize).reshape(-1, blockSize)
+        return blocks[np.asarray(blockAddrs) // blockSize]
+
+    numBlocks = ((width + 3) // 4) * ((height + 3) // 4)
+    return np.frombuffer(data, dtype=np.uint8, count=numBlocks * blockSize).reshape(numBlocks, blockSize)
+
+
+def dxt135_decode_imageblocks(blocks, dxt_type):
+    color0 = blocks[:, 0].astype(np.int32) | (blocks[:, 1].astype(np.int32) << 8)
+    color1 = blocks[:, 2].astype(np.int32) | (blocks[:, 3].astype(np.int32) << 8)
+    bits = blocks[:, 4:8].copy().view('<u4')[:, 0]
+
+    numBlocks = len(blocks)
+    palette = np.empty((numBlocks, 4, 4), dtype=np.int32)
+
+    for i, color in enumerate((color0, color1)):
+        palette[:, i, 0] = ((color >> 8) & 0xf8) | ((color >> 13) & 0x07)
+        palette[:, i, 1] = ((color >> 3) & 0xfc) | ((color >> 9) & 0x03)
+        palette[:, i, 2] = ((color << 3) & 0xf8) | ((color >> 2) & 0x07)
+
+    palette[:, :, 3] = 255
+
+    col0 = palette[:, 0, :3]
+    col1 = palette[:, 1, :3]
+
+    greater = (color0 > color1)[:, None]
+
+    palette[:, 2, :3] = np.where(greater, (col0 * 2 + col1) // 3, (col0 + col1) // 2)
+
+    if dxt_type > 1:
+        palette[:, 3, :3] = (col0 + col1 * 2) // 3
+
+    else:
+        palette[:, 3, :3] = np.where(greater, (col0 + col1 * 2) // 3, 0)
+
+        if dxt_type == 1:
+            palette[:, 3, 3] = np.where(greater[:, 0], 255, 0)
+
+    codes = (bits[:, None] >> (2 * np.arange(16, dtype=np.uint32))) & 3
+
+    return palette[np.arange(numBlocks)[:, None], codes]
+
+
+def getAlphaCodes(blocks):
+    bits = np.zeros(len(blocks), dtype=np.uint64)
+    for i in range(6):
+        bits |= blocks[:, 2 + i].astype(np.uint64) << np.uint64(8 * i)
+
+    return ((bits[:, None] >> (3 * np.arange(16, dtype=np.uint64))) & np.uint64(7)).astype(np.intp)
+
+
+def dxt5_decode_alphablocks(blocks):
+    alpha0 = blocks[:, 0].astype(np.int32)[:, None]
+    alpha1 = blocks[:, 1].astype(np.int32)[:, None]
+
+    code = np.arange(8, dtype=np.int32)
+
+    palette = np.where(
+        alpha0 > alpha1,
+        (alpha0 * (8 - code) + (alpha1 * (code - 1))) // 7,
+        np.where(code < 6, (alpha0 * (6 - code) + (alpha1 * (code - 1))) // 5,
+                 np.where(code == 6, 0, 255)),
+    )
+
+    palette[:, 0] = alpha0[:, 0]
+    palette[:, 1] = alpha1[:, 0]
+
+    return np.take_along_axis(palette, getAlphaCodes(blocks), axis=1)
+
+
+def ToSigned8(v):
+    return np.where(v > 127, v - 256, v)
+
+
+def ToUnsigned8(v):
+    return np.where(v > 127, 127, np.where(v < -128, 128, np.where(v < 0, v + 256, v)))
+
+
+def dxt5_decode_alphablocks_signed(blocks):
+    alpha0 = blocks[:, 0].astype(np.int32)[:, None]
+    alpha1 = blocks[:, 1].astype(np.int32)[:, None]
+
+    sAlpha0 = ToSigned8(alpha0)
+    sAlpha1 = ToSigned8(alpha1)
+
+    code = np.arange(8, dtype=np.int32)
+
+    palette = np.where(
+        sAlpha0 > sAlpha1,
+        ToUnsigned8((sAlpha0 * (8 - code) + (sAlpha1 * (code - 1))) // 7),
+        np.where(code < 6, ToUnsigned8((sAlpha0 * (6 - code) + (sAlpha1 * (code - 1))) // 5),
+                 np.where(code == 6, 0x80, 0x7f)),
+    )
+
+    palette[:, 0] = alpha0[:, 0]
+    palette[:, 1] = alpha1[:, 0]
+
+    return np.take_along_axis(palette, getAlphaCodes(blocks), axis=1)
+
+
+def decompressDXT1(data, width, height, blockAddrs=None, out=None):
+    blocks = getBlocks(data, width, height, 8, blockAddrs)
+    return toImage(dxt135_decode_imageblocks(blocks, 1), width, height, out=out)
+
+
+def decompressDXT3(data, width, height, blockAddrs=None, out=None):
+    blocks = getBlocks(data, width, height, 16, blockAddrs)
+    texels = dxt135_decode_imageblocks(blocks[:, 8:], 2)
+
+    k = np.arange(16)
+    anibbles = (blocks[:, k // 2] >> (4 * (k & 1))) & 0xf
+    texels[:, :, 3] = anibbles | anibbles << 4
+
+    return toImage(texels, width, height, out=out)
+
+
+def decompressDXT5(data, width, height, blockAddrs=None, out=None):
+    blocks = getBlocks(data, width, height, 16, blockAddrs)
+    texels = dxt135_decode_imageblocks(blocks[:, 8:], 2)
+    texels[:, :, 3] = dxt5_decode_alphablocks(blocks)
+
+    return toImage(texels, width, height, out=out)
+
+
+def decompressBC4(data, width, height, SNORM, blockAddrs=None, out=None):
+    blocks = getBlocks(data, width, height, 8, blockAddrs)
+
+    if SNORM:
+        R = ToSigned8(dxt5_decode_alphablocks_signed(blocks)) + 128
+
+    else:
+        R = dxt5_decode_alphablocks(blocks)
+
+    texels = np.empty(R.shape + (4,), dtype=np.int32)
+    texels[:, :, 0] = R
+    texels[:, :, 1] = R
+    texels[:, :, 2] = R
+    texels[:, :, 3] = 255
+
+    return toImage(texels, width, height, out=out)
+
+
+def decompressBC5(data, width, height, SNORM, blockAddrs=None, out=None):
+    blocks = getBlocks(data, width, height, 16, blockAddrs)
+
+    if SNORM:
+        R = ToSigned8(dxt5_decode_alphablocks_signed(blocks[:, :8])) + 128
+        G = ToSigned8(dxt5_decode_alphablocks_signed(blocks[:, 8:])) + 128
+
+    else:
+        R = dxt5_decode_alphablocks(blocks[:, :8])
+        G = dxt5_decode_alphablocks(blocks[:, 8:])
+
+    texels = np.empty(R.shape + (4,), dtype=np.int32)
+    texels[:, :, 0] = R
+    texels[:, :, 1] = G
+    texels[:, :, 2] = 0
+    texels[:, :, 3] = 255
+
+    return toImage(texels, width, height, out=out)
+
+
+################################################################
+# BC6H / BC7
+################################################################
+
+WEIGHTS = [np.array(weights, dtype=np.int16) for weights in BPTC_WEIGHTS]
+SUBSETS = {numSubsets: np.array(table, dtype=np.intp) for numSubsets, table in BPTC_SUBSETS.items()}
+ANCHORS = {numSubsets: np.array(table, dtype=np.int32) for numSubsets, table in BPTC_ANCHORS.items()}
+
+# Mode of a BC7 block from its first byte, 8 for the reserved mode
+BC7_MODE_LUT = np.array([(i & -i).bit_length() - 1 if i else 8 for i in range(256)], dtype=np.int32)
+
+HALF_TO_UNORM8_NP = np.frombuffer(HALF_TO_UNORM8, dtype=np.uint8)
+
+
+def getBlockWords(data, width, height, blockAddrs=None):
+    """
+    Returns the low and high 64 bits of every 128-bit block.
+    """
+    words = getBlocks(data, width, height, 16, blockAddrs).view('<u8')
+    return words[:, 0], words[:, 1]
+
+
+def getBits(lo, hi, pos, numBits):
+    if pos >= 64:
+        v = hi >> np.uint64(pos - 64)
+
+    elif pos + numBits <= 64:
+        v = lo >> np.uint64(pos)
+
+    else:
+        v = (lo >> np.uint64(pos)) | (hi << np.uint64(64 - pos))
+
+    return (v & np.uint64((1 << numBits) - 1)).astype(np.int32)
+
+
+def getIndices(lo, hi, pos, anchors, indexBits):
+    """
+    Reads the 16 indices of each block; anchor texels have one bit less.
+    """
+    widths = indexBits - anchors
+    starts = (pos + np.cumsum(widths, axis=1) - widths).astype(np.uint64)
+
+    # Indices never start at bit 0, so (64 - start) & 63 is only 0 in the high word
+    lo = lo[:, None]
+    hi = hi[:, None]
+    v = np.where(starts >= 64, hi >> (starts & np.uint64(63)),
+                 (lo >> starts) | (hi << ((np.uint64(64) - starts) & np.uint64(63))))
+
+    return (v & ((np.uint64(1) << widths.astype(np.uint64)) - np.uint64(1))).astype(np.intp)
+
+
+def SignExtend(v, bits):
+    mask = 1 << (bits - 1)
+    return ((v & ((1 << bits) - 1)) ^ mask) - mask
+
+
+def bc7_decode_mode(lo, hi, mode):
+    numSubsets, partitionBits, rotationBits, indexSelectionBits, colorBits, \
+        alphaBits, endpointPBits, sharedPBits, indexBits, index2Bits = BC7_MODES[mode]
+
+    pos = mode + 1
+    partition = getBits(lo, hi, pos, partitionBits); pos += partitionBits
+    rotation = getBits(lo, hi, pos, rotationBits); pos += rotationBits
+    indexSelection = getBits(lo, hi, pos, indexSelectionBits); pos += indexSelectionBits
+
+    numBlocks = len(lo)
+    numEndpoints = numSubsets * 2
+    endpoints = np.full((numBlocks, numEndpoints, 4), 255, dtype=np.int32)
+
+    for comp, compBits in ((0, colorBits), (1, colorBits), (2, colorBits), (3, alphaBits)):
+        for i in range(numEndpoints if compBits else 0):
+            endpoints[:, i, comp] = getBits(lo, hi, pos, compBits); pos += compBits
+
+    if endpointPBits or sharedPBits:
+        numComps = 4 if alphaBits else 3
+        for i in range(numEndpoints):
+            pbit = getBits(lo, hi, pos + (i if endpointPBits else i >> 1), 1)
+            endpoints[:, i, :numComps] = endpoints[:, i, :numComps] << 1 | pbit[:, None]
+
+        pos += numEndpoints if endpointPBits else numSubsets
+        colorBits += 1
+        alphaBits += alphaBits > 0
+
+    v = endpoints[:, :, :3]
+    endpoints[:, :, :3] = (v << (8 - colorBits)) | (v >> (2 * colorBits - 8))
+
+    if alphaBits:
+        v = endpoints[:, :, 3]
+        endpoints[:, :, 3] = (v << (8 - alphaBits)) | (v >> (2 * alphaBits - 8))
+
+    subsets = SUBSETS[numSubsets][partition]
+    indices = getIndices(lo, hi, pos, ANCHORS[numSubsets][partition], indexBits)
+    pos += 16 * indexBits - numSubsets
+
+    colorWeights = alphaWeights = WEIGHTS[indexBits][indices]
+
+    if index2Bits:
+        indices2 = getIndices(lo, hi, pos, ANCHORS[1][np.zeros(numBlocks, dtype=np.intp)], index2Bits)
+        weights2 = WEIGHTS[index2Bits][indices2]
+
+        indexSelection = indexSelection[:, None].astype(bool)
+        colorWeights, alphaWeights = (np.where(indexSelection, weights2, colorWeights),
+                                      np.where(indexSelection, colorWeights, weights2))
+
+    # Interpolate in int16 for speed, the weighted sums stay below 2 ** 15
+    first = np.arange(0, numBlocks * numEndpoints, numEndpoints)[:, None] + 2 * subsets
+    endpoints = endpoints.astype(np.int16).reshape(-1, 4)
+    e0 = endpoints.take(first, axis=0)
+    e1 = endpoints.take(first + 1, axis=0)
+
+    weights = np.empty(e0.shape, dtype=np.int16)
+    weights[:, :, :3] = colorWeights[:, :, None]
+    weights[:, :, 3] = alphaWeights
+
+    texels = ((64 - weights) * e0 + weights * e1 + 32) >> 6
+
+    for r in range(1, 1 << rotationBits):
+        order = [0, 1, 2, 3]
+        order[r - 1], order[3] = 3, r - 1
+
+        rotated = rotation == r
+        texels[rotated] = texels[rotated][:, :, order]
+
+    return texels
+
+
+def bc7_decode_blocks(lo, hi, modes):
+    texels = np.zeros((len(lo), 16, 4), dtype=np.uint8)
+
+    for mode in range(8):
+        sel = np.nonzero(modes == mode)[0]
+        if len(sel):
+            texels[sel] = bc7_decode_mode(lo[sel], hi[sel], mode)
+
+    return texels
+
+
+def bc6h_unquantize(v, bits, signed):
+    if signed:
+        if bits >= 16:
+            return v
+
+        unq = np.abs(v)
+        unq = np.where(unq >= (1 << (bits - 1)) - 1, 0x7fff, ((unq << 15) + 0x4000) >> (bits - 1))
+        unq = np.where(v == 0, 0, unq)
+
+        return np.where(v < 0, -unq, unq)
+
+    if bits >= 15:
+        return v
+
+    return np.where(v == 0, 0, np.where(v == (1 << bits) - 1, 0xffff, ((v << 16) + 0x8000) >> bits))
+
+
+def bc6h_finish_unquantize(v, signed):
+    """
+    Scales interpolated values to the bits of a half float.
+    """
+    if not signed:
+        return (v * 31) >> 6
+
+    magnitude = (np.abs(v) * 31) >> 5
+    return np.where((v < 0) & (magnitude > 0), 0x8000 | magnitude, magnitude)
+
+
+def bc6h_decode_mode(lo, hi, mode, signed):
+    transformed, partitioned, endpointBits, deltaBits, fields = BC6H_MODES[mode]
+
+    numBlocks = len(lo)
+    pos = 2 if mode < 2 else 5
+
+    ep = np.zeros((12, numBlocks), dtype=np.int32)
+    for field, fieldBits, shift in fields:
+        ep[field] |= getBits(lo, hi, pos, fieldBits) << shift; pos += fieldBits
+
+    numEndpoints = 4 if partitioned else 2
+    mask = (1 << endpointBits) - 1
+
+    endpoints = np.empty((numBlocks, numEndpoints, 3), dtype=np.int32)
+    for comp in range(3):
+        values = ep[comp * 4:comp * 4 + numEndpoints]
+
+        if signed:
+            values[0] = SignExtend(values[0], endpointBits)
+
+        for i in range(1, numEndpoints):
+            if signed or transformed:
+                values[i] = SignExtend(values[i], deltaBits[comp])
+
+            if transformed:
+                values[i] = (values[i] + values[0]) & mask
+                if signed:
+                    values[i] = SignExtend(values[i], endpointBits)
+
+        endpoints[:, :, comp] = bc6h_unquantize(values, endpointBits, signed).T
+
+    if partitioned:
+        partition = getBits(lo, hi, pos, 5); pos += 5
+        numSubsets, indexBits = 2, 3
+
+    else:
+        partition = np.zeros(numBlocks, dtype=np.intp)
+        numSubsets, indexBits = 1, 4
+
+    subsets = SUBSETS[numSubsets][partition]
+    weights = WEIGHTS[indexBits][getIndices(lo, hi, pos, ANCHORS[numSubsets][partition], indexBits)][:, :, None]
+
+    first = np.arange(0, numBlocks * numEndpoints, numEndpoints)[:, None] + 2 * subsets
+    endpoints = endpoints.reshape(-1, 3)
+    e0 = endpoints.take(first, axis=0)
+    e1 = endpoints.take(first + 1, axis=0)
+
+    return bc6h_finish_unquantize(((64 - weights) * e0 + weights * e1 + 32) >> 6, signed)
+
+
+def bc6h_decode_blocks(lo, hi, modes, signed):
+    """
+    Returns the (R, G, B) half floats of every texel, as integers.
+    """
+    texels = np.zeros((len(lo), 16, 3), dtype=np.int32)
+
+    for mode in BC6H_MODES:
+        sel = np.nonzero(modes == mode)[0]
+        if len(sel):
+            texels[sel] = bc6h_decode_mode(lo[sel], hi[sel], mode, signed)
+
+    return texels
+
+
+def decompressBC6H(data, width, height, SIGNED, HDR, blockAddrs=None, out=None):
+    lo, hi = getBlockWords(data, width, height, blockAddrs)
+    first = (lo & np.uint64(0x1f)).astype(np.int32)
+    halves = bc6h_decode_blocks(lo, hi, np.where(first & 2, first, first & 3), SIGNED)
+
+    if HDR:
+        texels = np.empty(halves.shape[:2] + (4,), dtype='<u2')
+        texels[:, :, :3] = halves
+        texels[:, :, 3] = 0x3c00
+
+        return toImage(texels, width, height, '<u2', out)
+
+    texels = np.empty(halves.shape[:2] + (4,), dtype=np.uint8)
+    texels[:, :, :3] = HALF_TO_UNORM8_NP[halves]
+    texels[:, :, 3] = 255
+
+    return toImage(texels, width, height, out=out)
+
+
+def decompressBC7(data, width, height, blockAddrs=None, out=None):
+    lo, hi = getBlockWords(data, width, height, blockAddrs)
+    modes = BC7_MODE_LUT[lo & np.uint64(0xff)]
+
+    return toImage(bc7_decode_blocks(lo, hi, modes), width, height, out=out)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# BCn Parallel Decompressor
+# Version 0.1
+# Copyright © 2018 MasterVermilli0n / AboodXD
+
+# parallel.py
+# Decodes bands of block rows across a process pool into shared memory.
+
+################################################################
+################################################################
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+# Block rows per band; textures with fewer than two bands are decoded in the calling process
+MIN_BAND_ROWS = 64
+
+# format -> bytes per block
+BLOCK_SIZES = {
+    'DXT1': 8, 'DXT3': 16, 'DXT5': 16,
+    'BC4': 8, 'BC5': 16, 'BC6H': 16, 'BC7': 16,
+    'ASTC': 16,
+}
+
+
+def getDecompressor(format_):
+    from . import decompressDXT1, decompressDXT3, decompressDXT5, decompressBC4, decompressBC5, decompressBC6H, decompressBC7
+    from .astc import decodeRows
+
+    return {
+        'DXT1': decompressDXT1, 'DXT3': decompressDXT3, 'DXT5': decompressDXT5,
+        'BC4': decompressBC4, 'BC5': decompressBC5, 'BC6H': decompressBC6H, 'BC7': decompressBC7,
+        'ASTC': decodeRows,
+    }[format_]
+
+
+def getBlockDims(format_, args):
+    """
+    ASTC takes its block size as the first two args; BCn blocks are 4x4.
+    """
+    return tuple(args[:2]) if format_ == 'ASTC' else (4, 4)
+
+
+def decodeBand(name, offset, size, format_, data, width, height, args):
+    """
+    Decodes one band straight into its size bytes of the shared output image at offset.
+    """
+    shm = shared_memory.SharedMemory(name)
+    try:
+        with shm.buf[offset:offset + size] as out:
+            return len(getDecompressor(format_)(data, width, height, *args, out=out))
+
+    finally:
+        shm.close()
+
+
+def decompress(format_, data, width, height, *args, numWorkers=None, minBandRows=MIN_BAND_ROWS):
+    """
+    Decodes a BCn or ASTC texture in bands of at least minBandRows block rows.
+    format_ is one of BLOCK_SIZES; args are passed on to the decompressor
+    (SNORM, SIGNED, HDR, or blkWidth, blkHeight, SRGB for ASTC).
+    """
+    decompressor = getDecompressor(format_)
+
+    blkWidth, blkHeight = getBlockDims(format_, args)
+    blocksPerRow = (width + blkWidth - 1) // blkWidth
+    blockRows = (height + blkHeight - 1) // blkHeight
+
+    if numWorkers is None:
+        numWorkers = os.cpu_count() or 1
+
+    numBands = min(numWorkers, blockRows // max(1, minBandRows))
+    if numBands < 2:
+        return decompressor(data, width, height, *args)
+
+    rowsPerBand = (blockRows + numBands - 1) // numBands
+    numBands = (blockRows + rowsPerBand - 1) // rowsPerBand
+    rowSize = blocksPerRow * BLOCK_SIZES[format_]
+
+    # BC6H HDR decodes to RGBA16F
+    bpp = 8 if format_ == 'BC6H' and args[1:2] and args[1] else 4
+    size = width * height * bpp
+
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        with ProcessPoolExecutor(numBands) as executor:
+            futures = []
+            for by in range(0, blockRows, rowsPerBand):
+                bandHeight = min(rowsPerBand * blkHeight, height - by * blkHeight)
+                futures.append(executor.submit(
+                    decodeBand, shm.name, by * blkHeight * width * bpp, width * bandHeight * bpp, format_,
+                    data[by * rowSize:(by + rowsPerBand) * rowSize], width, bandHeight, args,
+                ))
+
+            for future in futures:
+                if not future.result():
+                    return b''
+
+        return bytes(shm.buf[:size])
+
+    finally:
+        shm.close()
+        shm.unlink()
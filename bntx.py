@@ -20,14 +20,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import os.path
-from PyQt5 import QtWidgets
+from array import array
+import mmap
+import os
+import warnings
 
 from bytes import bytes_to_string
 import dds
 import bcn
 import globals
-from structs import struct, BNTXHeader, TexContainer, BlockHeader, TextureInfo, TexInfo
+from structs import struct, BNTXHeader, TexContainer, TextureInfo, DictHeader, DictNode, TexInfo, getBRTIStruct
 
 try:
     import pyximport; pyximport.install()
@@ -41,10 +43,72 @@ DIV_ROUND_UP = swizzle.DIV_ROUND_UP
 round_up = swizzle.round_up
 pow2_round_up = swizzle.pow2_round_up
 
+# Mip levels bigger than this are deswizzled and written out in bands of rows
+EXTRACT_BAND_SIZE = 0x1000000
 
-def read(file):
+# Size of the buffer extracted files are written through
+WRITE_BUFFER_SIZE = 0x100000
+
+
+class BNTXError(Exception):
+    """
+    Base of the errors raised by this module.
+    """
+
+
+class InvalidFileError(BNTXError):
+    """
+    The file is not a BNTX file that can be read.
+    """
+
+
+class TextureNotFoundError(BNTXError):
+    """
+    No texture has the given name.
+    """
+
+
+class UnsupportedTextureError(BNTXError):
+    """
+    The texture can't be converted.
+    """
+
+
+class UnsupportedDDSError(BNTXError):
+    """
+    The DDS file can't be injected or patched into the texture.
+    """
+
+
+class TextureTooLargeError(BNTXError):
+    """
+    The new texture data doesn't fit where the original one was.
+    """
+
+
+class PatchError(BNTXError):
+    """
+    The region can't be patched into the texture.
+    """
+
+
+class MipCountWarning(UserWarning):
+    """
+    The DDS file has more mipmaps than the texture; the extra ones are dropped.
+    """
+
+
+def mapFile(file):
+    """
+    Memory-maps a BNTX file and parses its headers.
+    Returns (f, bom, header, texContainer). Raises InvalidFileError on error.
+    """
     with open(file, "rb") as inf:
-        f = inf.read()
+        try:
+            f = mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ)
+
+        except ValueError:  # Empty file
+            f = b''
 
     pos = 0
 
@@ -55,27 +119,119 @@ def read(file):
         bom = '>'
 
     else:
-        QtWidgets.QMessageBox.warning(None, "Error", "Invalid BOM!")
-        return False
+        raise InvalidFileError("Invalid BOM!")
 
     header = BNTXHeader(bom)
     header.data(f, pos)
     pos += header.size
 
     if header.magic != b'BNTX\0\0\0\0':
-        QtWidgets.QMessageBox.warning(None, "Error", "Invalid file header!")
-        return False
-
-    fnameLen = struct.unpack(bom + 'H', f[header.fileNameAddr - 2:header.fileNameAddr])[0]
-    fname = bytes_to_string(f[header.fileNameAddr:header.fileNameAddr + fnameLen], fnameLen)
+        raise InvalidFileError("Invalid file header!")
 
     texContainer = TexContainer(bom)
     texContainer.data(f, pos)
-    pos += texContainer.size
 
     if texContainer.target not in [b'NX  ', b'Gen ']:
-        QtWidgets.QMessageBox.warning(None, "Error", "Unsupported target platform!")
-        return False
+        raise InvalidFileError("Unsupported target platform!")
+
+    return f, bom, header, texContainer
+
+
+def readTexInfo(f, bom, target, pos, values=None):
+    """
+    Parses the BRTI block at pos, unless its values were already unpacked.
+    Returns a TexInfo or None if it's not a BRTI block.
+    """
+    if values is None:
+        values = getBRTIStruct(bom, 0xA0).unpack_from(f, pos)
+
+    if values[0] != b'BRTI':
+        return None
+
+    pos += 0x10
+
+    info = TextureInfo(bom)
+    info.set(values[3:])
+
+    nameLen = struct.unpack(bom + 'H', f[info.nameAddr:info.nameAddr + 2])[0]
+    name = bytes_to_string(f[info.nameAddr + 2:info.nameAddr + 2 + nameLen], nameLen)
+
+    compSel = []
+    compSel2 = []
+    for i in range(4):
+        value = (info.compSel >> (8 * (3 - i))) & 0xff
+        compSel2.append(value)
+        if value == 0:
+            value = 5 - len(compSel)
+
+        compSel.append(value)
+
+    if info.type_ not in globals.types:
+        globals.types[info.type_] = "Unknown"
+
+    mipPtrs = struct.unpack_from(bom + '%dq' % max(1, info.numMips), f, info.ptrsAddr)
+
+    dataAddr = mipPtrs[0]
+    mipOffsets = array('q', [mipPtr - dataAddr for mipPtr in mipPtrs])
+
+    tex = TexInfo()
+
+    tex.infoAddr = pos
+    tex.bom = bom
+    tex.target = target
+
+    tex.name = name
+
+    tex.readTexLayout = info.flags & 1
+    tex.sparseBinding = info.flags >> 1
+    tex.sparseResidency = info.flags >> 2
+    tex.dim = info.dim
+    tex.tileMode = info.tileMode
+    tex.swizzle = info.swizzle
+    tex.numMips = info.numMips
+    tex.numSamples = info.numSamples
+    tex.width = info.width
+    tex.height = info.height
+    tex.depth = info.depth
+    tex.format = info.format_
+    tex.accessFlags = info.accessFlags
+    tex.arrayLength = info.arrayLength
+    tex.blockHeightLog2 = info.textureLayout & 7
+    tex.textureLayout2 = info.textureLayout2
+    tex.imageSize = info.imageSize
+
+    tex.compSel = compSel
+    tex.compSel2 = compSel2
+
+    tex.alignment = info.alignment
+    tex.type = info.type_
+
+    tex.nameAddr = info.nameAddr
+    tex.parentAddr = info.parentAddr
+    tex.ptrsAddr = info.ptrsAddr
+    tex.userDataAddr = info.userDataAddr
+    tex.texPtr = info.texPtr
+    tex.texViewPtr = info.texViewPtr
+    tex.descSlotDataAddr = info.descSlotDataAddr
+    tex.userDictAddr = info.userDictAddr
+
+    tex.mipOffsets = mipOffsets
+    tex.dataAddr = dataAddr
+
+    tex.file = f
+
+    return tex
+
+
+def read(file):
+    """
+    Memory-maps a BNTX file and parses its texture headers.
+    The texture data is not read until it's accessed.
+    """
+    f, bom, header, texContainer = mapFile(file)
+
+    fnameLen = struct.unpack(bom + 'H', f[header.fileNameAddr - 2:header.fileNameAddr])[0]
+    fname = bytes_to_string(f[header.fileNameAddr:header.fileNameAddr + fnameLen], fnameLen)
 
     target = 0 if texContainer.target == b'Gen ' else 1
 
@@ -83,100 +239,127 @@ def read(file):
     texNames = []
     texSizes = []
 
-    for i in range(texContainer.count):
-        pos = struct.unpack(bom + 'q', f[texContainer.infoPtrsAddr + i * 8:texContainer.infoPtrsAddr + i * 8 + 8])[0]
+    count = texContainer.count
+    infoPtrs = struct.unpack_from(bom + '%dq' % count, f, texContainer.infoPtrsAddr)
 
-        infoHeader = BlockHeader(bom)
-        infoHeader.data(f, pos)
-        pos += infoHeader.size
+    # Unpack all the BRTI blocks at once if they are laid out back to back
+    stride = infoPtrs[1] - infoPtrs[0] if count > 1 else 0xA0
 
-        info = TextureInfo(bom)
-        info.data(f, pos)
+    if (count and stride >= 0xA0 and infoPtrs[0] + count * stride <= len(f)
+            and infoPtrs == tuple(range(infoPtrs[0], infoPtrs[0] + count * stride, stride))):
+        infoValues = getBRTIStruct(bom, stride).iter_unpack(memoryview(f)[infoPtrs[0]:infoPtrs[0] + count * stride])
 
-        if infoHeader.magic != b'BRTI':
+    else:
+        infoValues = [None] * count
+
+    for pos, values in zip(infoPtrs, infoValues):
+        tex = readTexInfo(f, bom, target, pos, values)
+        if tex is None:
             continue
 
-        nameLen = struct.unpack(bom + 'H', f[info.nameAddr:info.nameAddr + 2])[0]
-        name = bytes_to_string(f[info.nameAddr + 2:info.nameAddr + 2 + nameLen], nameLen)
+        textures.append(tex)
+        texNames.append(tex.name)
+        texSizes.append(tex.imageSize)
 
-        compSel = []
-        compSel2 = []
-        for i in range(4):
-            value = (info.compSel >> (8 * (3 - i))) & 0xff
-            compSel2.append(value)
-            if value == 0:
-                value = 5 - len(compSel)
+    globals.fileData = f
+    globals.texSizes = texSizes
 
-            compSel.append(value)
+    return fname, texContainer.target.decode('utf-8'), textures, texNames
 
-        if info.type_ not in globals.types:
-            globals.types[info.type_] = "Unknown"
 
-        dataAddr = struct.unpack(bom + 'q', f[info.ptrsAddr:info.ptrsAddr + 8])[0]
-        mipOffsets = {0: 0}
+def getRefBit(key, refBit):
+    """
+    Returns the bit of key tested by a _DIC node.
+    Bits are counted from the last character of the key.
+    """
+    charIndex = refBit >> 3
+    if charIndex >= len(key):
+        return 0
 
-        for i in range(1, info.numMips):
-            mipOffset = struct.unpack(bom + 'q', f[info.ptrsAddr + (i * 8):info.ptrsAddr + (i * 8) + 8])[0]
-            mipOffsets[i] = mipOffset - dataAddr
+    return (key[len(key) - charIndex - 1] >> (refBit & 7)) & 1
 
-        tex = TexInfo()
 
-        tex.infoAddr = pos
-        tex.info = info
-        tex.bom = bom
-        tex.target = target
+def findName(f, bom, dictAddr, name):
+    """
+    Looks a name up in the _DIC dictionary at dictAddr,
+    touching only the nodes on its path. Returns its index or -1.
+    """
+    if not dictAddr:
+        return -1
 
-        tex.name = name
+    dictHeader = DictHeader(bom)
+    dictHeader.data(f, dictAddr)
 
-        tex.readTexLayout = info.flags & 1
-        tex.sparseBinding = info.flags >> 1
-        tex.sparseResidency = info.flags >> 2
-        tex.dim = info.dim
-        tex.tileMode = info.tileMode
-        tex.numMips = info.numMips
-        tex.width = info.width
-        tex.height = info.height
-        tex.format = info.format_
-        tex.arrayLength = info.arrayLength
-        tex.blockHeightLog2 = info.textureLayout & 7
-        tex.imageSize = info.imageSize
+    if dictHeader.magic != b'_DIC':
+        return -1
 
-        tex.compSel = compSel
-        tex.compSel2 = compSel2
+    key = name.encode('utf-8')
 
-        tex.alignment = info.alignment
-        tex.type = info.type_
+    node = DictNode(bom)
+    node.data(f, dictAddr + dictHeader.size)
 
-        tex.mipOffsets = mipOffsets
-        tex.dataAddr = dataAddr
+    index = node.left
+    child = DictNode(bom)
+    child.data(f, dictAddr + dictHeader.size + index * child.size)
 
-        tex.data = f[dataAddr:dataAddr + info.imageSize]
+    # The root node has a refBit of -1; the search ends on the first link back up the trie
+    while node.refBit < child.refBit:
+        node = child
+        index = node.right if getRefBit(key, node.refBit) else node.left
 
-        textures.append(tex)
-        texNames.append(name)
-        texSizes.append(info.imageSize)
+        child = DictNode(bom)
+        child.data(f, dictAddr + dictHeader.size + index * child.size)
 
-    globals.fileData = bytearray(f)
-    globals.texSizes = texSizes
+    if not 0 < index <= dictHeader.count:
+        return -1
 
-    return fname, texContainer.target.decode('utf-8'), textures, texNames
+    nameLen = struct.unpack(bom + 'H', f[child.nameAddr:child.nameAddr + 2])[0]
+    if f[child.nameAddr + 2:child.nameAddr + 2 + nameLen] != key:
+        return -1
 
+    return index - 1
 
-def decode(tex):
-    if (tex.format >> 8) in globals.blk_dims:
-        blkWidth, blkHeight = globals.blk_dims[tex.format >> 8]
 
-    else:
-        blkWidth, blkHeight = 1, 1
+def readTexByName(file, name):
+    """
+    Reads a single texture by its name, without parsing the other textures.
+    Returns its index and TexInfo. Raises TextureNotFoundError if it couldn't be found.
+    """
+    f, bom, header, texContainer = mapFile(file)
+
+    index = findName(f, bom, texContainer.dictAddr, name)
+    if not 0 <= index < texContainer.count:
+        raise TextureNotFoundError("Texture not found: " + name)
+
+    pos = struct.unpack(bom + 'q', f[texContainer.infoPtrsAddr + index * 8:texContainer.infoPtrsAddr + index * 8 + 8])[0]
+
+    tex = readTexInfo(f, bom, 0 if texContainer.target == b'Gen ' else 1, pos)
+    if tex is None:
+        raise TextureNotFoundError("Texture not found: " + name)
+
+    return index, tex
+
 
-    bpp = globals.bpps[tex.format >> 8]
+def checkFormat(tex):
+    """
+    Raises UnsupportedTextureError if the format of the texture can't be converted.
+    """
+    if tex.format not in globals.formats or tex.bpp is None:
+        raise UnsupportedTextureError("Can't convert: %s\nUnsupported format." % tex.name)
+
+
+def decode(tex):
+    checkFormat(tex)
+
+    blkWidth, blkHeight = tex.blkWidth, tex.blkHeight
+    bpp = tex.bpp
 
     result_ = []
 
     linesPerBlockHeight = (1 << tex.blockHeightLog2) * 8
     blockHeightShift = 0
 
-    for mipLevel in tex.mipOffsets:
+    for mipLevel, mipOffset in enumerate(tex.mipOffsets):
         width = max(1, tex.width >> mipLevel)
         height = max(1, tex.height >> mipLevel)
 
@@ -185,20 +368,157 @@ def decode(tex):
         if pow2_round_up(DIV_ROUND_UP(height, blkHeight)) < linesPerBlockHeight:
             blockHeightShift += 1
 
-        mipOffset = tex.mipOffsets[mipLevel]
+        result = bytearray(size)
 
-        result = swizzle.deswizzle(
+        swizzle.deswizzle_into(
             width, height, blkWidth, blkHeight, tex.target, bpp, tex.tileMode,
-            max(0, tex.blockHeightLog2 - blockHeightShift), tex.data[mipOffset:],
+            max(0, tex.blockHeightLog2 - blockHeightShift), memoryview(tex.data)[mipOffset:], result,
         )
 
-        result_.append(result[:size])
+        result_.append(result)
 
     return result_, blkWidth, blkHeight
 
 
-def extract(tex, BFRESPath, exportAs, dontShowMsg=False):
-    if tex.format in globals.formats and tex.dim == 2 and tex.arrayLength < 2 and tex.tileMode in globals.tileModes:
+def getMipBlockHeightLog2(tex, blkHeight, mipLevel):
+    linesPerBlockHeight = (1 << tex.blockHeightLog2) * 8
+    blockHeightShift = 0
+
+    for level in range(mipLevel + 1):
+        height = max(1, tex.height >> level)
+
+        if pow2_round_up(DIV_ROUND_UP(height, blkHeight)) < linesPerBlockHeight:
+            blockHeightShift += 1
+
+    return max(0, tex.blockHeightLog2 - blockHeightShift)
+
+
+def decodeRegion(tex, mipLevel, x, y, w, h):
+    """
+    Deswizzles only the w x h region at (x, y) of a mip level.
+    For block compressed formats, the region must be aligned to the blocks.
+    """
+    checkFormat(tex)
+
+    blkWidth, blkHeight = tex.blkWidth, tex.blkHeight
+    bpp = tex.bpp
+
+    width = max(1, tex.width >> mipLevel)
+    height = max(1, tex.height >> mipLevel)
+
+    mipOffset = tex.mipOffsets[mipLevel]
+
+    result = swizzle.deswizzle_region(
+        x, y, w, h, width, height, blkWidth, blkHeight, tex.target, bpp, tex.tileMode,
+        getMipBlockHeightLog2(tex, blkHeight, mipLevel), memoryview(tex.data)[mipOffset:],
+    )
+
+    return result, blkWidth, blkHeight
+
+
+def decodeBCn(tex, mipLevel=0):
+    """
+    Decodes a mip level of a BCn texture to RGBA8 straight from its swizzled data,
+    without deswizzling it to a linear buffer first.
+    """
+    checkFormat(tex)
+
+    blkWidth, blkHeight = tex.blkWidth, tex.blkHeight
+    bpp = tex.bpp
+
+    width = max(1, tex.width >> mipLevel)
+    height = max(1, tex.height >> mipLevel)
+
+    blockHeightLog2 = getMipBlockHeightLog2(tex, blkHeight, mipLevel)
+    blockAddrs = swizzle.getElemAddrs(width, height, blkWidth, blkHeight, tex.target, bpp, tex.tileMode, blockHeightLog2)
+
+    size = swizzle.getSwizzledSize(width, height, blkWidth, blkHeight, tex.target, bpp, tex.tileMode, blockHeightLog2)
+    data = memoryview(tex.data)[tex.mipOffsets[mipLevel]:]
+    data = data[:size] if len(data) >= size else b''.join([data, bytes(size - len(data))])
+
+    if (tex.format >> 8) == 0x1a:
+        return bcn.decompressDXT1(data, width, height, blockAddrs=blockAddrs)
+
+    elif (tex.format >> 8) == 0x1b:
+        return bcn.decompressDXT3(data, width, height, blockAddrs=blockAddrs)
+
+    elif (tex.format >> 8) == 0x1c:
+        return bcn.decompressDXT5(data, width, height, blockAddrs=blockAddrs)
+
+    elif (tex.format >> 8) == 0x1d:
+        return bcn.decompressBC4(data, width, height, 0 if tex.format & 3 == 1 else 1, blockAddrs=blockAddrs)
+
+    elif (tex.format >> 8) == 0x1e:
+        return bcn.decompressBC5(data, width, height, 0 if tex.format & 3 == 1 else 1, blockAddrs=blockAddrs)
+
+    elif (tex.format >> 8) == 0x1f:
+        return bcn.decompressBC6H(data, width, height, 1 if tex.format == 0x1f05 else 0, blockAddrs=blockAddrs)
+
+    return bcn.decompressBC7(data, width, height, blockAddrs=blockAddrs)
+
+
+def iterDecode(tex, numMips=None, bandSize=EXTRACT_BAND_SIZE):
+    """
+    Deswizzles the first numMips mip levels (all by default) one after another,
+    yielding the linear data of each one as it is produced.
+    Mip levels bigger than bandSize are yielded in bands of rows instead.
+    Whole mip levels are deswizzled into one buffer that is reused,
+    so every yielded view is only valid until the next one is requested.
+    """
+    checkFormat(tex)
+
+    blkWidth, blkHeight = tex.blkWidth, tex.blkHeight
+    bpp = tex.bpp
+    buffer = None
+
+    for mipLevel in range(len(tex.mipOffsets))[:numMips]:
+        width = max(1, tex.width >> mipLevel)
+        height = max(1, tex.height >> mipLevel)
+
+        rowSize = DIV_ROUND_UP(width, blkWidth) * bpp
+        numRows = DIV_ROUND_UP(height, blkHeight)
+        size = rowSize * numRows
+
+        blockHeightLog2 = getMipBlockHeightLog2(tex, blkHeight, mipLevel)
+        data = memoryview(tex.data)[tex.mipOffsets[mipLevel]:]
+
+        if size <= bandSize:
+            if buffer is None or len(buffer) < size:
+                buffer = bytearray(size)
+
+            swizzle.deswizzle_into(
+                width, height, blkWidth, blkHeight, tex.target, bpp, tex.tileMode,
+                blockHeightLog2, data, buffer,
+            )
+
+            yield memoryview(buffer)[:size]
+            continue
+
+        bandRows = max(1, bandSize // rowSize)
+
+        for row in range(0, numRows, bandRows):
+            y = row * blkHeight
+            h = min(bandRows * blkHeight, height - y)
+
+            yield swizzle.deswizzle_region(
+                0, y, width, h, width, height, blkWidth, blkHeight, tex.target, bpp, tex.tileMode,
+                blockHeightLog2, data,
+            )
+
+
+def getExtension(tex):
+    """
+    Returns the extension of the file the texture is extracted to.
+    """
+    return '.astc' if (tex.format >> 8) in globals.ASTC_formats else '.dds'
+
+
+def extract(tex, file):
+    """
+    Extracts the texture to a DDS file, or an ASTC file for ASTC textures.
+    Raises UnsupportedTextureError if it can't be converted.
+    """
+    if tex.format in globals.formats and tex.bpp is not None and tex.dim == 2 and tex.arrayLength < 2 and tex.tileMode in globals.tileModes:
         if tex.format == 0x101:
             format_ = "la4"
 
@@ -268,49 +588,47 @@ def extract(tex, BFRESPath, exportAs, dontShowMsg=False):
         elif tex.format == 0x3b01:
             format_ = "bgr5a1"
 
-        result_, blkWidth, blkHeight = decode(tex)
-
-        if exportAs:
-            if (tex.format >> 8) in globals.ASTC_formats:
-                file = QtWidgets.QFileDialog.getSaveFileName(None, "Save File", "", "ASTC (*.astc)")[0]
-
-            else:
-                file = QtWidgets.QFileDialog.getSaveFileName(None, "Save File", "", "DDS (*.dds)")[0]
-
-            if not file:
-                return False
-
-        elif (tex.format >> 8) in globals.ASTC_formats:
-            file = os.path.join(BFRESPath, tex.name + '.astc')
-
-        else:
-            file = os.path.join(BFRESPath, tex.name + '.dds')
+        blkWidth, blkHeight = tex.blkWidth, tex.blkHeight
 
         if (tex.format >> 8) in globals.ASTC_formats:
-            outBuffer = b''.join([
+            hdr = b''.join([
                 b'\x13\xAB\xA1\x5C', blkWidth.to_bytes(1, "little"),
                 blkHeight.to_bytes(1, "little"), b'\1',
                 tex.width.to_bytes(3, "little"),
                 tex.height.to_bytes(3, "little"), b'\1\0\0',
-                result_[0],
             ])
 
-            with open(file, "wb+") as output:
-                output.write(outBuffer)
+            numMips = 1
 
         else:
+            size = DIV_ROUND_UP(tex.width, blkWidth) * DIV_ROUND_UP(tex.height, blkHeight) * tex.bpp
+
             hdr = dds.generateHeader(
                 tex.numMips, tex.width, tex.height, format_, list(reversed(tex.compSel)),
-                len(result_[0]), (tex.format >> 8) in globals.BCn_formats,
+                size, (tex.format >> 8) in globals.BCn_formats,
             )
 
-            with open(file, "wb+") as output:
-                output.write(b''.join([hdr, b''.join(result_)]))
+            numMips = None
+
+        # Every mip level is written as soon as it is deswizzled
+        try:
+            with open(file, "wb", WRITE_BUFFER_SIZE) as output:
+                output.write(hdr)
+
+                for data in iterDecode(tex, numMips):
+                    output.write(data)
+
+        except:
+            # Don't leave a truncated file behind
+            if os.path.isfile(file):
+                os.remove(file)
 
-    elif not dontShowMsg:
+            raise
+
+    else:
         msg = "Can't convert: " + tex.name
 
-        if tex.format not in globals.formats:
+        if tex.format not in globals.formats or tex.bpp is None:
             context = "Unsupported format."
 
         elif tex.tileMode not in globals.tileModes:
@@ -322,47 +640,32 @@ def extract(tex, BFRESPath, exportAs, dontShowMsg=False):
         else:
             context = "Unsupported array length."
 
-        QtWidgets.QMessageBox.warning(None, "Error", '\n'.join([msg, context]))
-        return False
-
-
-def getCurrentMipOffset_Size(width, height, blkWidth, blkHeight, bpp, currLevel):
-    offset = 0
-
-    for mipLevel in range(currLevel):
-        width_ = DIV_ROUND_UP(max(1, width >> mipLevel), blkWidth)
-        height_ = DIV_ROUND_UP(max(1, height >> mipLevel), blkHeight)
-
-        offset += width_ * height_ * bpp
-
-    width_ = DIV_ROUND_UP(max(1, width >> currLevel), blkWidth)
-    height_ = DIV_ROUND_UP(max(1, height >> currLevel), blkHeight)
-
-    size = width_ * height_ * bpp
-
-    return offset, size
+        raise UnsupportedTextureError('\n'.join([msg, context]))
 
 
 def inject(tex, tileMode, SRGB, sparseBinding, sparseResidency, importMips, oldImageSize, f):
-    width, height, format_, fourcc, dataSize, compSel, numMips, data = dds.readDDS(f, SRGB)
+    """
+    Replaces the texture with the contents of a DDS file.
+    Raises UnsupportedDDSError or TextureTooLargeError if it can't,
+    and warns with MipCountWarning if some of the mipmaps are dropped.
+    """
+    width, height, format_, fourcc, dataSize, compSel, numMips, mips = dds.mapDDS(f, SRGB)
 
-    if 0 in [width, dataSize] and data == []:
-        QtWidgets.QMessageBox.warning(None, "Error", "Unsupported DDS file!")
-        return False
+    if 0 in [width, dataSize] and mips == []:
+        raise UnsupportedDDSError("Unsupported DDS file!")
 
-    if format_ not in globals.formats:
-        QtWidgets.QMessageBox.warning(None, "Error", "Unsupported DDS format!")
-        return False
+    if format_ not in globals.formats or (format_ >> 8) not in globals.bpps:
+        raise UnsupportedDDSError("Unsupported DDS format!")
 
     if not importMips:
         numMips = 1
 
     else:
         if tex.numMips < numMips + 1:
-            QtWidgets.QMessageBox.warning(
-                None, "Warning",
+            warnings.warn(
                 "This DDS file has more mipmaps (%d) than the original image (%d)!"
                 "\n%d mipmaps will be imported." % (numMips, tex.numMips - 1, tex.numMips - 1),
+                MipCountWarning,
             )
 
         numMips = max(1, min(tex.numMips, numMips + 1))
@@ -419,32 +722,25 @@ def inject(tex, tileMode, SRGB, sparseBinding, sparseResidency, importMips, oldI
             surfSize += pitch * round_up(height_, max(1, blockHeight >> blockHeightShift) * 8)
 
     if surfSize > oldImageSize:
-        QtWidgets.QMessageBox.warning(
-            None, "Error",
+        raise TextureTooLargeError(
             'This DDS has a larger filesize than the original image!'
-            '\nFor lowest filesize possible, use tiling mode "Linear".',
+            '\nFor lowest filesize possible, use tiling mode "Linear".'
         )
 
-        return False
-
-    result = []
+    result = bytearray(surfSize)
     surfSize = 0
-    mipOffsets = {}
+    mipOffsets = array('q')
     blockHeightShift = 0
 
     for mipLevel in range(numMips):
-        offset, size = getCurrentMipOffset_Size(width, height, blkWidth, blkHeight, bpp, mipLevel)
-        data_ = data[offset:offset + size]
-
         width_ = max(1, width >> mipLevel)
         height_ = max(1, height >> mipLevel)
 
         width__ = DIV_ROUND_UP(width_, blkWidth)
         height__ = DIV_ROUND_UP(height_, blkHeight)
 
-        dataAlignBytes = b'\0' * (round_up(surfSize, alignment) - surfSize)
-        surfSize += len(dataAlignBytes)
-        mipOffsets[mipLevel] = surfSize
+        surfSize = round_up(surfSize, alignment)
+        mipOffsets.append(surfSize)
 
         if tileMode == 1:
             pitch = width__ * bpp
@@ -461,10 +757,10 @@ def inject(tex, tileMode, SRGB, sparseBinding, sparseResidency, importMips, oldI
             pitch = round_up(width__ * bpp, 64)
             surfSize += pitch * round_up(height__, max(1, blockHeight >> blockHeightShift) * 8)
 
-        result.append(bytearray(dataAlignBytes) + swizzle.swizzle(
+        swizzle.swizzle_into(
             width_, height_, blkWidth, blkHeight, tex.target, bpp, tileMode,
-            max(0, blockHeightLog2 - blockHeightShift), data_,
-        ))
+            max(0, blockHeightLog2 - blockHeightShift), mips[mipLevel], result, mipOffsets[mipLevel],
+        )
 
     tex.readTexLayout = 1 if tileMode == 0 else 0
     tex.sparseBinding = sparseBinding
@@ -476,7 +772,6 @@ def inject(tex, tileMode, SRGB, sparseBinding, sparseResidency, importMips, oldI
     tex.width = width
     tex.height = height
     tex.format = format_
-    tex.accessFlags = 0x20
     tex.arrayLength = 1
     tex.blockHeightLog2 = blockHeightLog2
     tex.imageSize = surfSize
@@ -484,11 +779,72 @@ def inject(tex, tileMode, SRGB, sparseBinding, sparseResidency, importMips, oldI
     tex.compSel2 = tex.compSel.copy()
     tex.alignment = alignment
     tex.type = 1
-    tex.data = b''.join(result)
+    tex.data = result
 
     return tex
 
 
+def patchRaw(tex, mipLevel, x, y, width, height, data):
+    """
+    Swizzles the linear data of a width x height region in place
+    into the given mip level of the texture, with its top left corner at (x, y).
+    Only the bytes covered by the region are changed. Returns the start and end
+    of the changed bytes relative to the start of the texture data. Raises PatchError on error.
+    """
+    if not 0 <= mipLevel < tex.numMips:
+        raise PatchError("Invalid mipmap level!")
+
+    checkFormat(tex)
+
+    blkWidth, blkHeight = tex.blkWidth, tex.blkHeight
+    bpp = tex.bpp
+
+    mipWidth = max(1, tex.width >> mipLevel)
+    mipHeight = max(1, tex.height >> mipLevel)
+
+    if not isinstance(tex.data, bytearray):
+        tex.data = bytearray(tex.data)
+
+    try:
+        start, end = swizzle.swizzle_region(
+            x, y, width, height, mipWidth, mipHeight, blkWidth, blkHeight, tex.target, bpp, tex.tileMode,
+            getMipBlockHeightLog2(tex, blkHeight, mipLevel), data, tex.data, tex.mipOffsets[mipLevel],
+        )
+
+    except ValueError as e:
+        raise PatchError("Can't patch the texture!\n%s." % e) from e
+
+    start += tex.mipOffsets[mipLevel]
+    end += tex.mipOffsets[mipLevel]
+
+    return start, end
+
+
+def patch(tex, mipLevel, x, y, SRGB, f):
+    """
+    Patches a region of the given mip level with the first image of a DDS file,
+    which must have the same format as the texture.
+    """
+    width, height, format_, fourcc, dataSize, compSel, numMips, mips = dds.mapDDS(f, SRGB)
+
+    if 0 in [width, dataSize] and mips == []:
+        raise UnsupportedDDSError("Unsupported DDS file!")
+
+    if (format_ >> 8) != (tex.format >> 8):
+        raise UnsupportedDDSError("The DDS format does not match the texture format!")
+
+    return patchRaw(tex, mipLevel, x, y, width, height, mips[0])
+
+
+def writePatch(file, tex, start, end):
+    """
+    Writes the bytes changed by patchRaw() in place into the file.
+    """
+    with open(file, "r+b") as out:
+        out.seek(tex.dataAddr + start)
+        out.write(tex.data[start:end])
+
+
 def writeTex(file, tex, oldImageSize, oldNumMips):
     compSel = tex.compSel[0] << 24 | tex.compSel[1] << 16 | tex.compSel[2] << 8 | tex.compSel[3]
 
@@ -502,43 +858,44 @@ def writeTex(file, tex, oldImageSize, oldNumMips):
         tex.sparseResidency << 2 | tex.sparseBinding << 1 | tex.readTexLayout,
         tex.dim,
         tex.tileMode,
-        tex.info.swizzle,
+        tex.swizzle,
         tex.numMips,
-        tex.info.numSamples,
+        tex.numSamples,
         tex.format,
-        tex.info.accessFlags,
+        tex.accessFlags,
         tex.width,
         tex.height,
-        tex.info.depth,
+        tex.depth,
         tex.arrayLength,
         textureLayout,
-        tex.info.textureLayout2,
+        tex.textureLayout2,
         tex.imageSize,
         tex.alignment,
         compSel,
         tex.type,
-        tex.info.nameAddr,
-        tex.info.parentAddr,
-        tex.info.ptrsAddr,
-        tex.info.userDataAddr,
-        tex.info.texPtr,
-        tex.info.texViewPtr,
-        tex.info.descSlotDataAddr,
-        tex.info.userDictAddr,
+        tex.nameAddr,
+        tex.parentAddr,
+        tex.ptrsAddr,
+        tex.userDataAddr,
+        tex.texPtr,
+        tex.texViewPtr,
+        tex.descSlotDataAddr,
+        tex.userDictAddr,
     )
 
-    globals.fileData[tex.infoAddr:tex.infoAddr + 144] = infoHead
-
     ptrs = bytearray(oldNumMips * 8)
 
-    for mipLevel in tex.mipOffsets:
-        mipOffset = tex.mipOffsets[mipLevel]
+    for mipLevel, mipOffset in enumerate(tex.mipOffsets):
         ptrs[mipLevel * 8:mipLevel * 8 + 8] = struct.pack(tex.bom + 'q', tex.dataAddr + mipOffset)
 
-    globals.fileData[tex.info.ptrsAddr:tex.info.ptrsAddr + oldNumMips * 8] = ptrs
+    # Only the texture's own info, mip pointers and data are rewritten
+    with open(file, "r+b") as out:
+        out.seek(tex.infoAddr)
+        out.write(infoHead)
 
-    data = b''.join([tex.data, b'\0' * (oldImageSize - tex.imageSize)])
-    globals.fileData[tex.dataAddr:tex.dataAddr + oldImageSize] = data
+        out.seek(tex.ptrsAddr)
+        out.write(ptrs)
 
-    with open(file, "wb+") as out:
-        out.write(globals.fileData)
+        out.seek(tex.dataAddr)
+        out.write(tex.data)
+        out.write(b'\0' * (oldImageSize - tex.imageSize))
@@ -37,6 +37,7 @@ from PyQt5.QtGui import QIcon, QPixmap, QImage
 from PyQt5 import QtWidgets
 import time
 import traceback
+import warnings
 
 import bntx as BNTX
 import globals
@@ -458,23 +459,26 @@ class MainWindow(QtWidgets.QWidget):
 
         self.prepareOpenFile(file)
 
-        bntxfile = BNTX.read(file)
-        if bntxfile:
-            name, target, textures, texNames = bntxfile
+        try:
+            name, target, textures, texNames = BNTX.read(file)
 
-            if textures:
-                self.fnameLnEdt.setText(name)
-                self.targetLnEdt.setText(target)
-                self.textures = textures
-                self.comboBox.addItems(texNames)
+        except BNTX.BNTXError as e:
+            QtWidgets.QMessageBox.warning(None, "Error", str(e))
+            return False
+
+        if textures:
+            self.fnameLnEdt.setText(name)
+            self.targetLnEdt.setText(target)
+            self.textures = textures
+            self.comboBox.addItems(texNames)
 
-                self.comboBox.setEnabled(True)
-                self.exportButton.setEnabled(True)
-                self.exportAsButton.setEnabled(True)
-                self.exportAllButton.setEnabled(True)
-                self.injectButton.setEnabled(True)
+            self.comboBox.setEnabled(True)
+            self.exportButton.setEnabled(True)
+            self.exportAsButton.setEnabled(True)
+            self.exportAllButton.setEnabled(True)
+            self.injectButton.setEnabled(True)
 
-                self.comboBox.setCurrentIndex(0)
+            self.comboBox.setCurrentIndex(0)
 
     def updateTexInfo(self, index):
         tex = self.textures[index]
@@ -488,9 +492,9 @@ class MainWindow(QtWidgets.QWidget):
         self.dimLnEdt.setText(str(tex.dim))
         self.sparseBindingLnEdt.setText(str(bool(tex.sparseBinding)))
         self.sparseResidencyLnEdt.setText(str(bool(tex.sparseResidency)))
-        self.swizzleLnEdt.setText(str(tex.info.swizzle))
+        self.swizzleLnEdt.setText(str(tex.swizzle))
         self.numMipsLnEdt.setText(str(tex.numMips - 1))
-        self.numSamplesLnEdt.setText(str(tex.info.numSamples))
+        self.numSamplesLnEdt.setText(str(tex.numSamples))
 
         if tex.format in globals.formats:
             self.formatLnEdt.setText(globals.formats[tex.format])
@@ -498,11 +502,11 @@ class MainWindow(QtWidgets.QWidget):
         else:
             self.formatLnEdt.setText(hex(tex.format))
 
-        if tex.info.accessFlags in globals.accessFlags:
-            self.accessFlagsLnEdt.setText(globals.accessFlags[tex.info.accessFlags])
+        if tex.accessFlags in globals.accessFlags:
+            self.accessFlagsLnEdt.setText(globals.accessFlags[tex.accessFlags])
 
         else:
-            self.accessFlagsLnEdt.setText(hex(tex.info.accessFlags))
+            self.accessFlagsLnEdt.setText(hex(tex.accessFlags))
 
         self.widthLnEdt.setText(str(tex.width))
         self.heightLnEdt.setText(str(tex.height))
@@ -519,8 +523,15 @@ class MainWindow(QtWidgets.QWidget):
         self.updatePreview(tex)
 
     def updatePreview(self, tex):
-        if tex.format in [0x101, 0x201, 0x301, 0x501, 0x701, 0x901, 0xb01, 0xb06, 0xe01, 0x1a01, 0x1a06, 0x1b01, 0x1b06, 0x1c01, 0x1c06, 0x1d01, 0x1d02, 0x1e01, 0x1e02]:
-            result, _, _ = BNTX.decode(tex)
+        if tex.format in [0x101, 0x201, 0x301, 0x501, 0x701, 0x901, 0xb01, 0xb06, 0xe01, 0x1a01, 0x1a06, 0x1b01, 0x1b06, 0x1c01, 0x1c06, 0x1d01, 0x1d02, 0x1e01, 0x1e02, 0x1f05, 0x1f0a, 0x2001, 0x2006] or (tex.format >> 8) in globals.ASTC_formats:
+            if (tex.format >> 8) in globals.BCn_formats:
+                data = BNTX.decodeBCn(tex)
+
+                format_ = 'rgba8'
+                bpp = 4
+
+            else:
+                result, _, _ = BNTX.decode(tex)
 
             if tex.format == 0x101:
                 data = result[0]
@@ -570,32 +581,8 @@ class MainWindow(QtWidgets.QWidget):
                 format_ = 'bgr10a2'
                 bpp = 4
 
-            elif (tex.format >> 8) == 0x1a:
-                data = BNTX.bcn.decompressDXT1(result[0], tex.width, tex.height)
-
-                format_ = 'rgba8'
-                bpp = 4
-
-            elif (tex.format >> 8) == 0x1b:
-                data = BNTX.bcn.decompressDXT3(result[0], tex.width, tex.height)
-
-                format_ = 'rgba8'
-                bpp = 4
-
-            elif (tex.format >> 8) == 0x1c:
-                data = BNTX.bcn.decompressDXT5(result[0], tex.width, tex.height)
-
-                format_ = 'rgba8'
-                bpp = 4
-
-            elif (tex.format >> 8) == 0x1d:
-                data = BNTX.bcn.decompressBC4(result[0], tex.width, tex.height, 0 if tex.format & 3 == 1 else 1)
-
-                format_ = 'rgba8'
-                bpp = 4
-
-            elif (tex.format >> 8) == 0x1e:
-                data = BNTX.bcn.decompressBC5(result[0], tex.width, tex.height, 0 if tex.format & 3 == 1 else 1)
+            elif (tex.format >> 8) in globals.ASTC_formats:
+                data = BNTX.bcn.decompressASTC(result[0], tex.width, tex.height, tex.blkWidth, tex.blkHeight, 1 if tex.format & 0xff == 6 else 0)
 
                 format_ = 'rgba8'
                 bpp = 4
@@ -614,17 +601,48 @@ class MainWindow(QtWidgets.QWidget):
         else:
             self.resetPreviewer()
 
+    def extractTex(self, tex, file):
+        try:
+            BNTX.extract(tex, file)
+
+        except BNTX.BNTXError as e:
+            QtWidgets.QMessageBox.warning(None, "Error", str(e))
+            return False
+
     def exportTex(self):
         tex = self.textures[self.comboBox.currentIndex()]
-        BNTX.extract(tex, self.BFRESPath, 0)
+        self.extractTex(tex, os.path.join(self.BFRESPath, tex.name + BNTX.getExtension(tex)))
 
     def exportTexAs(self):
         tex = self.textures[self.comboBox.currentIndex()]
-        BNTX.extract(tex, self.BFRESPath, 1)
+
+        if BNTX.getExtension(tex) == '.astc':
+            file = QtWidgets.QFileDialog.getSaveFileName(None, "Save File", "", "ASTC (*.astc)")[0]
+
+        else:
+            file = QtWidgets.QFileDialog.getSaveFileName(None, "Save File", "", "DDS (*.dds)")[0]
+
+        if not file:
+            return False
+
+        self.extractTex(tex, file)
 
     def exportTexAll(self):
+        errors = []
+
         for tex in self.textures:
-            BNTX.extract(tex, self.BFRESPath, 0, True)
+            try:
+                BNTX.extract(tex, os.path.join(self.BFRESPath, tex.name + BNTX.getExtension(tex)))
+
+            except BNTX.UnsupportedTextureError:
+                pass
+
+            # Keep going with the other textures
+            except Exception as e:
+                errors.append("%s: %s" % (tex.name, e))
+
+        if errors:
+            QtWidgets.QMessageBox.warning(None, "Error", "Couldn't export:\n" + '\n'.join(errors))
 
     def injectTex(self):
         file = QtWidgets.QFileDialog.getOpenFileName(None, "Open File", "", "DDS (*.dds)")[0]
@@ -716,12 +734,27 @@ class MainWindow(QtWidgets.QWidget):
         oldImageSize = globals.texSizes[index]
         oldNumMips = tex.numMips
 
-        tex_ = BNTX.inject(tex, tileMode, SRGB, sparseBinding, sparseResidency, importMips, oldImageSize, file)
-        if tex_:
-            self.textures[index] = tex_
-            BNTX.writeTex(self.openLnEdt.text(), tex_, oldImageSize, oldNumMips)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", BNTX.MipCountWarning)
+
+            try:
+                tex_ = BNTX.inject(tex, tileMode, SRGB, sparseBinding, sparseResidency, importMips, oldImageSize, file)
+
+            except BNTX.BNTXError as e:
+                tex_ = None
+                error = str(e)
+
+        for warning in caught:
+            QtWidgets.QMessageBox.warning(None, "Warning", str(warning.message))
+
+        if tex_ is None:
+            QtWidgets.QMessageBox.warning(None, "Error", error)
+            return False
+
+        self.textures[index] = tex_
+        BNTX.writeTex(self.openLnEdt.text(), tex_, oldImageSize, oldNumMips)
 
-            self.updateTexInfo(index)
+        self.updateTexInfo(index)
 
 
 def main():
@@ -20,6 +20,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from concurrent.futures import ThreadPoolExecutor
+import mmap
+import os
 import struct
 
 try:
@@ -31,13 +34,28 @@ except:
 
 dx10_formats = ["BC4U", "BC4S", "BC5U", "BC5S", "BC6H_UF16", "BC6H_SF16", "BC7"]
 
-
-def readDDS(f, SRGB):
-    with open(f, "rb") as inf:
-        inb = inf.read()
-
-    if len(inb) < 0x80 or inb[:4] != b'DDS ':
-        return 0, 0, 0, b'', 0, [], 0, []
+# Reasons a DDS file can't be injected
+DDS_OK = 0
+DDS_UNREADABLE = 1  # The file couldn't be opened
+DDS_BAD_MAGIC = 2  # Not a DDS file
+DDS_BAD_CAPS = 3  # Cubemaps, volumes and such
+DDS_BAD_PIXEL_FORMAT = 4  # The pixel format flags aren't supported
+DDS_UNSUPPORTED_FORMAT = 5  # The format or its channel masks aren't supported
+DDS_TRUNCATED = 6  # The file is smaller than its header says
+
+
+def parseHeader(inb, SRGB):
+    """
+    Parses the header of a DDS file from its first 0x94 bytes.
+    Returns (reason, header), where header is
+    (width, height, format_, fourcc, bpp, compressed, compSel, numMips, headSize)
+    or None if reason isn't DDS_OK.
+    """
+    if inb[:4] != b'DDS ':
+        return DDS_BAD_MAGIC if len(inb) >= 4 else DDS_TRUNCATED, None
+
+    if len(inb) < 0x80:
+        return DDS_TRUNCATED, None
 
     width = struct.unpack("<I", inb[16:20])[0]
     height = struct.unpack("<I", inb[12:16])[0]
@@ -53,7 +71,7 @@ def readDDS(f, SRGB):
     caps = struct.unpack("<I", inb[108:112])[0]
 
     if caps not in [0x1000, 0x401008]:
-        return 0, 0, 0, b'', 0, [], 0, []
+        return DDS_BAD_CAPS, None
 
     abgr8_masks = {0xff: 2, 0xff00: 3, 0xff0000: 4, 0xff000000: 5, 0: 1}
     bgr8_masks = {0xff: 2, 0xff00: 3, 0xff0000: 4, 0: 1}
@@ -88,14 +106,14 @@ def readDDS(f, SRGB):
         has_alpha = True
 
     else:
-        return 0, 0, 0, b'', 0, [], 0, []
+        return DDS_BAD_PIXEL_FORMAT, None
 
     format_ = 0
     compSel = [2, 3, 4, 5]
 
     if fourcc == b'DX10':
         if not compressed:
-            return 0, 0, 0, b'', 0, [], 0, []
+            return DDS_BAD_PIXEL_FORMAT, None
 
         headSize = 0x94
 
@@ -179,8 +197,6 @@ def readDDS(f, SRGB):
                 format_ = 0x2006
                 bpp = 16
 
-        size = ((width + 3) >> 2) * ((height + 3) >> 2) * bpp
-
     else:
         if luminance:
             if has_alpha:
@@ -240,32 +256,131 @@ def readDDS(f, SRGB):
                     compSel = [bgr565_masks[channel0], bgr565_masks[channel1], bgr565_masks[channel2],
                                bgr565_masks[channel3]]
 
-        size = width * height * bpp
-
     if caps == 0x401008:
-        numMips = struct.unpack("<I", inb[28:32])[0] - 1
-        mipSize = get_mipSize(width, height, bpp, numMips, compressed)
+        # Some writers set the mipmap caps with a mipmap count of 0
+        numMips = max(0, struct.unpack("<I", inb[28:32])[0] - 1)
 
     else:
         numMips = 0
-        mipSize = 0
-
-    if len(inb) < headSize + size + mipSize:
-        return 0, 0, 0, b'', 0, [], 0, []
 
     if format_ == 0:
+        return DDS_UNSUPPORTED_FORMAT, None
+
+    return DDS_OK, (width, height, format_, fourcc, bpp, compressed, compSel, numMips, headSize)
+
+
+def getSize(width, height, bpp, compressed):
+    if compressed:
+        return ((width + 3) >> 2) * ((height + 3) >> 2) * bpp
+
+    return width * height * bpp
+
+
+def readDDS(f, SRGB):
+    with open(f, "rb") as inf:
+        inb = inf.read()
+
+    reason, header = parseHeader(inb[:0x94], SRGB)
+    if reason != DDS_OK:
         return 0, 0, 0, b'', 0, [], 0, []
 
-    data = bytearray(inb[headSize:headSize + size + mipSize])
+    width, height, format_, fourcc, bpp, compressed, compSel, numMips, headSize = header
+
+    size = getSize(width, height, bpp, compressed)
+    mipSize = get_mipSize(width, height, bpp, numMips, compressed)
+
+    if len(inb) < headSize + size + mipSize:
+        return 0, 0, 0, b'', 0, [], 0, []
 
     if format_ in [0xb01, 0xb06] and bpp == 3:
-        data = formConv.rgb8torgbx8(data)
+        data = formConv.rgb8torgbx8(memoryview(inb)[headSize:headSize + size + mipSize])
         bpp += 1
         size = width * height * bpp
 
+    else:
+        data = inb[headSize:headSize + size + mipSize]
+
     return width, height, format_, fourcc, size, compSel, numMips, bytes(data)
 
 
+def mapDDS(f, SRGB):
+    """
+    Memory-maps a DDS file and returns memoryviews of its mip levels instead of the data.
+    Nothing is copied, except for rgb8 files which have to be widened.
+    The file stays mapped as long as any of the views is alive.
+    """
+    with open(f, "rb") as inf:
+        try:
+            mm = mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ)
+
+        except ValueError:  # Empty file
+            return 0, 0, 0, b'', 0, [], 0, []
+
+    inb = memoryview(mm)
+
+    reason, header = parseHeader(bytes(inb[:0x94]), SRGB)
+    if reason != DDS_OK:
+        return 0, 0, 0, b'', 0, [], 0, []
+
+    width, height, format_, fourcc, bpp, compressed, compSel, numMips, headSize = header
+
+    if len(inb) < headSize + getSize(width, height, bpp, compressed) + get_mipSize(width, height, bpp, numMips, compressed):
+        return 0, 0, 0, b'', 0, [], 0, []
+
+    mips = []
+    pos = headSize
+
+    for mipLevel in range(numMips + 1):
+        size = getSize(max(1, width >> mipLevel), max(1, height >> mipLevel), bpp, compressed)
+        mips.append(inb[pos:pos + size])
+        pos += size
+
+    if format_ in [0xb01, 0xb06] and bpp == 3:
+        mips = [memoryview(formConv.rgb8torgbx8(mip)) for mip in mips]
+
+    return width, height, format_, fourcc, len(mips[0]), compSel, numMips, mips
+
+
+def probe(f, SRGB=False):
+    """
+    Checks whether a DDS file can be injected by reading only its header.
+    Returns (width, height, format_, numMips, size, reason), where size is
+    the expected size of the data following the header (all mip levels).
+    Everything but reason is 0 if the header couldn't be parsed.
+    Safe to call from several threads at once.
+    """
+    try:
+        with open(f, "rb") as inf:
+            inb = inf.read(0x94)
+            fileSize = os.fstat(inf.fileno()).st_size
+
+    except OSError:
+        return 0, 0, 0, 0, 0, DDS_UNREADABLE
+
+    reason, header = parseHeader(inb, SRGB)
+    if reason != DDS_OK:
+        return 0, 0, 0, 0, 0, reason
+
+    width, height, format_, fourcc, bpp, compressed, compSel, numMips, headSize = header
+
+    size = getSize(width, height, bpp, compressed) + get_mipSize(width, height, bpp, numMips, compressed)
+    if fileSize < headSize + size:
+        reason = DDS_TRUNCATED
+
+    return width, height, format_, numMips, size, reason
+
+
+def probeDir(folder, SRGB=False, numWorkers=None):
+    """
+    Probes every DDS file in a folder on a thread pool.
+    Returns a dict mapping each file path to its probe() result.
+    """
+    files = [os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.lower().endswith(".dds")]
+
+    with ThreadPoolExecutor(numWorkers) as executor:
+        return dict(zip(files, executor.map(probe, files, [SRGB] * len(files))))
+
+
 def get_mipSize(width, height, bpp, numMips, compressed):
     size = 0
     for i in range(numMips):
@@ -7,6 +7,15 @@
 ################################################################
 ################################################################
 
+from array import array
+import sys
+
+try:
+    import numpy as np
+
+except ImportError:
+    np = None
+
 
 def getComponentsFromPixel(format_, pixel, comp):
     if format_ == 'l8':
@@ -85,6 +94,75 @@ def getComponentsFromPixel(format_, pixel, comp):
 
     return comp
 
+
+# (format, bpp, compSel) -> RGBA8 of every possible pixel value
+lutCache = {}
+
+
+def getLUT(format_, bpp, compSel):
+    """
+    Returns the RGBA8 texels of all 256 or 65536 values of an 8 or 16-bit pixel, packed in a bytes object.
+    """
+    key = (format_, bpp, tuple(compSel))
+    if key in lutCache:
+        return lutCache[key]
+
+    lut = bytearray(4 << (8 * bpp))
+
+    for pixel in range(1 << (8 * bpp)):
+        comp = getComponentsFromPixel(format_, pixel, [0, 0xFF, 0, 0, 0, 0xFF])
+        lut[pixel * 4:pixel * 4 + 4] = bytes(comp[compSel[i]] for i in range(4))
+
+    lutCache[key] = lut = bytes(lut)
+    return lut
+
+
+def torgba8LUT(width, height, data, format_, bpp, compSel):
+    lut = getLUT(format_, bpp, compSel)
+    numPixels = width * height
+
+    if np is not None:
+        pixels = np.frombuffer(data, dtype='<u2' if bpp == 2 else np.uint8, count=numPixels)
+        return np.frombuffer(lut, dtype='<u4')[pixels].tobytes()
+
+    if bpp == 2:
+        pixels = array('H', bytes(data[:numPixels * 2]))
+        if sys.byteorder == 'big':
+            pixels.byteswap()
+
+    else:
+        pixels = data[:numPixels]
+
+    texels = [lut[i:i + 4] for i in range(0, len(lut), 4)]
+    return b''.join([texels[pixel] for pixel in pixels])
+
+
+def torgba8_32(width, height, data, format_, compSel):
+    """
+    Converts a whole rgba8, bgra8 or bgr10a2 image at once with NumPy.
+    """
+    pixels = np.frombuffer(data, dtype='<u4', count=width * height)
+
+    comp = np.empty((len(pixels), 6), dtype=np.uint8)
+    comp[:, 0] = 0
+    comp[:, 1] = 0xFF
+
+    if format_ == 'bgr10a2':
+        # Same as int(v / 0x3FF * 0xFF) for every 10-bit v
+        comp[:, 2] = (pixels & 0x3FF) * 0xFF // 0x3FF
+        comp[:, 3] = ((pixels >> 10) & 0x3FF) * 0xFF // 0x3FF
+        comp[:, 4] = ((pixels >> 20) & 0x3FF) * 0xFF // 0x3FF
+        comp[:, 5] = (pixels >> 30) * 0xFF // 3
+
+    else:
+        shifts = (0, 8, 16, 24) if format_ == 'rgba8' else (16, 8, 0, 24)
+
+        for i, shift in enumerate(shifts):
+            comp[:, 2 + i] = (pixels >> shift) & 0xFF
+
+    return comp[:, list(compSel)].tobytes()
+
+
 def torgba8(width, height, data, format_, bpp, compSel):
     size = width * height * 4
     assert len(data) >= width * height * bpp
@@ -95,6 +173,13 @@ def torgba8(width, height, data, format_, bpp, compSel):
     if bpp not in [1, 2, 4]:
         return new_data
 
+    if bpp in [1, 2]:
+        # Every possible pixel value fits in a lookup table
+        return torgba8LUT(width, height, data, format_, bpp, compSel)
+
+    if np is not None and format_ in ['rgba8', 'bgra8', 'bgr10a2']:
+        return torgba8_32(width, height, data, format_, compSel)
+
     for y in range(height):
         for x in range(width):
             pos = (y * width + x) * bpp
@@ -115,14 +200,23 @@ def torgba8(width, height, data, format_, bpp, compSel):
 
 
 def rgb8torgbx8(data):
+    """
+    Widens 24-bit pixels to 32-bit ones with an opaque alpha channel.
+    data can be any buffer, e.g. a memoryview of a file.
+    """
+    data = memoryview(data).cast('B')
     numPixels = len(data) // 3
 
-    new_data = bytearray(numPixels * 4)
+    if np is not None:
+        new_data = np.empty((numPixels, 4), dtype=np.uint8)
+        new_data[:, :3] = np.frombuffer(data, dtype=np.uint8, count=numPixels * 3).reshape(numPixels, 3)
+        new_data[:, 3] = 0xFF
+
+        return new_data.tobytes()
+
+    new_data = bytearray(b'\xFF') * (numPixels * 4)
 
-    for i in range(numPixels):
-        new_data[4 * i + 0] = data[3 * i + 0]
-        new_data[4 * i + 1] = data[3 * i + 1]
-        new_data[4 * i + 2] = data[3 * i + 2]
-        new_data[4 * i + 3] = 0xFF
+    for i in range(3):
+        new_data[i::4] = data[i:numPixels * 3:3]
 
     return bytes(new_data)
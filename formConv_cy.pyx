@@ -92,7 +92,131 @@ cdef void getComponentsFromPixel(str format_, pixel, u8 *comp):
         comp[4] = pixel & 0xFF
         comp[5] = (pixel & 0xFF000000) >> 24
 
+
+# (format, bpp, compSel) -> RGBA8 of every possible pixel value
+lutCache = {}
+
+
+cdef bytes getLUT(str format_, u32 bpp, list compSel_):
+    """
+    Returns the RGBA8 texels of all 256 or 65536 values of an 8 or 16-bit pixel, packed in a bytes object.
+    """
+    key = (format_, bpp, tuple(compSel_))
+    if key in lutCache:
+        return lutCache[key]
+
+    cdef:
+        u32[4] compSel
+        u32 i, elem, pixel
+        u32 numValues = 1 << (8 * bpp)
+
+        bytearray lut_ = bytearray(numValues * 4)
+        u8 *lut = lut_
+        u8[6] comp
+
+    for i, elem in enumerate(compSel_):
+        compSel[i] = elem
+
+    for pixel in range(numValues):
+        comp[0] = 0
+        comp[1] = 0xFF
+        comp[2] = 0
+        comp[3] = 0
+        comp[4] = 0
+        comp[5] = 0xFF
+
+        getComponentsFromPixel(format_, pixel, comp)
+
+        for i in range(4):
+            lut[pixel * 4 + i] = comp[compSel[i]]
+
+    lutCache[key] = bytes(lut_)
+    return lutCache[key]
+
+
+cdef bytes torgba8LUT(u32 width, u32 height, bytearray data_, str format_, u32 bpp, list compSel_):
+    cdef:
+        bytes lut_ = getLUT(format_, bpp, compSel_)
+        const u32 *lut = <const u32 *><const u8 *>lut_
+
+        u8 *data = data_
+        u32 numPixels = width * height
+
+        array.array resultArr = array.clone(array.array('I'), numPixels, zero=False)
+        u32 *result = resultArr.data.as_uints
+        u32 i
+
+    # The table holds texels as bytes, so copying them as 32-bit words keeps their order
+    if bpp == 2:
+        for i in range(numPixels):
+            result[i] = lut[data[2 * i] | data[2 * i + 1] << 8]
+
+    else:
+        for i in range(numPixels):
+            result[i] = lut[data[i]]
+
+    return resultArr.tobytes()
+
+
+cdef bytes torgba8_32(u32 width, u32 height, bytearray data_, str format_, list compSel_):
+    """
+    Converts a whole rgba8, bgra8 or bgr10a2 image without going through getComponentsFromPixel.
+    """
+    cdef:
+        u8 *data = data_
+        u32 numPixels = width * height
+
+        bytearray result_ = bytearray(numPixels * 4)
+        u8 *result = result_
+
+        u32[4] compSel
+        u32 i, elem, pixel
+        u8[6] comp
+        int bgr10a2 = format_ == 'bgr10a2'
+        u32 rShift = 0 if format_ == 'rgba8' else 16
+        u32 bShift = 16 if format_ == 'rgba8' else 0
+
+    for i, elem in enumerate(compSel_):
+        compSel[i] = elem
+
+    comp[0] = 0
+    comp[1] = 0xFF
+
+    for i in range(numPixels):
+        pixel = data[4 * i] | data[4 * i + 1] << 8 | data[4 * i + 2] << 16 | <u32>data[4 * i + 3] << 24
+
+        if bgr10a2:
+            # Same as int(v / 0x3FF * 0xFF) for every 10-bit v
+            comp[2] = (pixel & 0x3FF) * 0xFF // 0x3FF
+            comp[3] = ((pixel >> 10) & 0x3FF) * 0xFF // 0x3FF
+            comp[4] = ((pixel >> 20) & 0x3FF) * 0xFF // 0x3FF
+            comp[5] = (pixel >> 30) * 0xFF // 3
+
+        else:
+            comp[2] = (pixel >> rShift) & 0xFF
+            comp[3] = (pixel >> 8) & 0xFF
+            comp[4] = (pixel >> bShift) & 0xFF
+            comp[5] = pixel >> 24
+
+        result[4 * i + 0] = comp[compSel[0]]
+        result[4 * i + 1] = comp[compSel[1]]
+        result[4 * i + 2] = comp[compSel[2]]
+        result[4 * i + 3] = comp[compSel[3]]
+
+    return bytes(result_)
+
+
 cpdef bytes torgba8(u32 width, u32 height, bytearray data_, str format_, u32 bpp, list compSel_):
+    assert len(data_) >= width * height * bpp
+
+    # The fast paths read data_ in place, so dispatch to them before copying anything
+    if bpp in [1, 2]:
+        # Every possible pixel value fits in a lookup table
+        return torgba8LUT(width, height, data_, format_, bpp, compSel_)
+
+    if bpp == 4 and format_ in ['rgba8', 'bgra8', 'bgr10a2']:
+        return torgba8_32(width, height, data_, format_, compSel_)
+
     cdef:
         array.array dataArr = array.array('B', data_)
         u8 *data = dataArr.data.as_uchars
@@ -103,8 +227,6 @@ cpdef bytes torgba8(u32 width, u32 height, bytearray data_, str format_, u32 bpp
     for i, elem in enumerate(compSel_):
         compSel[i] = elem
 
-    assert len(data_) >= width * height * bpp
-
     cdef:
         u32 size = width * height * 4
         u8 *new_data = <u8 *>malloc(size)
@@ -151,19 +273,29 @@ cpdef bytes torgba8(u32 width, u32 height, bytearray data_, str format_, u32 bpp
         free(comp)
 
 
-cpdef bytes rgb8torgbx8(bytearray data):
+cpdef bytes rgb8torgbx8(const u8[::1] data):
+    """
+    Widens 24-bit pixels to 32-bit ones with an opaque alpha channel.
+    data can be any buffer, e.g. a memoryview of a file.
+    """
+    # Not even one whole pixel, so there is nothing to index or copy
+    if len(data) < 3:
+        return b''
+
     cdef:
+        const u8 *src = &data[0]
         u32 numPixels = len(data) // 3
 
         u8 *new_data = <u8 *>malloc(numPixels * 4)
         u32 i
 
     try:
-        for i in range(numPixels):
-            new_data[4 * i + 0] = data[3 * i + 0]
-            new_data[4 * i + 1] = data[3 * i + 1]
-            new_data[4 * i + 2] = data[3 * i + 2]
-            new_data[4 * i + 3] = 0xFF
+        with nogil:
+            for i in range(numPixels):
+                new_data[4 * i + 0] = src[3 * i + 0]
+                new_data[4 * i + 1] = src[3 * i + 1]
+                new_data[4 * i + 2] = src[3 * i + 2]
+                new_data[4 * i + 3] = 0xFF
 
         return bytes(<u8[:numPixels * 4]>new_data)
 
@@ -22,12 +22,51 @@
 
 import struct
 
+import globals
+
+# Compiled structs, by format (including the byte order)
+structCache = {}
+
+
+def getStruct(fmt):
+    """
+    Returns the compiled struct for fmt, compiling it only the first time.
+    """
+    s = structCache.get(fmt)
+    if s is None:
+        s = structCache[fmt] = struct.Struct(fmt)
+
+    return s
+
+
+class Struct:
+    """
+    Base of the file structures.
+    All instances with the same byte order share one compiled struct.
+    """
+    fmt = ''
 
-class BNTXHeader(struct.Struct):
     def __init__(self, bom):
-        super().__init__(bom + '8sIH2BI2H2I')
+        self.struct = getStruct(bom + self.fmt)
+
+    @property
+    def size(self):
+        return self.struct.size
+
+    def pack(self, *values):
+        return self.struct.pack(*values)
+
+    def unpack_from(self, data, pos=0):
+        return self.struct.unpack_from(data, pos)
 
     def data(self, data, pos):
+        self.set(self.struct.unpack_from(data, pos))
+
+
+class BNTXHeader(Struct):
+    fmt = '8sIH2BI2H2I'
+
+    def set(self, values):
         (self.magic,
          self.version,
          self.bom,
@@ -37,14 +76,13 @@ class BNTXHeader(struct.Struct):
          self.flag,
          self.firstBlkAddr,
          self.relocAddr,
-         self.fileSize) = self.unpack_from(data, pos)
+         self.fileSize) = values
 
 
-class TexContainer(struct.Struct):
-    def __init__(self, bom):
-        super().__init__(bom + '4sI5qI4x')
+class TexContainer(Struct):
+    fmt = '4sI5qI4x'
 
-    def data(self, data, pos):
+    def set(self, values):
         (self.target,
          self.count,
          self.infoPtrsAddr,
@@ -52,24 +90,40 @@ class TexContainer(struct.Struct):
          self.dictAddr,
          self.memPoolAddr,
          self.memPoolPtr,
-         self.baseMemPoolAddr) = self.unpack_from(data, pos)
+         self.baseMemPoolAddr) = values
 
 
-class BlockHeader(struct.Struct):
-    def __init__(self, bom):
-        super().__init__(bom + '4s2I4x')
+class BlockHeader(Struct):
+    fmt = '4s2I4x'
 
-    def data(self, data, pos):
+    def set(self, values):
         (self.magic,
          self.nextBlkAddr,
-         self.blockSize) = self.unpack_from(data, pos)
+         self.blockSize) = values
 
 
-class TextureInfo(struct.Struct):
-    def __init__(self, bom):
-        super().__init__(bom + '2B4H2x2I3i3I20x3IB3x8q')
+class DictHeader(Struct):
+    fmt = '4si'
 
-    def data(self, data, pos):
+    def set(self, values):
+        (self.magic,
+         self.count) = values
+
+
+class DictNode(Struct):
+    fmt = 'i2Hq'
+
+    def set(self, values):
+        (self.refBit,
+         self.left,
+         self.right,
+         self.nameAddr) = values
+
+
+class TextureInfo(Struct):
+    fmt = '2B4H2x2I3i3I20x3IB3x8q'
+
+    def set(self, values):
         (self.flags,
          self.dim,
          self.tileMode,
@@ -95,8 +149,56 @@ class TextureInfo(struct.Struct):
          self.texPtr,
          self.texViewPtr,
          self.descSlotDataAddr,
-         self.userDictAddr) = self.unpack_from(data, pos)
+         self.userDictAddr) = values
+
+
+def getBRTIStruct(bom, stride):
+    """
+    Returns the struct of a BRTI block header and its texture info,
+    padded to stride bytes so that consecutive blocks can be unpacked at once.
+    """
+    return getStruct(''.join([bom, BlockHeader.fmt, TextureInfo.fmt, '%dx' % (stride - 0xA0)]))
 
 
 class TexInfo:
-    pass
+    """
+    A texture, as read from a BRTI block or injected.
+    blkWidth, blkHeight and bpp are updated whenever the format is set
+    (bpp is None for formats that can't be converted), and mipOffsets is an array of the offsets of the mip levels in the data.
+    """
+    __slots__ = (
+        'name', 'bom', 'target', 'infoAddr', 'dataAddr', 'file', '_data',
+        'readTexLayout', 'sparseBinding', 'sparseResidency', 'dim', 'tileMode', 'swizzle',
+        'numMips', 'numSamples', '_format', 'accessFlags', 'width', 'height', 'depth', 'arrayLength',
+        'blockHeightLog2', 'textureLayout2', 'imageSize', 'alignment', 'compSel', 'compSel2', 'type',
+        'nameAddr', 'parentAddr', 'ptrsAddr', 'userDataAddr', 'texPtr', 'texViewPtr', 'descSlotDataAddr', 'userDictAddr',
+        'blkWidth', 'blkHeight', 'bpp', 'mipOffsets',
+    )
+
+    def __init__(self):
+        self.file = None
+        self._data = None
+
+    @property
+    def format(self):
+        return self._format
+
+    @format.setter
+    def format(self, format_):
+        self._format = format_
+        self.blkWidth, self.blkHeight = globals.blk_dims.get(format_ >> 8, (1, 1))
+        self.bpp = globals.bpps.get(format_ >> 8)
+
+    @property
+    def data(self):
+        """
+        The texture data, viewed straight from the file it was read from on first access.
+        """
+        if self._data is None and self.file is not None:
+            self._data = memoryview(self.file)[self.dataAddr:self.dataAddr + self.imageSize]
+
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
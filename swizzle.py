@@ -20,6 +20,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from array import array
+from collections import OrderedDict
+
+try:
+    import numpy as np
+
+except ImportError:
+    np = None
+
 
 def DIV_ROUND_UP(n, d):
     return (n + d - 1) // d
@@ -40,6 +49,61 @@ def pow2_round_up(x):
     return x + 1
 
 
+# Elements moved per step when gathering or scattering through an address table
+SWIZZLE_CHUNK = 0x10000
+
+
+class AddrTableCache:
+    """
+    LRU cache of swizzle address tables, keyed on the surface geometry
+    and bounded by the total size of the cached tables in bytes.
+    """
+
+    # Fits the tables of a whole 4096x4096 RGBA8 mip chain
+    def __init__(self, maxSize=128 * 1024 * 1024):
+        self.tables = OrderedDict()
+        self.maxSize = maxSize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        table = self.tables.get(key)
+        if table is not None:
+            self.tables.move_to_end(key)
+            self.hits += 1
+            return table
+
+        self.misses += 1
+        table = build()
+
+        tableSize = len(table) * table.itemsize
+        if tableSize <= self.maxSize:
+            self.tables[key] = table
+            self.size += tableSize
+            self.evict()
+
+        return table
+
+    def evict(self):
+        while self.size > self.maxSize:
+            _, table = self.tables.popitem(last=False)
+            self.size -= len(table) * table.itemsize
+
+    def setMaxSize(self, maxSize):
+        self.maxSize = maxSize
+        self.evict()
+
+    def clear(self):
+        self.tables.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+
+addrTableCache = AddrTableCache()
+
+
 def getBlockHeight(height):
     blockHeight = pow2_round_up(height // 8)
     if blockHeight > 16:
@@ -48,13 +112,7 @@ def getBlockHeight(height):
     return blockHeight
 
 
-def _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, toSwizzle):
-    assert 0 <= blockHeightLog2 <= 5
-    blockHeight = 1 << blockHeightLog2
-
-    width = DIV_ROUND_UP(width, blkWidth)
-    height = DIV_ROUND_UP(height, blkHeight)
-
+def getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight):
     if tileMode == 1:
         pitch = width * bpp
 
@@ -67,34 +125,349 @@ def _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, bloc
         pitch = round_up(width * bpp, 64)
         surfSize = pitch * round_up(height, blockHeight * 8)
 
-    result = bytearray(surfSize)
+    return pitch, surfSize
+
+
+def getRegionAddrTable(x, y, w, h, width, pitch, bpp, tileMode, blockHeight, indices=False):
+    """
+    Swizzled address of every element of the w x h region at (x, y), in linear order,
+    or its index in elements (address // bpp) if indices is set, as uint32.
+    The block linear address is the sum of an x-only term and a y-only term.
+    """
+    xb = np.arange(x * bpp, (x + w) * bpp, bpp, dtype=np.intp)
+    y = np.arange(y, y + h, dtype=np.intp)
+
+    if tileMode == 1:
+        xAddr = xb
+        yAddr = y * pitch
+
+    else:
+        image_width_in_gobs = DIV_ROUND_UP(width * bpp, 64)
+
+        xAddr = ((xb // 64) * 512 * blockHeight + ((xb % 64) // 32) * 256
+                 + ((xb % 32) // 16) * 32 + (xb % 16))
+
+        yAddr = ((y // (8 * blockHeight)) * 512 * blockHeight * image_width_in_gobs
+                 + (y % (8 * blockHeight) // 8) * 512 + ((y % 8) // 2) * 64 + (y % 2) * 16)
+
+    # Both terms are multiples of bpp, which is a power of two up to 16
+    if indices:
+        xAddr //= bpp
+        yAddr //= bpp
+
+    # Only the final table is full size, so build it as uint32 from the start
+    return (yAddr.astype(np.uint32)[:, None] + xAddr.astype(np.uint32)).ravel()
+
+
+def getAddrTable(width, height, pitch, bpp, tileMode, blockHeight):
+    """
+    Swizzled index of every element of the linear surface, in linear order.
+    """
+    table = getRegionAddrTable(0, 0, width, height, width, pitch, bpp, tileMode, blockHeight, True)
+    table.flags.writeable = False
+
+    return table
+
+
+def getElemAddrTable(width, height, pitch, bpp, tileMode, blockHeight):
+    """
+    Swizzled address of every element of the linear surface, in linear order.
+    Used when NumPy is not available.
+    """
+    table = array('I')
 
     for y in range(height):
         for x in range(width):
             if tileMode == 1:
-                pos = y * pitch + x * bpp
+                table.append(y * pitch + x * bpp)
+
+            else:
+                table.append(getAddrBlockLinear(x, y, width, bpp, 0, blockHeight))
+
+    return table
+
+
+def getElemAddrs(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2):
+    """
+    Swizzled address of every element of a surface, in linear order.
+    Elements are the blocks of block compressed formats.
+    """
+    assert 0 <= blockHeightLog2 <= 5
+    blockHeight = 1 << blockHeightLog2
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    pitch, _ = getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight)
+    key = ('elem', width, height, pitch, bpp, tileMode, blockHeight)
+
+    if np is not None:
+        def build():
+            table = getRegionAddrTable(0, 0, width, height, width, pitch, bpp, tileMode, blockHeight)
+            table.flags.writeable = False
+
+            return table
+
+        return addrTableCache.get(key, build)
+
+    return addrTableCache.get(key, lambda: getElemAddrTable(width, height, pitch, bpp, tileMode, blockHeight))
+
+
+def getElemDtype(bpp):
+    """
+    NumPy dtype of one element, so that elements are moved whole.
+    """
+    if bpp in (1, 2, 4, 8):
+        return np.dtype('u%d' % bpp)
+
+    return np.dtype('V%d' % bpp)
+
+
+def _swizzle_np(table, data, out, bpp, toSwizzle):
+    """
+    Moves every element through a table of swizzled element indices.
+    """
+    dtype = getElemDtype(bpp)
+
+    if toSwizzle:
+        src = np.frombuffer(data, dtype=dtype, count=len(table))
+        dst = np.frombuffer(out, dtype=dtype, count=len(out) // bpp)
+
+    else:
+        src = np.frombuffer(data, dtype=dtype, count=len(data) // bpp)
+        dst = np.frombuffer(out, dtype=dtype, count=len(table))
+
+    # NumPy widens the indices to intp, so only do it a chunk at a time
+    for i in range(0, len(table), SWIZZLE_CHUNK):
+        indices = table[i:i + SWIZZLE_CHUNK]
+
+        if toSwizzle:
+            dst[indices] = src[i:i + SWIZZLE_CHUNK]
+
+        else:
+            dst[i:i + SWIZZLE_CHUNK] = src[indices]
+
+
+def _swizzleLinear(width, height, pitch, bpp, data, out, toSwizzle):
+    rowBytes = width * bpp
+
+    if toSwizzle:
+        srcPitch, dstPitch = rowBytes, pitch
+
+    else:
+        srcPitch, dstPitch = pitch, rowBytes
+
+    if pitch == rowBytes:
+        out[:] = data[:len(out)]
+
+    elif np is not None:
+        src = np.frombuffer(data, dtype=np.uint8, count=srcPitch * height).reshape(height, srcPitch)
+        dst = np.frombuffer(out, dtype=np.uint8, count=dstPitch * height).reshape(height, dstPitch)
+        dst[:, :rowBytes] = src[:, :rowBytes]
+
+    else:
+        for y in range(height):
+            out[y * dstPitch:y * dstPitch + rowBytes] = data[y * srcPitch:y * srcPitch + rowBytes]
+
+
+def _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, toSwizzle):
+    assert 0 <= blockHeightLog2 <= 5
+    blockHeight = 1 << blockHeightLog2
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    pitch, surfSize = getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight)
+
+    if toSwizzle:
+        srcSize, dstSize = width * height * bpp, surfSize
+
+    else:
+        srcSize, dstSize = surfSize, width * height * bpp
+
+    # Plain slicing of memoryviews never copies
+    data = memoryview(data).cast('B')
+    if len(data) < srcSize:
+        data = memoryview(b''.join([data, bytes(srcSize - len(data))]))
+
+    out = memoryview(out).cast('B')[offset:offset + dstSize]
+    if len(out) < dstSize:
+        raise ValueError("Output buffer is too small")
+
+    if tileMode == 1:
+        _swizzleLinear(width, height, pitch, bpp, data, out, toSwizzle)
+        return dstSize
+
+    key = (width, height, pitch, bpp, tileMode, blockHeight)
+
+    if np is not None:
+        table = addrTableCache.get(key, lambda: getAddrTable(width, height, pitch, bpp, tileMode, blockHeight))
+        _swizzle_np(table, data, out, bpp, toSwizzle)
+        return dstSize
+
+    table = addrTableCache.get(key, lambda: getElemAddrTable(width, height, pitch, bpp, tileMode, blockHeight))
+
+    for i, pos in enumerate(table):
+        pos_ = i * bpp
+
+        if toSwizzle:
+            out[pos:pos + bpp] = data[pos_:pos_ + bpp]
+
+        else:
+            out[pos_:pos_ + bpp] = data[pos:pos + bpp]
+
+    return dstSize
+
+
+def getSwizzledSize(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2):
+    blockHeight = 1 << blockHeightLog2
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    return getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight)[1]
+
+
+def _swizzleRegion(x, y, w, h, width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, toSwizzle):
+    assert 0 <= blockHeightLog2 <= 5
+    blockHeight = 1 << blockHeightLog2
+
+    if x % blkWidth or y % blkHeight:
+        raise ValueError("Region is not aligned to the format's blocks")
+
+    if x < 0 or y < 0 or x + w > width or y + h > height:
+        raise ValueError("Region is outside of the texture")
+
+    if (w % blkWidth and x + w != width) or (h % blkHeight and y + h != height):
+        raise ValueError("Region is not aligned to the format's blocks")
+
+    x //= blkWidth
+    y //= blkHeight
+    w = DIV_ROUND_UP(w, blkWidth)
+    h = DIV_ROUND_UP(h, blkHeight)
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    pitch, surfSize = getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight)
+    rowBytes = w * bpp
+
+    if toSwizzle:
+        srcSize, dstSize = rowBytes * h, surfSize
+
+    else:
+        srcSize, dstSize = surfSize, rowBytes * h
+
+    data = memoryview(data).cast('B')
+    if len(data) < srcSize:
+        data = memoryview(b''.join([data, bytes(srcSize - len(data))]))
+
+    out = memoryview(out).cast('B')[offset:offset + dstSize]
+    if len(out) < dstSize:
+        raise ValueError("Output buffer is too small")
+
+    if tileMode == 1:
+        # Rows of the region are contiguous in both layouts
+        for row in range(h):
+            pos = (y + row) * pitch + x * bpp
+            pos_ = row * rowBytes
+
+            if toSwizzle:
+                out[pos:pos + rowBytes] = data[pos_:pos_ + rowBytes]
 
             else:
-                pos = getAddrBlockLinear(x, y, width, bpp, 0, blockHeight)
+                out[pos_:pos_ + rowBytes] = data[pos:pos + rowBytes]
 
-            pos_ = (y * width + x) * bpp
+    elif np is not None:
+        table = getRegionAddrTable(x, y, w, h, width, pitch, bpp, tileMode, blockHeight, True)
+        _swizzle_np(table, data, out, bpp, toSwizzle)
+
+    else:
+        for row in range(h):
+            for col in range(w):
+                pos = getAddrBlockLinear(x + col, y + row, width, bpp, 0, blockHeight)
+                pos_ = (row * w + col) * bpp
 
-            if pos + bpp <= surfSize:
                 if toSwizzle:
-                    result[pos:pos + bpp] = data[pos_:pos_ + bpp]
+                    out[pos:pos + bpp] = data[pos_:pos_ + bpp]
 
                 else:
-                    result[pos_:pos_ + bpp] = data[pos:pos + bpp]
+                    out[pos_:pos_ + bpp] = data[pos:pos + bpp]
+
+    return rowBytes * h
+
+
+def deswizzle_region(x, y, w, h, width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data):
+    """
+    Deswizzles only the w x h region at (x, y) of a surface.
+    The region is in pixels and must be aligned to the format's blocks,
+    except where it reaches the right or bottom edge of the surface.
+    Returns the linear data of the region.
+    """
+    result = bytearray(DIV_ROUND_UP(w, blkWidth) * DIV_ROUND_UP(h, blkHeight) * bpp)
+    _swizzleRegion(x, y, w, h, width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, result, 0, 0)
 
     return result
 
 
+def swizzle_region(x, y, w, h, width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset=0):
+    """
+    Swizzles the linear data of the w x h region at (x, y) in place into
+    the swizzled surface held by `out` starting at `offset`.
+    Bytes outside of the region are left untouched.
+    Returns the start and end of the written bytes, relative to `offset`.
+    """
+    _swizzleRegion(x, y, w, h, width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, 1)
+
+    # Both the x and y terms of an address grow with x and y,
+    # so the region spans from its first element to its last one
+    x0, y0 = x // blkWidth, y // blkHeight
+    x1, y1 = DIV_ROUND_UP(x + w, blkWidth) - 1, DIV_ROUND_UP(y + h, blkHeight) - 1
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    if tileMode == 1:
+        pitch, _ = getSurfaceSize(width, height, roundPitch, bpp, tileMode, 1)
+        return y0 * pitch + x0 * bpp, y1 * pitch + (x1 + 1) * bpp
+
+    blockHeight = 1 << blockHeightLog2
+
+    return (getAddrBlockLinear(x0, y0, width, bpp, 0, blockHeight),
+            getAddrBlockLinear(x1, y1, width, bpp, 0, blockHeight) + bpp)
+
+
+def deswizzle_into(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset=0):
+    """
+    Deswizzles any buffer without copying it, writing the linear data
+    to the writable buffer `out` starting at `offset`.
+    Returns the number of bytes written.
+    """
+    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, 0)
+
+
+def swizzle_into(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset=0):
+    """
+    Swizzles any buffer without copying it, writing the swizzled surface
+    to the writable buffer `out` starting at `offset`.
+    Padding bytes of the surface are left untouched.
+    Returns the size of the swizzled surface.
+    """
+    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, 1)
+
+
 def deswizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data):
-    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, bytes(data), 0)
+    result = bytearray(getSwizzledSize(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2))
+    _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, result, 0, 0)
+
+    return result
 
 
 def swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data):
-    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, bytes(data), 1)
+    result = bytearray(getSwizzledSize(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2))
+    _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, result, 0, 1)
+
+    return result
 
 
 def getAddrBlockLinear(x, y, image_width, bytes_per_pixel, base_address, blockHeight):
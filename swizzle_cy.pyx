@@ -20,9 +20,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from concurrent.futures import ThreadPoolExecutor
+import os
+
 from cpython cimport array
 from cython cimport view
-from libc.stdlib cimport malloc, free
 from libc.string cimport memcpy
 
 
@@ -30,7 +32,11 @@ ctypedef unsigned char u8
 ctypedef unsigned int u32
 
 
-cpdef u32 DIV_ROUND_UP(u32 n, u32 d):
+# Surfaces smaller than this are not worth handing to a thread pool
+cdef u32 MIN_THREADED_SIZE = 0x40000
+
+
+cpdef u32 DIV_ROUND_UP(u32 n, u32 d) noexcept nogil:
     return (n + d - 1) // d
 
 
@@ -57,13 +63,78 @@ cpdef u32 getBlockHeight(u32 height):
     return blockHeight
 
 
-cdef bytearray _swizzle(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, bytearray data, int toSwizzle):
-    assert 0 <= blockHeightLog2 <= 5
-    cdef u32 blockHeight = 1 << blockHeightLog2
+cdef void _swizzleRows(const u8 *src, u8 *result, u32 yStart, u32 yEnd, u32 width, u32 pitch, u32 surfSize,
+                       u32 bpp, u32 tileMode, u32 blockHeight, int toSwizzle) noexcept nogil:
+    cdef:
+        u32 rowBytes = width * bpp
+        u32 x, y, pos, pos_, n
 
-    width = DIV_ROUND_UP(width, blkWidth)
-    height = DIV_ROUND_UP(height, blkHeight)
+    if tileMode == 1 and pitch == rowBytes:
+        # Both layouts are identical
+        memcpy(result + yStart * rowBytes, src + yStart * rowBytes, (yEnd - yStart) * rowBytes)
+
+    elif tileMode == 1:
+        # Rows are contiguous, only the pitch differs
+        for y in range(yStart, yEnd):
+            pos = y * pitch
+            pos_ = y * rowBytes
 
+            if toSwizzle:
+                memcpy(result + pos, src + pos_, rowBytes)
+
+            else:
+                memcpy(result + pos_, src + pos, rowBytes)
+
+    else:
+        # Every 16-byte sector of a GOB row is contiguous in both layouts,
+        # and bpp always divides 16, so no element straddles two sectors
+        for y in range(yStart, yEnd):
+            for x in range(0, rowBytes, 16):
+                pos = getAddrBlockLinear(x // bpp, y, width, bpp, 0, blockHeight)
+                pos_ = y * rowBytes + x
+
+                # The last sector of a row can be partially outside of the surface
+                n = min(16, rowBytes - x)
+
+                if pos + n <= surfSize:
+                    if toSwizzle:
+                        memcpy(result + pos, src + pos_, n)
+
+                    else:
+                        memcpy(result + pos_, src + pos, n)
+
+
+cdef class _SwizzleBands:
+    """
+    Swizzles bands of rows that are a multiple of a block height tall.
+    Bands never overlap in the output, so they can run in parallel.
+    """
+    cdef:
+        const u8 *src
+        u8 *result
+        u32 rowsPerBand, height, width, pitch, surfSize, bpp, tileMode, blockHeight
+        int toSwizzle
+
+    def run(self, u32 band):
+        cdef:
+            u32 yStart = band * self.rowsPerBand
+            u32 yEnd = min(yStart + self.rowsPerBand, self.height)
+
+            const u8 *src = self.src
+            u8 *result = self.result
+            u32 width = self.width
+            u32 pitch = self.pitch
+            u32 surfSize = self.surfSize
+            u32 bpp = self.bpp
+            u32 tileMode = self.tileMode
+            u32 blockHeight = self.blockHeight
+            int toSwizzle = self.toSwizzle
+
+        with nogil:
+            _swizzleRows(src, result, yStart, yEnd, width, pitch, surfSize, bpp, tileMode, blockHeight, toSwizzle)
+
+
+cdef (u32, u32) getSurfaceSize(u32 width, u32 height, int roundPitch, u32 bpp, u32 tileMode, u32 blockHeight):
     cdef:
         u32 pitch
         u32 surfSize
@@ -80,45 +151,289 @@ cdef bytearray _swizzle(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int
         pitch = round_up(width * bpp, 64)
         surfSize = pitch * round_up(height, blockHeight * 8)
 
+    return pitch, surfSize
+
+
+cpdef u32 getSwizzledSize(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2):
+    cdef u32 pitch, surfSize
+    pitch, surfSize = getSurfaceSize(DIV_ROUND_UP(width, blkWidth), DIV_ROUND_UP(height, blkHeight),
+                                     roundPitch, bpp, tileMode, 1 << blockHeightLog2)
+
+    return surfSize
+
+
+cdef u32 _swizzle(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data, out, u32 offset, int toSwizzle, u32 numThreads) except? 0:
+    assert 0 <= blockHeightLog2 <= 5
+    cdef u32 blockHeight = 1 << blockHeightLog2
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    cdef u32 pitch, surfSize
+    pitch, surfSize = getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight)
+
+    cdef u32 srcSize, dstSize
+
+    if toSwizzle:
+        srcSize, dstSize = width * height * bpp, surfSize
+
+    else:
+        srcSize, dstSize = surfSize, width * height * bpp
+
+    # Typed memoryviews take any buffer without copying it
     cdef:
-        u8 *result = <u8 *>malloc(surfSize)
-        u32 x, y, pos, pos_, i
+        const u8[::1] srcView = data
+        u8[::1] dstView = out
 
-    try:
-        for y in range(height):
-            for x in range(width):
-                if tileMode == 1:
-                    pos = y * pitch + x * bpp
+    if srcView.shape[0] < srcSize:
+        srcView = b''.join([data, bytes(srcSize - srcView.shape[0])])
 
-                else:
-                    pos = getAddrBlockLinear(x, y, width, bpp, 0, blockHeight)
+    if dstView.shape[0] < offset + dstSize:
+        raise ValueError("Output buffer is too small")
 
-                pos_ = (y * width + x) * bpp
+    if not numThreads:
+        numThreads = os.cpu_count() or 1
 
-                if pos + bpp <= surfSize:
-                    if toSwizzle:
-                        for i in range(bpp):
-                            result[pos + i] = data[pos_ + i]
+    if surfSize < MIN_THREADED_SIZE:
+        numThreads = 1
 
-                    else:
-                        for i in range(bpp):
-                            result[pos_ + i] = data[pos + i]
+    cdef:
+        const u8 *src = &srcView[0]
+        u8 *result = &dstView[offset]
+
+        u32 linesPerBlockHeight = blockHeight * 8 if tileMode != 1 else 8
+        u32 rowsPerBand = round_up(DIV_ROUND_UP(height, numThreads), linesPerBlockHeight)
+        u32 numBands = DIV_ROUND_UP(height, rowsPerBand)
+
+        _SwizzleBands bands
+
+    if numBands <= 1:
+        with nogil:
+            _swizzleRows(src, result, 0, height, width, pitch, surfSize, bpp, tileMode, blockHeight, toSwizzle)
+
+    else:
+        bands = _SwizzleBands()
+        bands.src = src
+        bands.result = result
+        bands.rowsPerBand = rowsPerBand
+        bands.height = height
+        bands.width = width
+        bands.pitch = pitch
+        bands.surfSize = surfSize
+        bands.bpp = bpp
+        bands.tileMode = tileMode
+        bands.blockHeight = blockHeight
+        bands.toSwizzle = toSwizzle
+
+        with ThreadPoolExecutor(min(numThreads, numBands)) as pool:
+            list(pool.map(bands.run, range(numBands)))
+
+    return dstSize
+
+
+cpdef u32 deswizzle_into(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data, out, u32 offset=0, u32 numThreads=0) except? 0:
+    """
+    Deswizzles any buffer without copying it, writing the linear data
+    to the writable buffer `out` starting at `offset`.
+    Returns the number of bytes written.
+    """
+    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, 0, numThreads)
+
+
+cpdef u32 swizzle_into(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data, out, u32 offset=0, u32 numThreads=0) except? 0:
+    """
+    Swizzles any buffer without copying it, writing the swizzled surface
+    to the writable buffer `out` starting at `offset`.
+    Padding bytes of the surface are left untouched.
+    Returns the size of the swizzled surface.
+    """
+    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, 1, numThreads)
+
+
+cpdef bytearray deswizzle(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data, u32 numThreads=0):
+    cdef bytearray result = bytearray(getSwizzledSize(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2))
+    _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, result, 0, 0, numThreads)
+
+    return result
+
+
+cpdef bytearray swizzle(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data, u32 numThreads=0):
+    cdef bytearray result = bytearray(getSwizzledSize(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2))
+    _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, result, 0, 1, numThreads)
+
+    return result
+
+
+cdef void _swizzleRegionRows(const u8 *src, u8 *result, u32 x, u32 y, u32 w, u32 h, u32 width, u32 pitch,
+                             u32 bpp, u32 tileMode, u32 blockHeight, int toSwizzle) noexcept nogil:
+    cdef:
+        u32 rowBytes = w * bpp
+        u32 xStart = x * bpp
+        u32 xEnd = xStart + rowBytes
+        u32 xb, row, pos, pos_, n
+
+    for row in range(h):
+        if tileMode == 1:
+            pos = (y + row) * pitch + xStart
+            pos_ = row * rowBytes
 
-        return bytearray(<u8[:surfSize]>result)
+            if toSwizzle:
+                memcpy(result + pos, src + pos_, rowBytes)
 
-    finally:
-        free(result)
+            else:
+                memcpy(result + pos_, src + pos, rowBytes)
 
+            continue
 
-cpdef deswizzle(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data):
-    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, bytearray(data), 0)
+        # Copy up to the next 16-byte sector boundary at a time,
+        # the region does not have to start at the beginning of a sector
+        xb = xStart
+        while xb < xEnd:
+            n = min(16 - xb % 16, xEnd - xb)
+            pos = getAddrBlockLinear(xb // bpp, y + row, width, bpp, 0, blockHeight)
+            pos_ = row * rowBytes + xb - xStart
 
+            if toSwizzle:
+                memcpy(result + pos, src + pos_, n)
+
+            else:
+                memcpy(result + pos_, src + pos, n)
+
+            xb += n
+
+
+cdef u32 _swizzleRegion(long long x, long long y, u32 w, u32 h, u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data, out, u32 offset, int toSwizzle) except? 0:
+    assert 0 <= blockHeightLog2 <= 5
+    cdef u32 blockHeight = 1 << blockHeightLog2
+
+    if x % blkWidth or y % blkHeight:
+        raise ValueError("Region is not aligned to the format's blocks")
+
+    if x < 0 or y < 0 or x + w > width or y + h > height:
+        raise ValueError("Region is outside of the texture")
+
+    if (w % blkWidth and x + w != width) or (h % blkHeight and y + h != height):
+        raise ValueError("Region is not aligned to the format's blocks")
+
+    x //= blkWidth
+    y //= blkHeight
+    w = DIV_ROUND_UP(w, blkWidth)
+    h = DIV_ROUND_UP(h, blkHeight)
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    cdef u32 pitch, surfSize
+    pitch, surfSize = getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight)
+
+    cdef u32 srcSize, dstSize
+
+    if toSwizzle:
+        srcSize, dstSize = w * h * bpp, surfSize
+
+    else:
+        srcSize, dstSize = surfSize, w * h * bpp
+
+    cdef:
+        const u8[::1] srcView = data
+        u8[::1] dstView = out
+
+    if srcView.shape[0] < srcSize:
+        srcView = b''.join([data, bytes(srcSize - srcView.shape[0])])
+
+    if dstView.shape[0] < offset + dstSize:
+        raise ValueError("Output buffer is too small")
+
+    if not w or not h:
+        return 0
+
+    cdef:
+        const u8 *src = &srcView[0]
+        u8 *result = &dstView[offset]
+
+    with nogil:
+        _swizzleRegionRows(src, result, x, y, w, h, width, pitch, bpp, tileMode, blockHeight, toSwizzle)
+
+    return w * h * bpp
+
+
+cpdef bytearray deswizzle_region(long long x, long long y, u32 w, u32 h, u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data):
+    """
+    Deswizzles only the w x h region at (x, y) of a surface.
+    The region is in pixels and must be aligned to the format's blocks,
+    except where it reaches the right or bottom edge of the surface.
+    Returns the linear data of the region.
+    """
+    cdef bytearray result = bytearray(DIV_ROUND_UP(w, blkWidth) * DIV_ROUND_UP(h, blkHeight) * bpp)
+    _swizzleRegion(x, y, w, h, width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, result, 0, 0)
+
+    return result
+
+
+cpdef tuple swizzle_region(long long x, long long y, u32 w, u32 h, u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data, out, u32 offset=0):
+    """
+    Swizzles the linear data of the w x h region at (x, y) in place into
+    the swizzled surface held by `out` starting at `offset`.
+    Bytes outside of the region are left untouched.
+    Returns the start and end of the written bytes, relative to `offset`.
+    """
+    _swizzleRegion(x, y, w, h, width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, out, offset, 1)
+
+    # Both the x and y terms of an address grow with x and y,
+    # so the region spans from its first element to its last one
+    cdef:
+        u32 x0 = x // blkWidth
+        u32 y0 = y // blkHeight
+        u32 x1 = DIV_ROUND_UP(x + w, blkWidth) - 1
+        u32 y1 = DIV_ROUND_UP(y + h, blkHeight) - 1
+        u32 pitch, surfSize
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    if tileMode == 1:
+        pitch, surfSize = getSurfaceSize(width, height, roundPitch, bpp, tileMode, 1)
+        return y0 * pitch + x0 * bpp, y1 * pitch + (x1 + 1) * bpp
+
+    cdef u32 blockHeight = 1 << blockHeightLog2
+
+    return (getAddrBlockLinear(x0, y0, width, bpp, 0, blockHeight),
+            getAddrBlockLinear(x1, y1, width, bpp, 0, blockHeight) + bpp)
+
+
+cpdef array.array getElemAddrs(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2):
+    """
+    Swizzled address of every element of a surface, in linear order.
+    Elements are the blocks of block compressed formats.
+    """
+    assert 0 <= blockHeightLog2 <= 5
+    cdef u32 blockHeight = 1 << blockHeightLog2
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    cdef:
+        u32 pitch, surfSize
+        u32 x, y
+
+        array.array table = array.clone(array.array('I'), width * height, zero=False)
+        u32 *addrs = table.data.as_uints
+
+    pitch, surfSize = getSurfaceSize(width, height, roundPitch, bpp, tileMode, blockHeight)
+
+    with nogil:
+        for y in range(height):
+            for x in range(width):
+                if tileMode == 1:
+                    addrs[y * width + x] = y * pitch + x * bpp
+
+                else:
+                    addrs[y * width + x] = getAddrBlockLinear(x, y, width, bpp, 0, blockHeight)
 
-cpdef swizzle(u32 width, u32 height, u32 blkWidth, u32 blkHeight, int roundPitch, u32 bpp, u32 tileMode, int blockHeightLog2, data):
-    return _swizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, bytearray(data), 1)
+    return table
 
 
-cdef u32 getAddrBlockLinear(u32 x, u32 y, u32 image_width, u32 bytes_per_pixel, u32 base_address, u32 blockHeight):
+cdef u32 getAddrBlockLinear(u32 x, u32 y, u32 image_width, u32 bytes_per_pixel, u32 base_address, u32 blockHeight) noexcept nogil:
     """
     From the Tegra X1 TRM
     """
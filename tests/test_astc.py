@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from bcn import astc
+
+
+def decodeHex(block, blkWidth=4, blkHeight=4):
+    return bytes(astc.decode_block(int.from_bytes(bytes.fromhex(block), 'little'), blkWidth, blkHeight, 0))
+
+
+class DeltaEndpointsTest(unittest.TestCase):
+    # Blocks with a negative delta sum, so their endpoints are swapped and
+    # blue-contracted; reference outputs from ARM astcenc (LDR profile)
+
+    def test_cem9(self):
+        self.assertEqual(
+            decodeHex('af2343919a81718ea0e84fdb8d06c919'),
+            bytes.fromhex(
+                '1b6402ff1f6805ff216b07ff236d09ff1c6503ff1f6906ff206a07ff1e6805ff'
+                '226c09ff246f0bff246e0aff1f6906ff307b16ff2f7a15ff2c7612ff26700dff'
+            ),
+        )
+
+    def test_cem13(self):
+        self.assertEqual(
+            decodeHex('31a4c128da486580ee4d7ce4ab24ea2e'),
+            bytes.fromhex(
+                '1e60008e19630c851e67197b24630c851a6511811c61038b1e6207882061038b'
+                '1a66157e1e6207881c61038b1e6207881e630c851e67197b19630c851e67197b'
+            ),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import struct
+import unittest
+
+import bcn
+from bcn import decompress_
+
+try:
+    from bcn import decompress_np
+
+except ImportError:
+    decompress_np = None
+
+
+def bc1Block(color0, color1, indices):
+    return struct.pack('<2HI', color0, color1, indices)
+
+
+def bc4Block(alpha0, alpha1, indices):
+    return bytes([alpha0, alpha1]) + indices.to_bytes(6, 'little')
+
+
+# Four-color, three-color with punch-through (color0 <= color1) and equal endpoints
+BC1_BLOCKS = [
+    bc1Block(0xf800, 0x001f, 0xe4e4e4e4),
+    bc1Block(0x001f, 0xf800, 0xe4e4e4e4),
+    bc1Block(0x07e0, 0x07e0, 0xffffffff),
+    bc1Block(0x0000, 0xffff, 0x1b1b1b1b),
+    bc1Block(0xffff, 0x0000, 0x55aa55aa),
+]
+
+# Eight-value (alpha0 > alpha1) and six-value blocks; as signed values
+# 0x80 and 0x81 are both -1.0 and 0x7f is 1.0
+BC4_BLOCKS = [
+    bc4Block(0xff, 0x00, 0xfac688fac688),
+    bc4Block(0x00, 0xff, 0xfac688fac688),
+    bc4Block(0x7f, 0x80, 0x123456789abc),
+    bc4Block(0x80, 0x7f, 0xffffffffffff),
+    bc4Block(0x81, 0x80, 0x000000ffffff),
+    bc4Block(0x10, 0x10, 0x249249249249),
+]
+
+SIZES = [(4, 4), (1, 1), (7, 5), (13, 9), (3, 17)]
+
+
+def randomBlocks(rnd, numBlocks, blockSize):
+    data = bytearray(rnd.getrandbits(8) for _ in range(numBlocks * blockSize))
+
+    # Also pick the second endpoint mode of BC1 and BC4 for some blocks
+    for i in range(0, len(data), 8):
+        if rnd.random() < 0.3:
+            data[i], data[i + 1] = min(data[i], data[i + 1]), max(data[i], data[i + 1])
+
+    return bytes(data)
+
+
+@unittest.skipIf(decompress_np is None, "NumPy is not available")
+class NumPyDecompressorTest(unittest.TestCase):
+    def assertSame(self, name, data, width, height, *args):
+        self.assertEqual(
+            bytes(getattr(decompress_np, name)(data, width, height, *args)),
+            bytes(getattr(decompress_, name)(data, width, height, *args)),
+            (name, width, height) + args,
+        )
+
+    def test_edge_blocks(self):
+        bc1 = b''.join(BC1_BLOCKS)[:32]
+        bc4 = b''.join(BC4_BLOCKS)[:32]
+
+        for blocks8 in (bc1, bc4):
+            self.assertSame('decompressDXT1', blocks8, 8, 8)
+
+            for SNORM in (0, 1):
+                self.assertSame('decompressBC4', blocks8, 8, 8, SNORM)
+
+        for i, block in enumerate(BC4_BLOCKS):
+            bc1Block_ = BC1_BLOCKS[i % len(BC1_BLOCKS)]
+
+            self.assertSame('decompressDXT3', block + bc1Block_, 4, 4)
+            self.assertSame('decompressDXT5', block + bc1Block_, 4, 4)
+
+            for SNORM in (0, 1):
+                self.assertSame('decompressBC4', block, 4, 4, SNORM)
+                self.assertSame('decompressBC5', block + BC4_BLOCKS[-1 - i], 4, 4, SNORM)
+
+    def test_random_blocks(self):
+        rnd = random.Random(10)
+
+        for width, height in SIZES:
+            numBlocks = ((width + 3) // 4) * ((height + 3) // 4)
+            data8 = randomBlocks(rnd, numBlocks, 8)
+            data16 = randomBlocks(rnd, numBlocks, 16)
+
+            self.assertSame('decompressDXT1', data8, width, height)
+            self.assertSame('decompressDXT3', data16, width, height)
+            self.assertSame('decompressDXT5', data16, width, height)
+
+            for SNORM in (0, 1):
+                self.assertSame('decompressBC4', data8, width, height, SNORM)
+                self.assertSame('decompressBC5', data16, width, height, SNORM)
+
+
+class BlockAddrsTest(unittest.TestCase):
+    def test_in_range(self):
+        data = b''.join(BC1_BLOCKS[:4])
+        self.assertEqual(
+            bcn.decompressDXT1(data, 8, 8, blockAddrs=[24, 16, 8, 0]),
+            decompress_.decompressDXT1(data[24:] + data[16:24] + data[8:16] + data[:8], 8, 8),
+        )
+
+    def test_out_of_range(self):
+        data = bytes(64)
+        for name, blockAddrs in (('decompressDXT1', [0, 8, 16, 57]),
+                                 ('decompressDXT5', [0, 16, 32, 49]),
+                                 ('decompressBC7', [-16, 0, 16, 32]),
+                                 ('decompressBC4', [0, 8, 16])):
+            with self.assertRaises(ValueError):
+                getattr(bcn, name)(data, 8, 8, blockAddrs=blockAddrs)
+
+
+if __name__ == '__main__':
+    unittest.main()
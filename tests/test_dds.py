@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+import tempfile
+import unittest
+
+import dds
+
+
+class MipmapCapsWithoutMipsTest(unittest.TestCase):
+    # The mipmap caps are set, but the header says there are 0 mipmaps
+    def setUp(self):
+        header = bytearray(dds.generateHeader(3, 8, 8, 'rgba8', [2, 3, 4, 5], 0, False))
+        struct.pack_into('<I', header, 28, 0)
+
+        fd, self.file = tempfile.mkstemp('.dds')
+        with os.fdopen(fd, 'wb') as out:
+            out.write(bytes(header) + bytes(8 * 8 * 4))
+
+    def tearDown(self):
+        os.remove(self.file)
+
+    def test_probe(self):
+        self.assertEqual(dds.probe(self.file), (8, 8, 0xb01, 0, 8 * 8 * 4, dds.DDS_OK))
+
+    def test_map(self):
+        width, height, format_, fourcc, size, compSel, numMips, mips = dds.mapDDS(self.file, False)
+
+        self.assertEqual((width, height, format_, size, numMips), (8, 8, 0xb01, 8 * 8 * 4, 0))
+        self.assertEqual([len(mip) for mip in mips], [8 * 8 * 4])
+
+    def test_read(self):
+        self.assertEqual(dds.readDDS(self.file, False)[6], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+import swizzle
+
+try:
+    import pyximport
+    pyximport.install()
+
+    import swizzle_cy
+
+except:
+    swizzle_cy = None
+
+SWIZZLE_MODULES = [m for m in (swizzle, swizzle_cy) if m is not None]
+
+
+def DIV_ROUND_UP(n, d):
+    return (n + d - 1) // d
+
+
+def round_up(x, y):
+    return ((x - 1) | (y - 1)) + 1
+
+
+def getAddrBlockLinear(x, y, width, bpp, blockHeight):
+    widthInGobs = DIV_ROUND_UP(width * bpp, 64)
+
+    gobAddr = ((y // (8 * blockHeight)) * 512 * blockHeight * widthInGobs
+               + (x * bpp // 64) * 512 * blockHeight
+               + (y % (8 * blockHeight) // 8) * 512)
+
+    x *= bpp
+
+    return (gobAddr + ((x % 64) // 32) * 256 + ((y % 8) // 2) * 64
+            + ((x % 32) // 16) * 32 + (y % 2) * 16 + (x % 16))
+
+
+def referenceSwizzle(width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, blockHeightLog2, data, toSwizzle):
+    """
+    The original loop, moving one element at a time.
+    """
+    blockHeight = 1 << blockHeightLog2
+
+    width = DIV_ROUND_UP(width, blkWidth)
+    height = DIV_ROUND_UP(height, blkHeight)
+
+    if tileMode == 1:
+        pitch = width * bpp
+
+        if roundPitch:
+            pitch = round_up(pitch, 32)
+
+        surfSize = pitch * height
+
+    else:
+        pitch = round_up(width * bpp, 64)
+        surfSize = pitch * round_up(height, blockHeight * 8)
+
+    result = bytearray(surfSize)
+
+    for y in range(height):
+        for x in range(width):
+            if tileMode == 1:
+                pos = y * pitch + x * bpp
+
+            else:
+                pos = getAddrBlockLinear(x, y, width, bpp, blockHeight)
+
+            pos_ = (y * width + x) * bpp
+
+            if pos + bpp <= surfSize:
+                if toSwizzle:
+                    result[pos:pos + bpp] = data[pos_:pos_ + bpp]
+
+                else:
+                    result[pos_:pos_ + bpp] = data[pos:pos + bpp]
+
+    return result
+
+
+@unittest.skipIf(swizzle.np is None, "The address tables are only cached with NumPy")
+class AddrTableCacheTest(unittest.TestCase):
+    def setUp(self):
+        swizzle.addrTableCache.clear()
+
+    def tearDown(self):
+        swizzle.addrTableCache.clear()
+
+    def deswizzle(self, width, height, bpp, blockHeightLog2):
+        data = bytes(swizzle.getSwizzledSize(width, height, 1, 1, 1, bpp, 0, blockHeightLog2))
+        return swizzle.deswizzle(width, height, 1, 1, 1, bpp, 0, blockHeightLog2, data)
+
+    def test_same_geometry_hits(self):
+        self.deswizzle(64, 64, 4, 3)
+        self.assertEqual((swizzle.addrTableCache.hits, swizzle.addrTableCache.misses), (0, 1))
+
+        self.deswizzle(64, 64, 4, 3)
+        self.assertEqual((swizzle.addrTableCache.hits, swizzle.addrTableCache.misses), (1, 1))
+
+    def test_4k_mip_chain_fits(self):
+        mips = [(4096 >> i, 4096 >> i) for i in range(13)]
+
+        for width, height in mips:
+            self.deswizzle(width, height, 4, 4)
+
+        for width, height in mips:
+            self.deswizzle(width, height, 4, 4)
+
+        self.assertEqual(swizzle.addrTableCache.misses, len(mips))
+        self.assertEqual(swizzle.addrTableCache.hits, len(mips))
+
+
+class ReferenceSwizzleTest(unittest.TestCase):
+    def setUp(self):
+        swizzle.addrTableCache.clear()
+
+    def tearDown(self):
+        swizzle.addrTableCache.clear()
+
+    def assertSameAsReference(self, module, numCases=40):
+        rnd = random.Random(1)
+
+        for _ in range(numCases):
+            for bpp in (1, 2, 4, 8, 16):
+                for tileMode in (0, 1):
+                    for roundPitch in (0, 1):
+                        blkWidth, blkHeight = rnd.choice(((1, 1), (4, 4), (5, 4)))
+                        width, height = rnd.randint(1, 70), rnd.randint(1, 70)
+                        args = (width, height, blkWidth, blkHeight, roundPitch, bpp, tileMode, rnd.randint(0, 5))
+
+                        size = swizzle.getSwizzledSize(*args)
+                        data = bytes(rnd.getrandbits(8) for _ in range(size))
+
+                        with self.subTest(module=module.__name__, args=args):
+                            self.assertEqual(module.swizzle(*args, data), referenceSwizzle(*args, data, 1))
+                            self.assertEqual(module.deswizzle(*args, data), referenceSwizzle(*args, data, 0))
+
+    def test_modules(self):
+        for module in SWIZZLE_MODULES:
+            self.assertSameAsReference(module)
+
+    @unittest.skipIf(swizzle.np is None, "The NumPy path is already tested by test_modules")
+    def test_without_numpy(self):
+        np, swizzle.np = swizzle.np, None
+        try:
+            self.assertSameAsReference(swizzle, 10)
+
+        finally:
+            swizzle.np = np
+
+
+class RegionBoundsTest(unittest.TestCase):
+    def test_negative_origin(self):
+        for module in SWIZZLE_MODULES:
+            for tileMode in (0, 1):
+                surface = bytearray(module.getSwizzledSize(16, 16, 1, 1, 1, 4, tileMode, 1))
+
+                for x, y in ((-4, 0), (0, -4), (-4, -4)):
+                    with self.subTest(module=module.__name__, tileMode=tileMode, x=x, y=y):
+                        with self.assertRaises(ValueError):
+                            module.swizzle_region(x, y, 4, 4, 16, 16, 1, 1, 1, 4, tileMode, 1, bytes(64), surface)
+
+                        with self.assertRaises(ValueError):
+                            module.deswizzle_region(x, y, 4, 4, 16, 16, 1, 1, 1, 4, tileMode, 1, surface)
+
+                self.assertEqual(surface, bytearray(len(surface)))
+
+
+if __name__ == '__main__':
+    unittest.main()